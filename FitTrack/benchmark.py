@@ -0,0 +1,269 @@
+"""
+Latency, query and memory benchmark of every page, run by the benchmark command.
+
+seed_user() gives a user a history of a given size, then benchmark_urls()
+requests every URL of the project (see urls_to_benchmark()) as that user,
+several times, and records for each one:
+- the median and 95th percentile latency,
+- the number of SQL queries (the most over the runs),
+- the peak memory allocated while handling it, from one more run traced with
+  tracemalloc (which slows everything down, so it isn't timed).
+
+Pages are requested through the WSGI handler with a Client, or through the
+ASGI one with an AsyncClient, to compare the async views with the sync path.
+
+The number of queries of a page shouldn't grow with the user's history: each
+URL has a budget, QUERY_BUDGETS or DEFAULT_QUERY_BUDGET, and failures()
+lists the pages that ran more (or answered with a server error).
+"""
+import math
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from meals.ingredients import INGREDIENT_FIELDS
+from meals.models import Ingredient, Meal
+from meals.rollups import rebuild_daily_summaries
+from moods.models import Mood
+from pages.activity import rebuild_activity
+from workouts.calories import estimate_calories_batch
+from workouts.models import Workout
+from workouts.records import rebuild_personal_records
+
+# URL namespaces left out: the admin is only for staff
+SKIPPED_NAMESPACES = {'admin'}
+
+# URLs left out, with the reason
+SKIPPED = {
+    'logout': "Ends the session the other pages are requested with.",
+    'import-meals': "Adds meals at every run.",
+    'meal-delete': "Only posted to, from the forms of the list and detail pages.",
+    'workout-update': "Only posted to, from the forms of the list and detail pages.",
+    'workout-delete': "Only posted to, from the forms of the list and detail pages.",
+    'mood-update': "Only posted to, from the forms of the list and detail pages.",
+    'mood-delete': "Only posted to, from the forms of the list and detail pages.",
+}
+
+# Requests other than a plain GET, as keyword arguments of the test client
+REQUESTS = {
+    'nutrition-lookup': {'method': 'post', 'data': {'foods': ['banana', 'rice']}, 'content_type': 'application/json'},
+    'food-autocomplete': {'data': {'q': 'chi'}},
+}
+
+# URLs of a single entry, requested with the user's latest one
+ENTRY_MODELS = {
+    'meal-detail': Meal,
+    'meal-update': Meal,
+    'workout-detail': Workout,
+    'mood-detail': Mood,
+    'api-meal': Meal,
+    'api-workout': Workout,
+    'api-mood': Mood,
+}
+
+# Most queries a page may run, whatever the size of the user's history (None: no budget)
+DEFAULT_QUERY_BUDGET = 5
+QUERY_BUDGETS = {
+    # Streams the history, reading it in chunks
+    'export-data': None,
+}
+
+# Ingredients of each seeded meal, with their nutrients per 100g
+SEED_INGREDIENTS = [
+    ('chicken breast', {'total_fat': 3.6, 'saturated_fat': 1.0, 'total_carbs': 0, 'fiber': 0, 'sugar': 0,
+                        'sodium': 74, 'potassium': 256, 'cholesterol': 85}),
+    ('rice', {'total_fat': 0.3, 'saturated_fat': 0.1, 'total_carbs': 28, 'fiber': 0.4, 'sugar': 0.1,
+              'sodium': 1, 'potassium': 35, 'cholesterol': 0}),
+]
+
+
+def seed_user(user, entries):
+    """
+    Give the user `entries` meals (of two ingredients), workouts and moods,
+    one of each per day back from today, then rebuild everything derived from
+    them (meal rollups, personal records, activity calendar).
+    """
+    now = timezone.now()
+    days = [now - timedelta(days=offset) for offset in range(entries)]
+    workout_types = list(Workout.WorkoutType)
+
+    meals, ingredients = [], []
+    for index, day in enumerate(days):
+        meal_ingredients = [
+            Ingredient(name=name, weight=weight, **{
+                field: value * weight / 100 for field, value in per_100g.items()
+            })
+            for (name, per_100g), weight in zip(SEED_INGREDIENTS, (150 + index % 100, 100 + index % 50))
+        ]
+        meals.append(Meal(user=user, name=f'Meal {index}', date=day, **{
+            f'total_{field}': sum(getattr(ingredient, field) for ingredient in meal_ingredients)
+            for field in INGREDIENT_FIELDS
+        }))
+        ingredients.append(meal_ingredients)
+    for meal, meal_ingredients in zip(Meal.objects.bulk_create(meals), ingredients):
+        for ingredient in meal_ingredients:
+            ingredient.meal = meal
+    Ingredient.objects.bulk_create([ingredient for meal_ingredients in ingredients for ingredient in meal_ingredients])
+
+    workouts = []
+    for index, day in enumerate(days):
+        workout_type = workout_types[index % len(workout_types)]
+        duration = 20 + index % 60
+        if workout_type in Workout.DISTANCE_BASED_TYPES:
+            distance = round(duration / (5 + index % 3), 2)
+            workouts.append(Workout(user=user, date=day, workout_type=workout_type, duration=duration,
+                                    distance=distance, pace=round(duration / distance, 2)))
+        else:
+            workouts.append(Workout(user=user, date=day, workout_type=workout_type, duration=duration,
+                                    intensity=index % 3 + 1))
+    calories = estimate_calories_batch(
+        [w.workout_type for w in workouts],
+        [w.duration for w in workouts],
+        [w.distance for w in workouts],
+        [w.intensity for w in workouts],
+    )
+    for workout, value in zip(workouts, calories):
+        workout.calories = float(value)
+    Workout.objects.bulk_create(workouts)
+
+    Mood.objects.bulk_create([
+        Mood(user=user, date=timezone.localdate(day), mood=index * 7 % 10 + 1)
+        for index, day in enumerate(days)
+    ])
+
+    rebuild_daily_summaries(users=[user])
+    rebuild_personal_records(users=[user])
+    rebuild_activity(users=[user])
+
+
+def _url_patterns(resolver):
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace not in SKIPPED_NAMESPACES:
+                yield from _url_patterns(pattern)
+        elif pattern.name:
+            yield pattern
+
+
+def url_kwargs(name, params, user):
+    """Arguments to reverse() the URL called name with, for the user."""
+    if not params:
+        return {}
+    if name in ENTRY_MODELS:
+        return {'pk': ENTRY_MODELS[name].objects.filter(user=user).latest('date', 'pk').pk}
+    if name == 'password_reset_confirm':
+        return {
+            'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+            'token': default_token_generator.make_token(user),
+        }
+    raise ImproperlyConfigured(
+        f"Don't know how to request '{name}' ({', '.join(params)}): add it to "
+        "ENTRY_MODELS, or to SKIPPED with the reason."
+    )
+
+
+def urls_to_benchmark(user, names=None):
+    """{url name: url} of every named URL of the project (or only names), as the user would request them."""
+    urls = {}
+    for pattern in _url_patterns(get_resolver()):
+        if pattern.name in SKIPPED or pattern.name in urls or (names and pattern.name not in names):
+            continue
+        params = pattern.pattern.converters
+        urls[pattern.name] = reverse(pattern.name, kwargs=url_kwargs(pattern.name, params, user))
+    return urls
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(len(ordered) * percent / 100) - 1, 0)]
+
+
+async def _aconsume(streaming_content):
+    async for _ in streaming_content:
+        pass
+
+
+def measure(client, name, url, repeat, warm=False):
+    """Timings, queries and peak memory of requesting url repeat times (plus a first, untimed run)."""
+    options = dict(REQUESTS.get(name, {}))
+    request = getattr(client, options.pop('method', 'get'))
+    if isinstance(client, AsyncClient):
+        # Its queries still run in this thread (see sync_to_async()), so they are captured
+        request = async_to_sync(request)
+    data = options.pop('data', None)
+
+    def run():
+        # Cold by default: cached pages do all their work every time
+        if not warm:
+            cache.clear()
+        response = request(url, data, **options)
+        if response.streaming:
+            # Read the whole body, without keeping it
+            if response.is_async:
+                async_to_sync(_aconsume)(response.streaming_content)
+            else:
+                for _ in response.streaming_content:
+                    pass
+        return response
+
+    status = run().status_code
+    timings, queries = [], []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        queries.append(len(context.captured_queries))
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'url': url,
+        'status': status,
+        'p50_ms': round(statistics.median(timings) * 1000, 2),
+        'p95_ms': round(_percentile(timings, 95) * 1000, 2),
+        'queries': max(queries),
+        'query_budget': QUERY_BUDGETS.get(name, DEFAULT_QUERY_BUDGET),
+        'peak_memory_kb': round(peak_memory / 1024, 1),
+    }
+
+
+def benchmark_urls(client, user, repeat, names=None, warm=False):
+    """
+    measure() every URL of urls_to_benchmark(), with the client logged in as
+    the user. The client should not raise the views' exceptions, so a failing
+    page is reported with its 500 instead of stopping the benchmark.
+    """
+    client.force_login(user)
+    return {
+        name: measure(client, name, url, repeat, warm=warm)
+        for name, url in urls_to_benchmark(user, names).items()
+    }
+
+
+def failures(results):
+    """Names of the measured URLs that ran more queries than their budget, or answered with a server error."""
+    return [
+        name for name, result in results.items()
+        if result['status'] >= 500
+        or (result['query_budget'] is not None and result['queries'] > result['query_budget'])
+    ]
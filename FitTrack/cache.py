@@ -0,0 +1,165 @@
+"""
+Per-user cache of computed pages and summaries, invalidated by version counters.
+
+Each user has one version counter per app ('meals', 'workouts', 'moods'),
+bumped by that app's model signals whenever the user's data changes. Cached
+values are stored under keys that include the versions of every app they were
+built from, so a bump makes the old entries unreachable; they are then evicted
+by the backend (LRU for the local-memory and Redis backends) or expire after
+settings.CACHE_TIMEOUT.
+
+Hits and misses are counted per cache name in the cache itself, so every
+process shares them; see the cache_stats management command.
+
+acached() is cached() for async views, through the cache's async API.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+APPS = ('meals', 'workouts', 'moods')
+
+# Everything cached through cached(), with the apps whose data it is built from
+CACHED = {
+    'meals-review': ('meals',),
+    'workouts-review': ('workouts',),
+    'moods-review': ('moods',),
+    'mood-correlations': APPS,
+    'dashboard': APPS,
+}
+
+KEY_PREFIX = 'fittrack'
+
+
+def version_key(app, user_id):
+    return f'{KEY_PREFIX}:version:{app}:{user_id}'
+
+
+def stats_key(name, outcome):
+    return f'{KEY_PREFIX}:stats:{name}:{outcome}'
+
+
+def _new_version():
+    # Counters can be evicted like any other entry: starting again from the clock
+    # instead of 1 means a recreated counter can't point back to old entries
+    return time.time_ns()
+
+
+def get_versions(user_id, apps):
+    """Current version of each app for the user, creating the missing counters."""
+    keys = {app: version_key(app, user_id) for app in apps}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for app, key in keys.items():
+        if key not in found:
+            # add() keeps the counter another process may have just created
+            cache.add(key, _new_version(), timeout=None)
+            found[key] = cache.get(key, _new_version())
+        versions[app] = found[key]
+    return versions
+
+
+async def aget_versions(user_id, apps):
+    """See get_versions()."""
+    keys = {app: version_key(app, user_id) for app in apps}
+    found = await cache.aget_many(keys.values())
+    versions = {}
+    for app, key in keys.items():
+        if key not in found:
+            await cache.aadd(key, _new_version(), timeout=None)
+            found[key] = await cache.aget(key, _new_version())
+        versions[app] = found[key]
+    return versions
+
+
+def bump_version(app, user_id):
+    """Invalidate everything cached from the user's data in app, once the current transaction commits."""
+    def bump():
+        try:
+            cache.incr(version_key(app, user_id))
+        except ValueError:
+            # Never created or evicted: nothing can be cached under it anymore
+            cache.set(version_key(app, user_id), _new_version(), timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def bump_versions(app, user_ids):
+    """bump_version() for many users, e.g. after bulk changes that bypass the signals."""
+    for user_id in user_ids:
+        bump_version(app, user_id)
+
+
+def _count(name, outcome):
+    key = stats_key(name, outcome)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+async def _acount(name, outcome):
+    key = stats_key(name, outcome)
+    await cache.aadd(key, 0, timeout=None)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        pass
+
+
+def _key(name, user_id, versions, key_parts):
+    parts = [name, user_id, *(versions[app] for app in CACHED[name]), *key_parts]
+    return ':'.join([KEY_PREFIX, *map(str, parts)])
+
+
+def cached(name, user_id, build, *key_parts, timeout=None):
+    """
+    The value cached under name for the user, or build() (then cached) if
+    there is none for the current versions of the apps it depends on (see
+    CACHED). key_parts are added to the key, e.g. a date for values that also
+    depend on the day.
+    """
+    key = _key(name, user_id, get_versions(user_id, CACHED[name]), key_parts)
+    value = cache.get(key)
+    if value is not None:
+        _count(name, 'hits')
+        return value
+    _count(name, 'misses')
+    value = build()
+    cache.set(key, value, settings.CACHE_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+async def acached(name, user_id, build, *key_parts, timeout=None):
+    """See cached(); build is a coroutine function here."""
+    key = _key(name, user_id, await aget_versions(user_id, CACHED[name]), key_parts)
+    value = await cache.aget(key)
+    if value is not None:
+        await _acount(name, 'hits')
+        return value
+    await _acount(name, 'misses')
+    value = await build()
+    await cache.aset(key, value, settings.CACHE_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+def cache_stats(names=tuple(CACHED)):
+    """Hits, misses and hit rate of each cache name."""
+    counts = cache.get_many([stats_key(name, outcome) for name in names for outcome in ('hits', 'misses')])
+    stats = {}
+    for name in names:
+        hits = counts.get(stats_key(name, 'hits'), 0)
+        misses = counts.get(stats_key(name, 'misses'), 0)
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+    return stats
+
+
+def reset_cache_stats(names=tuple(CACHED)):
+    cache.delete_many([stats_key(name, outcome) for name in names for outcome in ('hits', 'misses')])
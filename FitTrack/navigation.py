@@ -0,0 +1,57 @@
+from django.db.models import Q, Subquery
+from django.http import Http404
+
+
+class AdjacentObjectsMixin:
+    """
+    DetailView mixin that loads the object together with the entries just
+    before and after it on (date, pk), in a single query. They are added to
+    the context as previous_<name> (older) and next_<name> (newer), where
+    <name> is the context_object_name.
+    """
+
+    cursor_field = 'date'
+
+    def get_object(self, queryset=None):
+        if queryset is None:
+            queryset = self.get_queryset()
+        queryset = queryset.order_by()
+        pk = self.kwargs.get(self.pk_url_kwarg)
+        field = self.cursor_field
+
+        # Each neighbour is a scalar subquery seeking from the current entry's date
+        current = Subquery(queryset.filter(pk=pk).values(field)[:1])
+        older = queryset.filter(
+            Q(**{f'{field}__lte': current}) & (Q(**{f'{field}__lt': current}) | Q(pk__lt=pk))
+        ).order_by(f'-{field}', '-pk').values('pk')[:1]
+        newer = queryset.filter(
+            Q(**{f'{field}__gte': current}) & (Q(**{f'{field}__gt': current}) | Q(pk__gt=pk))
+        ).order_by(field, 'pk').values('pk')[:1]
+
+        rows = queryset.filter(Q(pk=pk) | Q(pk=Subquery(older)) | Q(pk=Subquery(newer)))
+
+        obj = None
+        self.previous_object = self.next_object = None
+        neighbours = []
+        for row in rows:
+            if row.pk == pk:
+                obj = row
+            else:
+                neighbours.append(row)
+        if obj is None:
+            raise Http404(f"No {queryset.model._meta.verbose_name} found matching the query")
+
+        key = (getattr(obj, field), obj.pk)
+        for row in neighbours:
+            if (getattr(row, field), row.pk) < key:
+                self.previous_object = row
+            else:
+                self.next_object = row
+        return obj
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        name = self.get_context_object_name(self.object)
+        context[f'previous_{name}'] = self.previous_object
+        context[f'next_{name}'] = self.next_object
+        return context
@@ -0,0 +1,206 @@
+"""
+Opt-in request profiling.
+
+ProfilingMiddleware times a sample of the requests (settings.PROFILING_SAMPLE_RATE,
+0 disables it) and reports for each one:
+- the SQL queries run, their total time and the queries run more than once
+  with the same SQL (usually a query inside a loop),
+- the time spent rendering templates,
+- the time spent in the view (which includes the queries and templates it ran)
+  and in the whole request.
+
+They are sent back in a Server-Timing header, which browsers show in their
+developer tools, and appended as one JSON line per request to
+settings.PROFILING_LOG_FILE, rotated by size.
+
+The middleware works with sync and async views alike. The profile of the
+request is kept in a context variable, which asgiref copies to the threads
+where async views run their queries, so queries and templates are recorded
+by hooks installed once on every database connection and on Template.
+"""
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template
+from django.utils import timezone
+
+logger = logging.getLogger('fittrack.profiling')
+
+# Most repeated queries kept in each log record
+MAX_DUPLICATES_LOGGED = 5
+
+# The profile of the request being handled, if it's sampled
+current_profile = ContextVar('current_profile', default=None)
+
+IN_LIST = re.compile(r'IN \(%s(?:, %s)*\)')
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_time = 0.0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.queries = Counter()
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            # IN (%s, %s, ...) lists of any length count as the same query
+            self.queries[IN_LIST.sub('IN (...)', sql)] += 1
+
+    @property
+    def duplicates(self):
+        return [(sql, count) for sql, count in self.queries.most_common() if count > 1]
+
+    def server_timing(self, total):
+        query_count = sum(self.queries.values())
+        repeated = sum(count - 1 for _, count in self.duplicates)
+        metrics = [
+            ('db', self.db_time, f'{query_count} queries, {repeated} repeated'),
+            ('tpl', self.template_time, 'Templates'),
+            ('view', self.view_time, 'View'),
+            ('total', total, 'Total'),
+        ]
+        return ', '.join(f'{name};dur={seconds * 1000:.1f};desc="{desc}"' for name, seconds, desc in metrics)
+
+    def record(self, request, response, total):
+        match = request.resolver_match
+        return {
+            'time': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'view_ms': round(self.view_time * 1000, 2),
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'queries': sum(self.queries.values()),
+            'duplicates': [{'sql': sql, 'count': count} for sql, count in self.duplicates[:MAX_DUPLICATES_LOGGED]],
+        }
+
+
+def _profiled_query(execute, sql, params, many, context):
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile.record_query(execute, sql, params, many, context)
+
+
+def _install_query_hook(connection, **kwargs):
+    if _profiled_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_profiled_query)
+
+
+def _install_query_hooks():
+    """Hook the connections already open in the current thread."""
+    for connection in connections.all(initialized_only=True):
+        _install_query_hook(connection)
+
+
+def _profiled_render(render):
+    def wrapper(self, *args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return render(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.template_time += time.perf_counter() - started
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def _log_handler():
+    handler = RotatingFileHandler(
+        settings.PROFILING_LOG_FILE,
+        maxBytes=settings.PROFILING_LOG_MAX_BYTES,
+        backupCount=settings.PROFILING_LOG_BACKUPS,
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    return handler
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.PROFILING_SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+        # Connections are per thread: hook every new one, and the open ones of the
+        # threads requests are handled in as they come (see process_view())
+        _install_query_hooks()
+        connection_created.connect(_install_query_hook)
+        # Top-level templates only: {% include %} and {% extends %} render within them
+        if not getattr(Template.render, 'profiled', False):
+            Template.render = _profiled_render(Template.render)
+        # A LOGGING setting can send the records elsewhere instead
+        if not logger.handlers:
+            logger.addHandler(_log_handler())
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.finish(profile, request, response)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.finish(profile, request, response)
+
+    def finish(self, profile, request, response):
+        total = time.perf_counter() - profile.started
+        if profile.view_started is not None:
+            profile.view_time = time.perf_counter() - profile.view_started
+        response.headers['Server-Timing'] = profile.server_timing(total)
+        logger.info(json.dumps(profile.record(request, response, total)))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = current_profile.get()
+        if profile is not None:
+            # Runs in the thread the view queries from, even for async views
+            _install_query_hooks()
+            profile.view_started = time.perf_counter()
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'meals.apps.MealsConfig',
     'pages.apps.PagesConfig',
     'workouts.apps.WorkoutsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -49,7 +50,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Async capable, unlike WhiteNoise's own (see FitTrack/static.py)
+    'FitTrack.static.AsyncWhiteNoiseMiddleware',
+    'FitTrack.profiling.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,6 +88,38 @@ import dj_database_url
 DATABASES = {"default": dj_database_url.config(default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}")}
 
 
+# Cache (see FitTrack/cache.py). CACHE_URL picks the backend:
+#   locmem://                 memory of each process (default)
+#   file:///path/to/dir       a directory shared by the processes of one machine
+#   redis://host:6379/0       a Redis server shared by every machine (needs the redis package;
+#                             configure it with maxmemory-policy allkeys-lru so it evicts like the others)
+CACHE_URL = os.getenv('CACHE_URL', 'locmem://')
+CACHE_TIMEOUT = int(os.getenv('CACHE_TIMEOUT', 60 * 60 * 24))  # seconds
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))  # locmem and file only
+
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+        'TIMEOUT': CACHE_TIMEOUT,
+    }}
+elif CACHE_URL.startswith('file://'):
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_URL.removeprefix('file://'),
+        'TIMEOUT': CACHE_TIMEOUT,
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    }}
+else:
+    # Evicts the least recently used entries once MAX_ENTRIES is reached
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fittrack',
+        'TIMEOUT': CACHE_TIMEOUT,
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    }}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -143,4 +178,19 @@ ANYMAIL = {
     "SENDGRID_API_KEY":os.getenv("SENDGRID_API_KEY")
 }
 
-ANYMAIL_IGNORE_UNSUPPORTED_FEATURES = False
\ No newline at end of file
+ANYMAIL_IGNORE_UNSUPPORTED_FEATURES = False
+
+# Nutrition lookups (see meals/nutrition.py)
+# NUTRITION_CLIENT is the dotted path of the upstream client, e.g. 'meals.nutrition.StaticNutritionClient' to work offline
+NUTRITION_CLIENT = os.getenv('NUTRITION_CLIENT', 'meals.nutrition.ApiNinjasClient')
+NUTRITION_API_KEY = os.getenv('NUTRITION_API_KEY')
+NUTRITION_CACHE_TTL = int(os.getenv('NUTRITION_CACHE_TTL', 60 * 60 * 24 * 30))  # seconds
+
+# Food autocomplete (see meals/catalog.py): how often, in seconds, each process checks the catalog for changes
+FOOD_INDEX_REFRESH = int(os.getenv('FOOD_INDEX_REFRESH', 60))
+
+# Request profiling (see FitTrack/profiling.py): the share of requests profiled, from 0 (off) to 1
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_LOG_FILE = os.getenv('PROFILING_LOG_FILE', BASE_DIR / 'profiling.jsonl')
+PROFILING_LOG_MAX_BYTES = int(os.getenv('PROFILING_LOG_MAX_BYTES', 10 * 1024 * 1024))
+PROFILING_LOG_BACKUPS = int(os.getenv('PROFILING_LOG_BACKUPS', 5))  # rotated files kept
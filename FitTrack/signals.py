@@ -0,0 +1,12 @@
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+
+
+def deleting_user(origin):
+    """
+    Whether a post_delete signal comes from deleting users (their entries go with
+    them), given the signal's origin argument: there's nothing left to update then,
+    and rows written for those users would break their foreign keys.
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, get_user_model())
@@ -0,0 +1,297 @@
+"""
+Deterministic synthetic histories of meals, workouts and moods, written by
+the generate_data command.
+
+Each user gets a profile (favourite workouts, how often they train, how
+hungry they are, their usual mood...) and a day by day history drawn from a
+random.Random seeded with the seed and the user's number, so the same
+arguments always give the same data. Workouts are consistent like logged
+ones: distance-based workouts get a pace of duration / distance, and
+calories always come from the MET tables of workouts/calories.py.
+
+Rows are buffered by HistoryWriter and inserted batch_size at a time,
+bypassing the models and their signals: the caller rebuilds the rollups, personal
+records and activity calendar afterwards.
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Max
+from django.utils import timezone
+
+from meals.ingredients import INGREDIENT_FIELDS
+from meals.models import Ingredient, Meal
+from moods.models import Mood
+from workouts.calories import estimate_calories_batch
+from workouts.models import Workout
+
+WorkoutType = Workout.WorkoutType
+Intensity = Workout.Intensity
+
+# Usual portion (g) and nutrients per 100g of the foods meals are made of
+FOODS = {
+    'oats': (50, {'total_fat': 6.9, 'saturated_fat': 1.2, 'total_carbs': 66, 'fiber': 10.6, 'sugar': 1,
+                  'sodium': 2, 'potassium': 429, 'cholesterol': 0}),
+    'banana': (120, {'total_fat': 0.3, 'saturated_fat': 0.1, 'total_carbs': 23, 'fiber': 2.6, 'sugar': 12,
+                     'sodium': 1, 'potassium': 358, 'cholesterol': 0}),
+    'milk': (200, {'total_fat': 3.3, 'saturated_fat': 1.9, 'total_carbs': 4.8, 'fiber': 0, 'sugar': 5.1,
+                   'sodium': 44, 'potassium': 150, 'cholesterol': 10}),
+    'eggs': (100, {'total_fat': 9.5, 'saturated_fat': 3.1, 'total_carbs': 0.7, 'fiber': 0, 'sugar': 0.4,
+                   'sodium': 142, 'potassium': 138, 'cholesterol': 372}),
+    'bread': (60, {'total_fat': 3.2, 'saturated_fat': 0.7, 'total_carbs': 49, 'fiber': 2.7, 'sugar': 5,
+                   'sodium': 491, 'potassium': 115, 'cholesterol': 0}),
+    'yogurt': (150, {'total_fat': 3.3, 'saturated_fat': 2.1, 'total_carbs': 4.7, 'fiber': 0, 'sugar': 4.7,
+                     'sodium': 46, 'potassium': 155, 'cholesterol': 13}),
+    'chicken breast': (150, {'total_fat': 3.6, 'saturated_fat': 1.0, 'total_carbs': 0, 'fiber': 0, 'sugar': 0,
+                             'sodium': 74, 'potassium': 256, 'cholesterol': 85}),
+    'salmon': (140, {'total_fat': 13, 'saturated_fat': 3.1, 'total_carbs': 0, 'fiber': 0, 'sugar': 0,
+                     'sodium': 59, 'potassium': 363, 'cholesterol': 55}),
+    'rice': (180, {'total_fat': 0.3, 'saturated_fat': 0.1, 'total_carbs': 28, 'fiber': 0.4, 'sugar': 0.1,
+                   'sodium': 1, 'potassium': 35, 'cholesterol': 0}),
+    'pasta': (200, {'total_fat': 0.9, 'saturated_fat': 0.2, 'total_carbs': 31, 'fiber': 1.8, 'sugar': 0.6,
+                    'sodium': 1, 'potassium': 44, 'cholesterol': 0}),
+    'broccoli': (90, {'total_fat': 0.4, 'saturated_fat': 0.1, 'total_carbs': 7, 'fiber': 2.6, 'sugar': 1.7,
+                      'sodium': 33, 'potassium': 316, 'cholesterol': 0}),
+    'tomato': (100, {'total_fat': 0.2, 'saturated_fat': 0, 'total_carbs': 3.9, 'fiber': 1.2, 'sugar': 2.6,
+                     'sodium': 5, 'potassium': 237, 'cholesterol': 0}),
+    'cheddar': (30, {'total_fat': 33, 'saturated_fat': 21, 'total_carbs': 1.3, 'fiber': 0, 'sugar': 0.5,
+                     'sodium': 621, 'potassium': 98, 'cholesterol': 105}),
+    'apple': (150, {'total_fat': 0.2, 'saturated_fat': 0, 'total_carbs': 14, 'fiber': 2.4, 'sugar': 10,
+                    'sodium': 1, 'potassium': 107, 'cholesterol': 0}),
+    'almonds': (25, {'total_fat': 50, 'saturated_fat': 3.8, 'total_carbs': 22, 'fiber': 12.5, 'sugar': 4.4,
+                     'sodium': 1, 'potassium': 733, 'cholesterol': 0}),
+}
+
+# Meals of a day: (name, usual time, how likely it is to be logged, foods it's made from)
+MEALS = [
+    ('Breakfast', time(8, 0), 0.85, ['oats', 'banana', 'milk', 'eggs', 'bread', 'yogurt']),
+    ('Lunch', time(12, 30), 0.9, ['bread', 'chicken breast', 'rice', 'tomato', 'cheddar', 'salmon', 'broccoli']),
+    ('Snack', time(16, 0), 0.4, ['apple', 'banana', 'almonds', 'yogurt']),
+    ('Dinner', time(19, 30), 0.95, ['chicken breast', 'salmon', 'rice', 'pasta', 'broccoli', 'tomato', 'cheddar']),
+]
+
+# Usual duration of each workout type in minutes: (mean, standard deviation)
+DURATIONS = {
+    WorkoutType.RUNNING: (40, 12),
+    WorkoutType.WALKING: (50, 15),
+    WorkoutType.CYCLING: (70, 25),
+    WorkoutType.YOGA: (45, 10),
+    WorkoutType.STRENGTH_TRAINING: (55, 12),
+    WorkoutType.HIIT: (25, 6),
+    WorkoutType.ROWING: (35, 10),
+    WorkoutType.PILATES: (45, 10),
+    WorkoutType.SWIMMING: (40, 12),
+    WorkoutType.HIKING: (150, 50),
+}
+
+# Usual speed of the distance-based workouts in km/h: (mean, standard deviation)
+SPEEDS = {
+    WorkoutType.RUNNING: (10.5, 0.8),
+    WorkoutType.WALKING: (5.2, 0.4),
+    WorkoutType.CYCLING: (22, 2.5),
+}
+
+
+@dataclass
+class Profile:
+    """Habits of one synthetic user."""
+    workout_types: list
+    workouts_per_week: float
+    speed_factor: float
+    appetite: float
+    mood_baseline: float
+    mood_logging: float
+
+
+def make_profile(rng):
+    return Profile(
+        workout_types=rng.sample(list(WorkoutType), k=rng.randint(1, 3)),
+        workouts_per_week=rng.uniform(1, 6),
+        speed_factor=rng.uniform(0.85, 1.15),
+        appetite=rng.uniform(0.8, 1.25),
+        mood_baseline=rng.gauss(6.5, 1),
+        mood_logging=rng.uniform(0.5, 0.95),
+    )
+
+
+def _insert_sql(model, fields):
+    """INSERT of one row of the model's fields, to run with executemany()."""
+    quote = connection.ops.quote_name
+    columns = [quote(model._meta.get_field(field).column) for field in fields]
+    return "INSERT INTO {table} ({columns}) VALUES ({values})".format(
+        table=quote(model._meta.db_table), columns=", ".join(columns), values=", ".join(["%s"] * len(columns)),
+    )
+
+
+MEAL_COLUMNS = ('id', 'user', 'name', 'date', *(f'total_{field}' for field in INGREDIENT_FIELDS), 'updated_at')
+INGREDIENT_COLUMNS = ('meal', 'name', *INGREDIENT_FIELDS)
+WORKOUT_COLUMNS = ('user', 'date', 'workout_type', 'duration', 'distance', 'pace', 'intensity', 'calories', 'updated_at')
+MOOD_COLUMNS = ('user', 'date', 'mood', 'updated_at')
+
+INSERT_MEAL_SQL = _insert_sql(Meal, MEAL_COLUMNS)
+INSERT_INGREDIENT_SQL = _insert_sql(Ingredient, INGREDIENT_COLUMNS)
+INSERT_WORKOUT_SQL = _insert_sql(Workout, WORKOUT_COLUMNS)
+INSERT_MOOD_SQL = _insert_sql(Mood, MOOD_COLUMNS)
+
+
+class HistoryWriter:
+    """
+    Buffers new rows and inserts them batch_size at a time, as plain tuples
+    of column values run through one prepared INSERT per table with
+    executemany(): bulk_create() would compile every value of every row into
+    its SQL, which is most of the time spent with millions of rows.
+
+    Raw SQL skips auto_now, so updated_at is set explicitly. Meals get their
+    primary keys here, after the highest one in the table, so ingredients can
+    point to them without reading them back; like loaddata, close() then
+    resets the table's sequence on the databases that have one. Nothing else
+    should be writing meals meanwhile.
+    """
+
+    def __init__(self, batch_size=5000):
+        self.batch_size = batch_size
+        self.next_meal_pk = (Meal.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        self.meals = []
+        self.ingredients = []
+        self.workouts = []
+        self.moods = []
+        self.pending = 0
+        self.written = 0
+
+    def add_meal(self, meal, ingredients):
+        """
+        meal is a tuple of the MEAL_COLUMNS values from user to the totals,
+        ingredients tuples of the INGREDIENT_COLUMNS values after the meal.
+        """
+        pk = self.next_meal_pk
+        self.next_meal_pk += 1
+        self.meals.append((pk, *meal))
+        self.ingredients.extend((pk, *ingredient) for ingredient in ingredients)
+        self._added(1 + len(ingredients))
+
+    def add_workout(self, workout):
+        """workout is a tuple of the WORKOUT_COLUMNS values from user to intensity."""
+        self.workouts.append(workout)
+        self._added(1)
+
+    def add_mood(self, mood):
+        """mood is a tuple of the MOOD_COLUMNS values from user to mood."""
+        self.moods.append(mood)
+        self._added(1)
+
+    def _added(self, rows):
+        self.pending += rows
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # The connection itself: every attribute lookup on the django.db.connection proxy costs a context lookup
+        db = connections[DEFAULT_DB_ALIAS]
+        to_datetime = Workout._meta.get_field('date').get_db_prep_save
+        to_date = Mood._meta.get_field('date').get_db_prep_save
+        updated_at = to_datetime(timezone.now(), db)
+
+        with db.cursor() as cursor:
+            if self.meals:
+                cursor.executemany(INSERT_MEAL_SQL, [
+                    (pk, user_id, name, to_datetime(moment, db), *totals, updated_at)
+                    for pk, user_id, name, moment, *totals in self.meals
+                ])
+                cursor.executemany(INSERT_INGREDIENT_SQL, self.ingredients)
+            if self.workouts:
+                _, _, workout_types, durations, distances, _, intensities = zip(*self.workouts)
+                calories = estimate_calories_batch(workout_types, durations, distances, intensities).tolist()
+                cursor.executemany(INSERT_WORKOUT_SQL, [
+                    (user_id, to_datetime(moment, db), *values, workout_calories, updated_at)
+                    for (user_id, moment, *values), workout_calories in zip(self.workouts, calories)
+                ])
+            if self.moods:
+                cursor.executemany(INSERT_MOOD_SQL, [
+                    (user_id, to_date(day, db), mood, updated_at) for user_id, day, mood in self.moods
+                ])
+
+        self.written += self.pending
+        self.meals, self.ingredients, self.workouts, self.moods = [], [], [], []
+        self.pending = 0
+
+    def close(self):
+        """Insert the remaining rows and move the meal sequence past the primary keys given here."""
+        self.flush()
+        statements = connection.ops.sequence_reset_sql(no_style(), [Meal])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+
+def _at(midnight, moment, rng, spread_minutes=45):
+    """A time around moment on the day starting at midnight."""
+    minutes = moment.hour * 60 + moment.minute + round(rng.gauss(0, spread_minutes / 2))
+    return midnight + timedelta(minutes=minutes)
+
+
+# Per gram, in the order of INGREDIENT_FIELDS after weight
+NUTRIENTS_PER_GRAM = {
+    food: tuple(per_100g[field] / 100 for field in INGREDIENT_FIELDS if field != 'weight')
+    for food, (_, per_100g) in FOODS.items()
+}
+
+
+def _meal(user, midnight, name, moment, foods, profile, rng):
+    ingredients = []
+    totals = [0] * len(INGREDIENT_FIELDS)
+    for food in rng.sample(foods, k=rng.randint(1, 3)):
+        weight = round(max(FOODS[food][0] * profile.appetite * rng.uniform(0.6, 1.4), 5))
+        values = (weight, *(round(value * weight, 2) for value in NUTRIENTS_PER_GRAM[food]))
+        ingredients.append((food, *values))
+        totals = [total + value for total, value in zip(totals, values)]
+    meal = (user.pk, name, _at(midnight, moment, rng), *(round(total, 2) for total in totals))
+    return meal, ingredients
+
+
+def _workout(user, midnight, profile, rng):
+    workout_type = rng.choice(profile.workout_types)
+    mean, deviation = DURATIONS[workout_type]
+    duration = max(round(rng.gauss(mean, deviation)), 10)
+    # Early birds and after-work sessions
+    moment = _at(midnight, rng.choice([time(7, 0), time(18, 30)]), rng)
+    distance = pace = intensity = None
+    if workout_type in Workout.DISTANCE_BASED_TYPES:
+        mean, deviation = SPEEDS[workout_type]
+        speed = max(rng.gauss(mean * profile.speed_factor, deviation), 1)
+        distance = round(speed * duration / 60, 2)
+        pace = round(duration / distance, 2)
+    else:
+        intensity = int(rng.choices(list(Intensity), weights=[3, 5, 2])[0])
+    return (user.pk, moment, int(workout_type), duration, distance, pace, intensity)
+
+
+def generate_history(user, rng, first_day, last_day, writer):
+    """Write the user's meals, workouts and moods from first_day to last_day (included) to writer."""
+    profile = make_profile(rng)
+    tz = timezone.get_current_timezone()
+    day = first_day
+    while day <= last_day:
+        midnight = datetime.combine(day, time.min, tzinfo=tz)
+        worked_out = rng.random() < profile.workouts_per_week / 7
+        if worked_out:
+            writer.add_workout(_workout(user, midnight, profile, rng))
+
+        for name, moment, likelihood, foods in MEALS:
+            if rng.random() < likelihood:
+                writer.add_meal(*_meal(user, midnight, name, moment, foods, profile, rng))
+
+        # At most one mood a day (Mood is unique per user and date), better on training days and weekends
+        if rng.random() < profile.mood_logging:
+            mood = rng.gauss(profile.mood_baseline + 0.8 * worked_out + 0.5 * (day.weekday() >= 5), 1.3)
+            writer.add_mood((user.pk, day, min(max(round(mood), 1), 10)))
+
+        day += timedelta(days=1)
+
+
+def user_rng(seed, number):
+    """Random generator of the number-th generated user: the same whatever the other users."""
+    return random.Random(f'{seed}:{number}')
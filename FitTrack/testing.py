@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryPlanTestCase(TestCase):
+    """
+    TestCase that checks the SQL run by a view against SQLite's query planner.
+
+    assertViewUsesIndexes() requests a URL, runs EXPLAIN QUERY PLAN on every
+    SELECT it made and fails if any of them scans a whole table (instead of
+    searching an index) or needs a temporary B-tree to sort its results.
+    The cache is cleared before each test, so cached pages still run their queries.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def plan_problems(self, sql):
+        problems = []
+        for step in self.explain(sql):
+            if step.startswith('SCAN ') and not step.startswith('SCAN CONSTANT ROW'):
+                problems.append(step)
+            elif 'USE TEMP B-TREE FOR' in step and 'ORDER BY' in step:
+                problems.append(step)
+        return problems
+
+    def assertViewUsesIndexes(self, url, method='get', data=None, expected_status=200):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Query plans are checked against SQLite only.")
+
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data)
+        self.assertEqual(response.status_code, expected_status)
+
+        # last_executed_query() on SQLite quotes the parameters, so the SQL can be replayed
+        selects = [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects, f"{url} ran no SELECT queries.")
+        failures = []
+        for sql in selects:
+            problems = self.plan_problems(sql)
+            if problems:
+                failures.append(f"{sql}\n    -> {'; '.join(problems)}")
+        if failures:
+            self.fail(f"Queries made by {url} don't use an index:\n" + '\n'.join(failures))
+        return response
@@ -9,6 +9,7 @@ urlpatterns = [
     path('meal/', include('meals.urls')),
     path('mood/', include('moods.urls')),
     path ('users/', include ('users.urls')),
+    path('api/v1/', include('api.urls')),
     path('password-reset/', 
          auth_views.PasswordResetView.as_view(
              template_name='password_reset.html',
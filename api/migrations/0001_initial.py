@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dataset', models.CharField(choices=[('meals', 'Meals'), ('workouts', 'Workouts'), ('moods', 'Moods')], help_text='The dataset the entry belonged to.', max_length=10)),
+                ('deleted_at', models.DateTimeField(auto_now=True, help_text='When the last entry was deleted.')),
+                ('user', models.ForeignKey(help_text='The user who deleted the entry.', on_delete=django.db.models.deletion.CASCADE, related_name='dataset_deletions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'dataset')},
+            },
+        ),
+    ]
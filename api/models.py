@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+
+class DatasetDeletion(models.Model):
+    """
+    When a user last deleted an entry of each dataset served by the API.
+    A deleted row leaves no updated_at behind, so this is what moves the
+    dataset's Last-Modified forward (see api/views.py).
+    """
+
+    DATASETS = [
+        ('meals', 'Meals'),
+        ('workouts', 'Workouts'),
+        ('moods', 'Moods'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='dataset_deletions',
+        help_text="The user who deleted the entry."
+    )
+    dataset = models.CharField(max_length=10, choices=DATASETS, help_text="The dataset the entry belonged to.")
+    deleted_at = models.DateTimeField(auto_now=True, help_text="When the last entry was deleted.")
+
+    class Meta:
+        unique_together = ('user', 'dataset')  # One row per user per dataset
+
+    def __str__(self):
+        return f"{self.user.username} last deleted {self.dataset} on {self.deleted_at.strftime('%d-%m-%Y %H:%M')}"
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete
+
+from FitTrack.signals import deleting_user
+from meals.models import Meal
+from moods.models import Mood
+from workouts.models import Workout
+
+from .models import DatasetDeletion
+
+DATASET_MODELS = {Meal: 'meals', Workout: 'workouts', Mood: 'moods'}
+
+
+def entry_deleted(sender, instance, origin=None, **kwargs):
+    if deleting_user(origin):
+        return
+    # Every row deleted by one delete() call shares its origin: record the
+    # deletion once per user and dataset for the whole call, not once per row
+    key = (instance.user_id, DATASET_MODELS[sender])
+    recorded = vars(origin).setdefault('_recorded_deletions', set()) if origin is not None else set()
+    if key in recorded:
+        return
+    recorded.add(key)
+    # Ingredient edits save their meal, so only the meals themselves need watching
+    DatasetDeletion.objects.bulk_create(
+        [DatasetDeletion(user_id=instance.user_id, dataset=key[1])],
+        update_conflicts=True,
+        unique_fields=['user', 'dataset'],
+        update_fields=['deleted_at'],
+    )
+
+
+for model in DATASET_MODELS:
+    post_delete.connect(entry_deleted, sender=model, dispatch_uid=f'api_post_delete_{model._meta.label}')
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from meals.ingredients import INGREDIENT_FIELDS, MEAL_TOTAL_FIELDS
+from meals.models import Ingredient, Meal
+from moods.models import Mood
+from workouts.models import Workout
+
+from .models import DatasetDeletion
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='mobile', password='pw')
+        other = User.objects.create_user(username='other', password='pw')
+        cls.meal = Meal.objects.create(user=cls.user, name='Lunch', **dict.fromkeys(MEAL_TOTAL_FIELDS, 100))
+        Ingredient.objects.create(meal=cls.meal, name='Rice', **dict.fromkeys(INGREDIENT_FIELDS, 100))
+        Workout.objects.create(
+            user=cls.user, workout_type=Workout.WorkoutType.RUNNING, duration=30, distance=5, pace=6, calories=300
+        )
+        cls.mood = Mood.objects.create(user=cls.user, mood=7)
+        cls.other_mood = Mood.objects.create(user=other, mood=3)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_lists_and_details(self):
+        meals = self.client.get(reverse('api-meals')).json()
+        self.assertEqual(meals['results'][0]['items'][0]['name'], 'Rice')
+        self.assertIsNone(meals['next'])
+        workout = self.client.get(reverse('api-workouts')).json()['results'][0]
+        self.assertEqual((workout['workout_type'], workout['distance']), ('Running', 5))
+        self.assertEqual(self.client.get(reverse('api-mood', args=[self.mood.pk])).json()['mood'], 7)
+        self.assertEqual(self.client.get(reverse('api-mood', args=[self.other_mood.pk])).status_code, 404)
+
+    def test_unchanged_polls_cost_one_query(self):
+        response = self.client.get(reverse('api-meals'))
+        # Session and user, then the dataset fingerprint
+        with self.assertNumQueries(3):
+            not_modified = self.client.get(reverse('api-meals'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(
+            self.client.get(reverse('api-meals'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+
+    def test_changes_and_deletions_change_the_etag(self):
+        etag = self.client.get(reverse('api-moods'))['ETag']
+        self.mood.delete()
+        response = self.client.get(reverse('api-moods'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+        Mood.objects.create(user=self.user, date=timezone.localdate(), mood=4)
+        self.assertEqual(self.client.get(reverse('api-moods'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_login_required(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api-moods')).status_code, 401)
+
+    def test_bulk_deletes_record_one_deletion(self):
+        today = timezone.localdate()
+        Mood.objects.bulk_create([
+            Mood(user=self.user, date=today - timedelta(days=days), mood=5) for days in range(1, 11)
+        ])
+        etag = self.client.get(reverse('api-moods'))['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            Mood.objects.filter(user=self.user, mood=5).delete()
+        deletion_queries = [query for query in context.captured_queries if 'api_datasetdeletion' in query['sql']]
+        self.assertEqual(len(deletion_queries), 1)
+        self.assertEqual(DatasetDeletion.objects.get().dataset, 'moods')
+
+        self.assertEqual(self.client.get(reverse('api-moods'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        # Other users' deletions are recorded separately
+        Mood.objects.all().delete()
+        self.assertEqual(sorted(DatasetDeletion.objects.values_list('user__username', flat=True)), ['mobile', 'other'])
+
+    def test_invalid_cursor(self):
+        for cursor in ('garbage', 'WzFd'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('api-meals'), {'after': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'Invalid page cursor.'})
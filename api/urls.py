@@ -0,0 +1,12 @@
+from django.urls import path
+
+from .views import DATASETS, DatasetDetailView, DatasetListView
+
+# /api/v1/meals/, /api/v1/meals/<pk>/ and the same for workouts and moods
+urlpatterns = []
+for dataset, (model, serialize) in DATASETS.items():
+    options = {'dataset': dataset, 'model': model, 'serialize': serialize}
+    urlpatterns += [
+        path(f'{dataset}/', DatasetListView.as_view(**options), name=f'api-{dataset}'),
+        path(f'{dataset}/<int:pk>/', DatasetDetailView.as_view(**options), name=f'api-{dataset[:-1]}'),
+    ]
@@ -0,0 +1,130 @@
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import Count, OuterRef, Subquery
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.generic import DetailView, ListView
+
+from FitTrack.pagination import InvalidCursor, KeysetPaginationMixin
+from meals.models import Meal
+from moods.models import Mood
+from users.export import MOOD_FIELDS, WORKOUT_FIELDS, WORKOUT_LABELS, meal_record
+from workouts.models import Workout
+
+from .models import DatasetDeletion
+
+User = get_user_model()
+
+
+def _record(obj, fields, labels=None):
+    record = {field: getattr(obj, field) for field in fields}
+    for field, choices in (labels or {}).items():
+        record[field] = choices.get(record[field], record[field])
+    record['date'] = obj.date.isoformat()
+    record['updated_at'] = obj.updated_at.isoformat()
+    return record
+
+
+def meal_json(meal):
+    # Same shape as the JSONL export and import (see users/export.py)
+    return {**meal_record(meal), 'updated_at': meal.updated_at.isoformat()}
+
+
+def workout_json(workout):
+    return _record(workout, WORKOUT_FIELDS, WORKOUT_LABELS)
+
+
+def mood_json(mood):
+    return _record(mood, MOOD_FIELDS)
+
+
+def dataset_fingerprint(user, dataset, model):
+    """
+    (entry count, latest updated_at, latest deletion) of one of the user's
+    datasets, in a single query: each value is a subquery over an index.
+    """
+    entries = model.objects.filter(user=OuterRef('pk')).order_by()
+    return User.objects.filter(pk=user.pk).values_list(
+        Subquery(entries.values('user').annotate(count=Count('pk')).values('count')),
+        Subquery(entries.order_by('-updated_at').values('updated_at')[:1]),
+        Subquery(
+            DatasetDeletion.objects.filter(user=OuterRef('pk'), dataset=dataset).values('deleted_at')[:1]
+        ),
+    ).get()
+
+
+class DatasetMixin(LoginRequiredMixin):
+    """
+    JSON views of one of the user's datasets that answer conditional GETs.
+
+    The ETag and Last-Modified come from dataset_fingerprint(), so a client
+    polling with If-None-Match or If-Modified-Since gets a 304 after a single
+    query when nothing changed, before anything is fetched or serialised.
+    """
+
+    dataset = None
+    model = None
+    serialize = None
+
+    def handle_no_permission(self):
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+
+    def get_queryset(self):
+        queryset = self.model.objects.filter(user=self.request.user)
+        if self.model is Meal:
+            queryset = queryset.prefetch_related('ingredients')
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        count, latest, deleted = dataset_fingerprint(request.user, self.dataset, self.model)
+        changes = [moment for moment in (latest, deleted) if moment is not None]
+        last_modified = int(max(changes).timestamp()) if changes else None
+        # The same dataset gives different bodies per URL (pages, single entries)
+        state = f'{request.user.pk}:{self.dataset}:{count}:{latest}:{deleted}:{request.get_full_path()}'
+        etag = quote_etag(hashlib.md5(state.encode()).hexdigest())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        response.headers['ETag'] = etag
+        if last_modified is not None:
+            response.headers['Last-Modified'] = http_date(last_modified)
+        # Browsers and proxies must check with us before reusing a response
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class DatasetListView(DatasetMixin, KeysetPaginationMixin, ListView):
+    """The user's entries, newest first, paginated with ?after= and ?before= cursors."""
+
+    paginate_by = 50
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return super().get(request, *args, **kwargs)
+        except InvalidCursor as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+    def render_to_response(self, context, **response_kwargs):
+        page = context['page_obj']
+        return JsonResponse({
+            'results': [self.serialize(obj) for obj in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
+
+
+class DatasetDetailView(DatasetMixin, DetailView):
+
+    def render_to_response(self, context, **response_kwargs):
+        return JsonResponse(self.serialize(self.object))
+
+
+DATASETS = {
+    'meals': (Meal, meal_json),
+    'workouts': (Workout, workout_json),
+    'moods': (Mood, mood_json),
+}
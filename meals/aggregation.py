@@ -0,0 +1,122 @@
+from dataclasses import dataclass, fields
+from datetime import date, datetime
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+# Nutrient names used across the app, mapped to the matching column on Meal
+NUTRIENT_FIELDS = {
+    'weight': 'total_weight',
+    'fat': 'total_total_fat',
+    'saturated_fat': 'total_saturated_fat',
+    'carbs': 'total_total_carbs',
+    'fiber': 'total_fiber',
+    'sugar': 'total_sugar',
+    'sodium': 'total_sodium',
+    'potassium': 'total_potassium',
+    'cholesterol': 'total_cholesterol',
+}
+
+# Supported group-by periods and the truncation function used for each
+GROUP_BY_PERIODS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+@dataclass
+class NutrientValues:
+    """One value per nutrient (grams, except sodium/potassium/cholesterol in mg)."""
+    weight: float = 0
+    fat: float = 0
+    saturated_fat: float = 0
+    carbs: float = 0
+    fiber: float = 0
+    sugar: float = 0
+    sodium: float = 0
+    potassium: float = 0
+    cholesterol: float = 0
+
+    def rounded(self, digits=1):
+        return NutrientValues(**{
+            f.name: round(getattr(self, f.name), digits) for f in fields(self)
+        })
+
+
+@dataclass
+class NutritionSummary:
+    """Totals and per-meal averages for a set of meals (optionally one period of it)."""
+    meal_count: int
+    totals: NutrientValues
+    averages: NutrientValues
+    period: date | datetime | None = None
+
+    def as_context(self):
+        """Flatten to the 'total_<nutrient>' / 'avg_<nutrient>' keys the templates use."""
+        context = {}
+        totals = self.totals.rounded()
+        averages = self.averages.rounded()
+        for name in NUTRIENT_FIELDS:
+            context[f'total_{name}'] = getattr(totals, name)
+            context[f'avg_{name}'] = getattr(averages, name)
+        return context
+
+
+def _aggregates(count):
+    """Sum of every nutrient column plus the meal count, as one set of SQL aggregates."""
+    aggregates = {name: Sum(column) for name, column in NUTRIENT_FIELDS.items()}
+    aggregates['meal_count'] = count
+    return aggregates
+
+
+def _build_summary(row, period=None):
+    # Averages are derived from the sums so every figure comes from the same row
+    meal_count = row['meal_count'] or 0
+    totals = NutrientValues(**{name: row[name] or 0 for name in NUTRIENT_FIELDS})
+    averages = NutrientValues(**{
+        name: (getattr(totals, name) / meal_count) if meal_count else 0
+        for name in NUTRIENT_FIELDS
+    })
+    return NutritionSummary(meal_count=meal_count, totals=totals, averages=averages, period=period)
+
+
+def _summarize(queryset, date_field, count, group_by):
+    if group_by is None:
+        return _build_summary(queryset.order_by().aggregate(**_aggregates(count)))
+
+    if group_by not in GROUP_BY_PERIODS:
+        raise ValueError(f"Unsupported group_by '{group_by}', expected one of {list(GROUP_BY_PERIODS)}.")
+
+    rows = (
+        queryset.order_by()
+        .annotate(period=GROUP_BY_PERIODS[group_by](date_field))
+        .values('period')
+        .annotate(**_aggregates(count))
+        .order_by('period')
+    )
+    return [_build_summary(row, period=row['period']) for row in rows]
+
+
+def summarize_meals(meals, group_by=None):
+    """
+    Aggregate a Meal queryset in a single query.
+
+    Without group_by, returns one NutritionSummary for the whole queryset.
+    With group_by ('day', 'week' or 'month'), returns a list of summaries,
+    one per period, oldest first.
+    """
+    return _summarize(meals, 'date', Count('pk'), group_by)
+
+
+async def asummarize_daily_summaries(summaries):
+    """summarize_daily_summaries() without group_by, for async views."""
+    return _build_summary(await summaries.order_by().aaggregate(**_aggregates(Sum('meal_count'))))
+
+
+def summarize_daily_summaries(summaries, group_by=None):
+    """
+    Same as summarize_meals, but reads a MealDailySummary queryset,
+    so the cost depends on the number of days rather than the number of meals.
+    """
+    return _summarize(summaries, 'day', Sum('meal_count'), group_by)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MealsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'meals'
+
+    def ready(self):
+        # Invalidates the cached pages built from meals
+        from . import signals  # noqa: F401
@@ -0,0 +1,154 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import Food
+from .nutrition import normalize_query
+
+# Trigrams shared by more foods than this are skipped when ranking fuzzy matches:
+# they barely discriminate and would make every query walk most of the catalog
+MAX_POSTING_LENGTH = 2000
+
+# Prefixes this short match most of the catalog: their best matches are ranked
+# once per index and kept, up to this many
+SHORT_PREFIX_LENGTH = 2
+MAX_SHORT_PREFIX_MATCHES = 50
+
+# Sorts after any character a suffix can continue with
+END_OF_PREFIX = '\U0010ffff'
+
+
+def trigrams(text):
+    """Character trigrams of a normalised name, padded so word starts and ends count."""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodIndex:
+    """
+    In-memory search index over the Food catalog.
+
+    Prefix search uses a sorted list of every word-start suffix of every name
+    ('chicken breast' is found by 'chi' and by 'bre'), so the matches of a
+    query are one contiguous range, found with two bisects. Fuzzy search ranks
+    names by the share of trigrams they have in common with the query, using
+    an inverted index.
+    """
+
+    def __init__(self, foods):
+        # foods: iterable of (name, popularity), names already normalised
+        self.names = []
+        self.popularity = []
+        self.gram_counts = []
+        self.suffixes = []
+        self.postings = {}
+        for food_id, (name, popularity) in enumerate(foods):
+            self.names.append(name)
+            self.popularity.append(popularity)
+            start = 0
+            for word in name.split(' '):
+                self.suffixes.append((name[start:], food_id))
+                start += len(word) + 1
+            grams = trigrams(name)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(food_id)
+        self.suffixes.sort()
+        self.short_prefixes = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def prefix(self, query, limit):
+        """
+        Foods with a word starting with the query: the exact match first, then
+        names starting with the query, then the others, each by popularity.
+        """
+        if len(query) > SHORT_PREFIX_LENGTH or limit > MAX_SHORT_PREFIX_MATCHES:
+            return self._rank_prefix(query, limit)
+        if query not in self.short_prefixes:
+            self.short_prefixes[query] = self._rank_prefix(query, MAX_SHORT_PREFIX_MATCHES)
+        return self.short_prefixes[query][:limit]
+
+    def _rank_prefix(self, query, limit):
+        start = bisect_left(self.suffixes, (query,))
+        end = bisect_left(self.suffixes, (query + END_OF_PREFIX,), start)
+        tiers = {}
+        for index in range(start, end):
+            suffix, food_id = self.suffixes[index]
+            name = self.names[food_id]
+            if len(suffix) != len(name):
+                tier = 2
+            else:
+                tier = 0 if len(name) == len(query) else 1
+            tiers[food_id] = min(tier, tiers.get(food_id, tier))
+        best = heapq.nsmallest(
+            limit, tiers, key=lambda food_id: (tiers[food_id], -self.popularity[food_id], self.names[food_id]),
+        )
+        return [self.names[food_id] for food_id in best]
+
+    def fuzzy(self, query, limit, exclude=()):
+        """Foods sharing the most trigrams with the query (tolerates typos)."""
+        grams = trigrams(query)
+        postings = [self.postings[gram] for gram in grams if gram in self.postings]
+        selective = [posting for posting in postings if len(posting) <= MAX_POSTING_LENGTH]
+        shared = Counter()
+        for posting in selective or postings:
+            shared.update(posting)
+
+        def score(food_id):
+            common = shared[food_id]
+            # Jaccard similarity of the two trigram sets
+            return common / (len(grams) + self.gram_counts[food_id] - common)
+
+        candidates = (food_id for food_id in shared if self.names[food_id] not in exclude)
+        best = heapq.nlargest(limit, candidates, key=lambda food_id: (score(food_id), self.popularity[food_id]))
+        return [self.names[food_id] for food_id in best if score(food_id) >= 0.2]
+
+    def search(self, query, limit=10):
+        """Prefix matches, topped up with fuzzy matches when there aren't enough."""
+        query = normalize_query(query)
+        if not query:
+            return []
+        results = self.prefix(query, limit)
+        if len(results) < limit and len(query) >= 3:
+            results += self.fuzzy(query, limit - len(results), exclude=set(results))
+        return results
+
+
+_index = None
+_fingerprint = None
+_checked_at = 0
+_lock = threading.Lock()
+
+
+def _catalog_fingerprint():
+    # build_food_catalog updates existing foods (their popularity) as well as adding new ones
+    return Food.objects.aggregate(count=Count('pk'), last=Max('pk'), updated=Max('updated_at'))
+
+
+def get_index():
+    """
+    The process-wide FoodIndex, rebuilt when the catalog changes. The catalog
+    is checked at most once every settings.FOOD_INDEX_REFRESH seconds.
+    """
+    global _index, _fingerprint, _checked_at
+    if _index is not None and time.monotonic() - _checked_at < settings.FOOD_INDEX_REFRESH:
+        return _index
+    with _lock:
+        if _index is None or time.monotonic() - _checked_at >= settings.FOOD_INDEX_REFRESH:
+            fingerprint = _catalog_fingerprint()
+            if _index is None or fingerprint != _fingerprint:
+                _index = FoodIndex(Food.objects.order_by('pk').values_list('name', 'popularity').iterator())
+                _fingerprint = fingerprint
+            _checked_at = time.monotonic()
+    return _index
+
+
+def search_foods(query, limit=10):
+    return get_index().search(query, limit)
@@ -0,0 +1,222 @@
+import csv
+import json
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from FitTrack.cache import bump_version
+from pages import activity
+
+from . import rollups
+from .ingredients import INGREDIENT_FIELDS, MEAL_TOTAL_FIELDS, ingredient_values
+from .models import Ingredient, Meal
+
+FORMATS = ('csv', 'jsonl')
+
+# Keep at most this many errors in a report, so a bad file can't use unbounded memory
+MAX_REPORTED_ERRORS = 1000
+
+
+class InvalidRow(Exception):
+    pass
+
+
+@dataclass
+class ImportReport:
+    """What an import run did: created rows, per-row errors and throughput."""
+    meals_created: int = 0
+    ingredients_created: int = 0
+    rows_read: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+    seconds: float = 0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.seconds if self.seconds else 0
+
+    def as_dict(self):
+        return {
+            'meals_created': self.meals_created,
+            'ingredients_created': self.ingredients_created,
+            'rows_read': self.rows_read,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def guess_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_jsonl(lines, report):
+    """One meal per line: {"meal_name", "date", "items": [...], "totals" (optional)}."""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        report.rows_read += 1
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            report.add_error(line_number, f"Invalid JSON: {e}")
+
+
+def read_csv(lines, report):
+    """
+    One ingredient per row, with the columns date, meal_name, name, then the
+    nutrient columns (weight, fat_total_g, ...). Consecutive rows with the same
+    date and meal_name are the ingredients of one meal. Exported files also have
+    a meal_id column, which keeps apart different meals with the same name and date.
+    """
+    meal = meal_key = meal_line = None
+    # Line 1 is the header row
+    for line_number, row in enumerate(csv.DictReader(lines), start=2):
+        report.rows_read += 1
+        key = (row.get('meal_id') or None, row.get('date'), row.get('meal_name'))
+        if key != meal_key:
+            if meal is not None:
+                yield meal_line, meal
+            meal, meal_key, meal_line = {'date': key[1], 'meal_name': key[2], 'items': []}, key, line_number
+        meal['items'].append(row)
+    if meal is not None:
+        yield meal_line, meal
+
+
+def _number(value, name):
+    if value is None or value == '':
+        raise InvalidRow(f"Missing '{name}'.")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise InvalidRow(f"'{name}' must be a number, got {value!r}.")
+    # float() also accepts 'nan' and 'inf', which can't be stored
+    if not math.isfinite(number):
+        raise InvalidRow(f"'{name}' must be a finite number, got {value!r}.")
+    if number < 0:
+        raise InvalidRow(f"'{name}' can't be negative.")
+    return number
+
+
+def _name(value, what):
+    name = str(value or '').strip()
+    if not name:
+        raise InvalidRow(f"Missing {what}.")
+    if len(name) > 100:
+        raise InvalidRow(f"{what.capitalize()} is longer than 100 characters.")
+    return name
+
+
+def _date(value):
+    if not value:
+        return timezone.now()
+    value = str(value).strip()
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise InvalidRow(f"Invalid date {value!r}, expected ISO 8601 (e.g. 2024-05-01T12:30).")
+            parsed = datetime.combine(day, datetime.min.time())
+    except ValueError:
+        # Well formed but impossible, like 2024-02-30
+        raise InvalidRow(f"Invalid date {value!r}, no such day or time.")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def build_meal(user, record):
+    """Validated, unsaved Meal and Ingredient objects for one meal record."""
+    if not isinstance(record, dict):
+        raise InvalidRow("Expected a JSON object.")
+    items = record.get('items')
+    if not isinstance(items, list) or not items:
+        raise InvalidRow("A meal needs at least one item.")
+
+    ingredients = []
+    item_totals = dict.fromkeys(INGREDIENT_FIELDS.values(), 0)
+    for item in items:
+        if not isinstance(item, dict):
+            raise InvalidRow("Each item must be an object.")
+        values = {key: _number(item.get(key), key) for key in INGREDIENT_FIELDS.values()}
+        for key, value in values.items():
+            item_totals[key] += value
+        ingredients.append(Ingredient(name=_name(item.get('name'), 'ingredient name'), **ingredient_values(values)))
+
+    # Totals are optional: when missing they are the sum of the items
+    totals = record.get('totals') or {}
+    meal = Meal(
+        user=user,
+        name=_name(record.get('meal_name'), 'meal name'),
+        date=_date(record.get('date')),
+        **{
+            column: _number(totals[key], key) if key in totals else item_totals[key]
+            for column, key in MEAL_TOTAL_FIELDS.items()
+        },
+    )
+    return meal, ingredients
+
+
+def _save_batch(user, batch, report):
+    with transaction.atomic():
+        # bulk_create sets the primary keys on the meals, so ingredients can point to them
+        meals = Meal.objects.bulk_create([meal for meal, _ in batch])
+        ingredients = []
+        for meal, meal_ingredients in batch:
+            for ingredient in meal_ingredients:
+                ingredient.meal = meal
+                ingredients.append(ingredient)
+        Ingredient.objects.bulk_create(ingredients, batch_size=1000)
+
+        # Recompute the daily rollup over the days this batch touched
+        days = [rollups.meal_day(meal) for meal in meals]
+        rollups.rebuild_daily_summaries(users=[user], first_day=min(days), last_day=max(days))
+        # bulk_create() sends no signals, so mark the days on the activity calendar
+        # and invalidate the cached pages built from meals here
+        activity.mark_days(user.pk, 'meals', set(days))
+        bump_version('meals', user.pk)
+
+    report.meals_created += len(meals)
+    report.ingredients_created += len(ingredients)
+
+
+def import_meals(user, lines, file_format, batch_size=500):
+    """
+    Import meals for a user from an iterable of text lines (an open file),
+    without loading it all in memory: meals are validated one at a time and
+    written batch_size at a time, each batch in its own transaction.
+    Invalid meals are skipped and reported with their line number.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unsupported format '{file_format}', expected one of {FORMATS}.")
+    started = time.perf_counter()
+    report = ImportReport()
+    records = read_csv(lines, report) if file_format == 'csv' else read_jsonl(lines, report)
+
+    batch = []
+    for line_number, record in records:
+        try:
+            batch.append(build_meal(user, record))
+        except InvalidRow as e:
+            report.add_error(line_number, str(e))
+            continue
+        if len(batch) >= batch_size:
+            _save_batch(user, batch, report)
+            batch = []
+    if batch:
+        _save_batch(user, batch, report)
+
+    report.seconds = time.perf_counter() - started
+    return report
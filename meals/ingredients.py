@@ -0,0 +1,79 @@
+from .models import Ingredient
+
+# Ingredient model fields mapped to their key in the JSON sent by the meal form
+INGREDIENT_FIELDS = {
+    'weight': 'weight',
+    'total_fat': 'fat_total_g',
+    'saturated_fat': 'fat_saturated_g',
+    'total_carbs': 'carbohydrates_total_g',
+    'fiber': 'fiber_g',
+    'sugar': 'sugar_g',
+    'sodium': 'sodium_mg',
+    'potassium': 'potassium_mg',
+    'cholesterol': 'cholesterol_mg',
+}
+
+# Meal total columns mapped to the matching key of the meal data 'totals'
+MEAL_TOTAL_FIELDS = {
+    'total_weight': 'weight',
+    'total_total_fat': 'fat_total_g',
+    'total_saturated_fat': 'fat_saturated_g',
+    'total_total_carbs': 'carbohydrates_total_g',
+    'total_fiber': 'fiber_g',
+    'total_sugar': 'sugar_g',
+    'total_sodium': 'sodium_mg',
+    'total_potassium': 'potassium_mg',
+    'total_cholesterol': 'cholesterol_mg',
+}
+
+
+def ingredient_values(item):
+    """Model field values for one food item of the submitted meal data."""
+    return {field: item[key] for field, key in INGREDIENT_FIELDS.items()}
+
+
+def create_ingredients(meal, items):
+    """Insert all the ingredients of a new meal in a single query."""
+    Ingredient.objects.bulk_create(
+        [Ingredient(meal=meal, name=item['name'], **ingredient_values(item)) for item in items]
+    )
+
+
+def sync_ingredients(meal, items):
+    """
+    Bring a meal's stored ingredients in line with the submitted items, only
+    touching rows that changed: one select, then at most one delete, one update and one insert.
+    """
+    # Stored ingredients grouped by name, so submitted items can be paired with them
+    stored_by_name = {}
+    for ingredient in meal.ingredients.all():
+        stored_by_name.setdefault(ingredient.name, []).append(ingredient)
+
+    to_create = []
+    to_update = []
+    for item in items:
+        values = ingredient_values(item)
+        candidates = stored_by_name.get(item['name'])
+        if not candidates:
+            to_create.append(Ingredient(meal=meal, name=item['name'], **values))
+            continue
+
+        # Prefer an identical stored row, otherwise reuse any row with the same name
+        ingredient = next(
+            (c for c in candidates if all(getattr(c, f) == v for f, v in values.items())),
+            candidates[0],
+        )
+        candidates.remove(ingredient)
+        if any(getattr(ingredient, f) != v for f, v in values.items()):
+            for field, value in values.items():
+                setattr(ingredient, field, value)
+            to_update.append(ingredient)
+
+    # Whatever wasn't paired with a submitted item has been removed from the meal
+    to_delete = [ingredient.pk for candidates in stored_by_name.values() for ingredient in candidates]
+    if to_delete:
+        Ingredient.objects.filter(pk__in=to_delete).delete()
+    if to_update:
+        Ingredient.objects.bulk_update(to_update, list(INGREDIENT_FIELDS))
+    if to_create:
+        Ingredient.objects.bulk_create(to_create)
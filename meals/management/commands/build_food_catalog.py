@@ -0,0 +1,99 @@
+import csv
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Lower
+
+from meals.models import Food, Ingredient
+from meals.nutrition import normalize_query
+
+# Food fields (nutrients per 100g) mapped to the matching Ingredient field
+NUTRIENT_FIELDS = {
+    'fat_total_g': 'total_fat',
+    'fat_saturated_g': 'saturated_fat',
+    'carbohydrates_total_g': 'total_carbs',
+    'fiber_g': 'fiber',
+    'sugar_g': 'sugar',
+    'sodium_mg': 'sodium',
+    'potassium_mg': 'potassium',
+    'cholesterol_mg': 'cholesterol',
+}
+
+
+def read_dataset(path):
+    """Yield one dict per food from a CSV file (with a header row) or a JSONL file."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if Path(path).suffix.lower() in ('.jsonl', '.ndjson'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def to_float(value):
+    if value in (None, ''):
+        return None
+    return float(value)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the food catalog used by the autocomplete endpoint from the logged "
+        "ingredients, plus optional nutrient datasets (CSV or JSONL with a 'name' "
+        "column and nutrients per 100g named like the nutrition API fields)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('datasets', nargs='*', help="Nutrient dataset files to import.")
+
+    def handle(self, *args, **options):
+        catalog = {}
+
+        # Every distinct ingredient name, with per-100g values averaged over all the times it was logged
+        rows = (
+            Ingredient.objects.order_by()
+            .values(lower_name=Lower('name'))
+            .annotate(
+                logged=Count('pk'),
+                total_weight=Sum('weight'),
+                **{field: Sum(column) for field, column in NUTRIENT_FIELDS.items()},
+            )
+        )
+        for row in rows.iterator():
+            name = normalize_query(row['lower_name'])[:100]
+            if not name:
+                continue
+            food = catalog.setdefault(name, {'source': 'ingredient', 'popularity': 0})
+            food['popularity'] += row['logged']
+            if row['total_weight']:
+                for field in NUTRIENT_FIELDS:
+                    food[field] = row[field] / row['total_weight'] * 100
+
+        for path in options['datasets']:
+            line_number = 0
+            try:
+                for line_number, record in enumerate(read_dataset(path), start=1):
+                    name = normalize_query(record.get('name') or '')[:100]
+                    if not name:
+                        continue
+                    food = catalog.setdefault(name, {'popularity': 0})
+                    food['source'] = 'dataset'
+                    for field in NUTRIENT_FIELDS:
+                        food[field] = to_float(record.get(field))
+            except (OSError, ValueError) as e:
+                raise CommandError(f"{path}, entry {line_number}: {e}")
+
+        with transaction.atomic():
+            Food.objects.bulk_create(
+                (Food(name=name, **values) for name, values in catalog.items()),
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['name'],
+                update_fields=['source', 'popularity', *NUTRIENT_FIELDS, 'updated_at'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Food catalog now has {Food.objects.count()} foods."))
@@ -0,0 +1,44 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from meals.importers import FORMATS, guess_format, import_meals
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Import meals for a user from a CSV file (one ingredient per row, with date, "
+        "meal_name, name and the nutrient columns) or a JSONL file (one meal per line)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="User the meals belong to.")
+        parser.add_argument('path', help="File to import.")
+        parser.add_argument('--format', choices=FORMATS, help="File format (guessed from the extension by default).")
+        parser.add_argument('--batch-size', type=int, default=500, help="Meals written per transaction.")
+        parser.add_argument('--errors', action='store_true', help="Print every reported error as JSON.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user '{options['username']}'.")
+
+        file_format = options['format'] or guess_format(options['path'])
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as f:
+                report = import_meals(user, f, file_format, batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        if options['errors']:
+            for error in report.errors:
+                self.stdout.write(json.dumps(error))
+        self.stdout.write(
+            f"Read {report.rows_read} rows in {report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s): "
+            f"{report.meals_created} meals and {report.ingredients_created} ingredients created, "
+            f"{report.error_count} errors."
+        )
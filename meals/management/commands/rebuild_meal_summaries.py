@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from FitTrack.cache import bump_versions
+from meals.rollups import rebuild_daily_summaries
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild the MealDailySummary rollup from the Meal table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help="Only rebuild summaries for this username (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = list(User.objects.filter(username__in=options['usernames']))
+            missing = set(options['usernames']) - {user.username for user in users}
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+
+        with transaction.atomic():
+            written = rebuild_daily_summaries(users=users)
+            # The cached pages built from the rollup may be out of date
+            bump_versions('meals', [user.pk for user in users] if users else User.objects.values_list('pk', flat=True))
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} daily meal summaries."))
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+ROLLUP_COLUMNS = [
+    'total_weight', 'total_total_fat', 'total_saturated_fat', 'total_total_carbs', 'total_fiber',
+    'total_sugar', 'total_sodium', 'total_potassium', 'total_cholesterol',
+]
+
+
+def build_summaries(apps, schema_editor):
+    """Fill the rollup for meals logged before it existed."""
+    Meal = apps.get_model('meals', 'Meal')
+    MealDailySummary = apps.get_model('meals', 'MealDailySummary')
+    rows = (
+        Meal.objects.order_by()
+        .annotate(day=TruncDate('date'))
+        .values('user_id', 'day')
+        .annotate(meal_count=Count('pk'), **{column: Sum(column) for column in ROLLUP_COLUMNS})
+    )
+    MealDailySummary.objects.bulk_create((MealDailySummary(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meals', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MealDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Day the meals were logged.')),
+                ('meal_count', models.PositiveIntegerField(default=0, help_text='Number of meals logged that day.')),
+                ('total_weight', models.FloatField(default=0, help_text="Total weight of the day's meals (g).")),
+                ('total_total_fat', models.FloatField(default=0, help_text='Total fat (g).', verbose_name='Total Fat')),
+                ('total_saturated_fat', models.FloatField(default=0, help_text='Saturated fat (g).', verbose_name='Saturated Fat')),
+                ('total_total_carbs', models.FloatField(default=0, help_text='Total carbohydrates (g).', verbose_name='Total Carbs')),
+                ('total_fiber', models.FloatField(default=0, help_text='Dietary fiber (g).', verbose_name='Fiber')),
+                ('total_sugar', models.FloatField(default=0, help_text='Sugar (g).', verbose_name='Sugar')),
+                ('total_sodium', models.FloatField(default=0, help_text='Sodium (mg).', verbose_name='Sodium')),
+                ('total_potassium', models.FloatField(default=0, help_text='Potassium (mg).', verbose_name='Potassium')),
+                ('total_cholesterol', models.FloatField(default=0, help_text='Cholesterol (mg).', verbose_name='Cholesterol')),
+                ('user', models.ForeignKey(help_text='The user these meals belong to.', on_delete=django.db.models.deletion.CASCADE, related_name='meal_daily_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-day'],
+                'unique_together': {('user', 'day')},
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:58
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meals', '0002_mealdailysummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NutritionLookup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(help_text='Normalised food query (lower case, single spaces).', max_length=200, unique=True)),
+                ('result', models.JSONField(blank=True, help_text="Nutrients per 100g returned by the API, or empty if the food wasn't found.", null=True)),
+                ('fetched_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, help_text='When the API was last asked about this food.')),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meals', '0003_nutritionlookup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Food',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Normalised food name (lower case, single spaces).', max_length=100, unique=True)),
+                ('source', models.CharField(choices=[('ingredient', 'Logged ingredient'), ('dataset', 'Imported dataset')], help_text='Where this food came from.', max_length=20)),
+                ('popularity', models.PositiveIntegerField(default=0, help_text='How many times it was logged as an ingredient.')),
+                ('fat_total_g', models.FloatField(blank=True, help_text='Fat per 100g (g).', null=True, verbose_name='Total Fat')),
+                ('fat_saturated_g', models.FloatField(blank=True, help_text='Saturated fat per 100g (g).', null=True, verbose_name='Saturated Fat')),
+                ('carbohydrates_total_g', models.FloatField(blank=True, help_text='Carbohydrates per 100g (g).', null=True, verbose_name='Total Carbs')),
+                ('fiber_g', models.FloatField(blank=True, help_text='Fiber per 100g (g).', null=True, verbose_name='Fiber')),
+                ('sugar_g', models.FloatField(blank=True, help_text='Sugar per 100g (g).', null=True, verbose_name='Sugar')),
+                ('sodium_mg', models.FloatField(blank=True, help_text='Sodium per 100g (mg).', null=True, verbose_name='Sodium')),
+                ('potassium_mg', models.FloatField(blank=True, help_text='Potassium per 100g (mg).', null=True, verbose_name='Potassium')),
+                ('cholesterol_mg', models.FloatField(blank=True, help_text='Cholesterol per 100g (mg).', null=True, verbose_name='Cholesterol')),
+            ],
+        ),
+    ]
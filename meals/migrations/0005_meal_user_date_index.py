@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meals', '0004_food'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['user', 'date', 'id'], name='meal_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meals', '0005_meal_user_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meal',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='When the meal was last saved.'),
+        ),
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['user', 'updated_at'], name='meal_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meals', '0006_meal_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='food',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='When the food was last built or updated.'),
+        ),
+    ]
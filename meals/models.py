@@ -33,12 +33,21 @@ class Meal(models.Model):
     total_sodium = models.FloatField(verbose_name='Sodium', help_text="Sodium (mg).")
     total_potassium = models.FloatField(verbose_name='Potassium', help_text="Potassium (mg).")
     total_cholesterol = models.FloatField(verbose_name='Cholesterol', help_text="Cholesterol (mg).")
+    updated_at = models.DateTimeField(auto_now=True, help_text="When the meal was last saved.")
     
     # class Meta:
     #     db_table = 'meals_logged'
     #     ordering = ['-date']
     #     verbose_name = 'Meal Log'
     #     verbose_name_plural = 'Meal Logs'
+
+    class Meta:
+        indexes = [
+            # Lists, detail navigation and date ranges all filter by user and walk (date, id)
+            models.Index(fields=['user', 'date', 'id'], name='meal_user_date_idx'),
+            # Latest change of a user's meals, for the API's ETag and Last-Modified
+            models.Index(fields=['user', 'updated_at'], name='meal_user_updated_idx'),
+        ]
     
     def __str__(self):
         return f"Meal '{self.name}' by {self.user.username} on {self.date.strftime('%d-%m-%Y')}"
@@ -77,4 +86,96 @@ class Ingredient(models.Model):
     #     verbose_name_plural = 'Logged Ingredients'
 
     def __str__(self):
-        return f"Ingredient '{self.name}' in Meal: {self.meal.name}"
\ No newline at end of file
+        return f"Ingredient '{self.name}' in Meal: {self.meal.name}"
+
+# --- DAILY SUMMARY MODEL (Rollup of Meal) ---
+class MealDailySummary(models.Model):
+    """
+    Per-user, per-day rollup of the Meal table. Kept in step with Meal by the
+    meal views (see meals/rollups.py) so statistics can be read per day instead of per meal.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='meal_daily_summaries',
+        help_text="The user these meals belong to."
+    )
+    day = models.DateField(help_text="Day the meals were logged.")
+    meal_count = models.PositiveIntegerField(default=0, help_text="Number of meals logged that day.")
+    total_weight = models.FloatField(default=0, help_text="Total weight of the day's meals (g).")
+    total_total_fat = models.FloatField(default=0, verbose_name='Total Fat', help_text="Total fat (g).")
+    total_saturated_fat = models.FloatField(default=0, verbose_name='Saturated Fat', help_text="Saturated fat (g).")
+    total_total_carbs = models.FloatField(default=0, verbose_name='Total Carbs', help_text="Total carbohydrates (g).")
+    total_fiber = models.FloatField(default=0, verbose_name='Fiber', help_text="Dietary fiber (g).")
+    total_sugar = models.FloatField(default=0, verbose_name='Sugar', help_text="Sugar (g).")
+    total_sodium = models.FloatField(default=0, verbose_name='Sodium', help_text="Sodium (mg).")
+    total_potassium = models.FloatField(default=0, verbose_name='Potassium', help_text="Potassium (mg).")
+    total_cholesterol = models.FloatField(default=0, verbose_name='Cholesterol', help_text="Cholesterol (mg).")
+
+    class Meta:
+        ordering = ['-day']
+        unique_together = ('user', 'day')  # One summary per user per day
+
+    def __str__(self):
+        return f"{self.meal_count} meal(s) for {self.user.username} on {self.day.strftime('%d-%m-%Y')}"
+
+
+# --- NUTRITION LOOKUP MODEL (Cache of the nutrition API) ---
+class NutritionLookup(models.Model):
+    """
+    Persistent cache of nutrition API answers, one row per normalised food query.
+    Rows older than settings.NUTRITION_CACHE_TTL are treated as missing (see meals/nutrition.py).
+    """
+
+    query = models.CharField(
+        max_length=200,
+        unique=True,
+        help_text="Normalised food query (lower case, single spaces)."
+    )
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Nutrients per 100g returned by the API, or empty if the food wasn't found."
+    )
+    fetched_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        help_text="When the API was last asked about this food."
+    )
+
+    def __str__(self):
+        return f"Nutrition lookup '{self.query}'"
+
+
+# --- FOOD MODEL (Catalog used for autocomplete) ---
+class Food(models.Model):
+    """
+    Catalog of known foods, built from logged ingredients and imported nutrient datasets
+    (see the build_food_catalog command). Searched through the in-memory index in meals/catalog.py.
+    """
+
+    SOURCE_CHOICES = [
+        ('ingredient', 'Logged ingredient'),
+        ('dataset', 'Imported dataset'),
+    ]
+
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Normalised food name (lower case, single spaces)."
+    )
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, help_text="Where this food came from.")
+    popularity = models.PositiveIntegerField(default=0, help_text="How many times it was logged as an ingredient.")
+    fat_total_g = models.FloatField(null=True, blank=True, verbose_name='Total Fat', help_text="Fat per 100g (g).")
+    fat_saturated_g = models.FloatField(null=True, blank=True, verbose_name='Saturated Fat', help_text="Saturated fat per 100g (g).")
+    carbohydrates_total_g = models.FloatField(null=True, blank=True, verbose_name='Total Carbs', help_text="Carbohydrates per 100g (g).")
+    fiber_g = models.FloatField(null=True, blank=True, verbose_name='Fiber', help_text="Fiber per 100g (g).")
+    sugar_g = models.FloatField(null=True, blank=True, verbose_name='Sugar', help_text="Sugar per 100g (g).")
+    sodium_mg = models.FloatField(null=True, blank=True, verbose_name='Sodium', help_text="Sodium per 100g (mg).")
+    potassium_mg = models.FloatField(null=True, blank=True, verbose_name='Potassium', help_text="Potassium per 100g (mg).")
+    cholesterol_mg = models.FloatField(null=True, blank=True, verbose_name='Cholesterol', help_text="Cholesterol per 100g (mg).")
+    updated_at = models.DateTimeField(auto_now=True, help_text="When the food was last built or updated.")
+
+    def __str__(self):
+        return f"Food '{self.name}'"
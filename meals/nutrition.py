@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import NutritionLookup
+
+
+class NutritionServiceError(Exception):
+    """The upstream nutrition API could not be reached or returned an error."""
+
+
+def normalize_query(food):
+    """Cache key for a food name: 'Banana ' and 'banana' are the same lookup."""
+    return ' '.join(food.lower().split())
+
+
+class ApiNinjasClient:
+    """Looks foods up on api-ninjas.com. Results are nutrients per 100g."""
+
+    url = 'https://api.api-ninjas.com/v1/nutrition'
+
+    def __init__(self, api_key=None, timeout=10, max_workers=8):
+        self.api_key = api_key or settings.NUTRITION_API_KEY
+        self.timeout = timeout
+        self.max_workers = max_workers
+
+    def fetch(self, query):
+        """Nutrients for one food, or None if the API doesn't know it."""
+        try:
+            response = requests.get(
+                self.url,
+                params={'query': query},
+                headers={'X-Api-Key': self.api_key},
+                timeout=self.timeout,
+            )
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise NutritionServiceError(str(e)) from e
+        if isinstance(data, dict) and data.get('error'):
+            raise NutritionServiceError(data['error'])
+        if not isinstance(data, list):
+            raise NutritionServiceError(f'Unexpected response from the nutrition API: {data!r}')
+        return data[0] if data else None
+
+    def fetch_many(self, queries):
+        """
+        Look up several foods concurrently, in batches of max_workers requests.
+        Returns {query: result}, and {query: NutritionServiceError} for failed lookups.
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {query: pool.submit(self.fetch, query) for query in queries}
+            for query, future in futures.items():
+                try:
+                    results[query] = future.result()
+                except NutritionServiceError as e:
+                    results[query] = e
+        return results
+
+
+class StaticNutritionClient:
+    """Offline client answering from a fixed {food: result} mapping, for tests and local development."""
+
+    def __init__(self, foods=None):
+        self.foods = {normalize_query(food): result for food, result in (foods or {}).items()}
+        self.requested = []
+
+    def fetch_many(self, queries):
+        self.requested.extend(queries)
+        return {query: self.foods.get(query) for query in queries}
+
+
+def get_client():
+    """The upstream client configured by settings.NUTRITION_CLIENT (a dotted path)."""
+    return import_string(settings.NUTRITION_CLIENT)()
+
+
+def lookup_foods(foods, client=None):
+    """
+    Resolve food names to nutrients per 100g.
+
+    Fresh cache rows are used as they are; only the remaining foods go to the
+    upstream client, all in one fetch_many() call. Returns {food: result}, where
+    result is the nutrient dict, None when the food is unknown, or a
+    NutritionServiceError when the upstream failed (those are not cached).
+    """
+    queries = {food: normalize_query(food) for food in foods}
+    wanted = set(queries.values())
+
+    cutoff = timezone.now() - timedelta(seconds=settings.NUTRITION_CACHE_TTL)
+    cached = dict(
+        NutritionLookup.objects.filter(query__in=wanted, fetched_at__gte=cutoff)
+        .values_list('query', 'result')
+    )
+
+    misses = sorted(wanted - cached.keys())
+    if misses:
+        fetched = (client or get_client()).fetch_many(misses)
+        now = timezone.now()
+        found = [
+            NutritionLookup(query=query, result=result, fetched_at=now)
+            for query, result in fetched.items()
+            if not isinstance(result, NutritionServiceError)
+        ]
+        # Evict expired rows, then insert or refresh the new answers in one statement
+        NutritionLookup.objects.filter(fetched_at__lt=cutoff).delete()
+        NutritionLookup.objects.bulk_create(
+            found,
+            update_conflicts=True,
+            unique_fields=['query'],
+            update_fields=['result', 'fetched_at'],
+        )
+        cached.update(fetched)
+
+    return {food: cached[query] for food, query in queries.items()}
@@ -0,0 +1,82 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .aggregation import NUTRIENT_FIELDS
+from .models import Meal, MealDailySummary
+
+# Nutrient columns shared by Meal and MealDailySummary
+ROLLUP_COLUMNS = list(NUTRIENT_FIELDS.values())
+
+
+def meal_day(meal):
+    """The day a meal counts towards, in the current time zone."""
+    return timezone.localdate(meal.date)
+
+
+def snapshot(meal):
+    """The values of a meal the rollup depends on, taken before the meal is edited."""
+    return {'day': meal_day(meal), **{column: getattr(meal, column) for column in ROLLUP_COLUMNS}}
+
+
+def _apply(user_id, day, count_delta, deltas):
+    summary, _ = MealDailySummary.objects.get_or_create(user_id=user_id, day=day)
+    # F() expressions so concurrent saves for the same day can't overwrite each other
+    MealDailySummary.objects.filter(pk=summary.pk).update(
+        meal_count=F('meal_count') + count_delta,
+        **{column: F(column) + delta for column, delta in deltas.items()},
+    )
+    if count_delta < 0:
+        MealDailySummary.objects.filter(pk=summary.pk, meal_count__lte=0).delete()
+
+
+def add_meal(meal):
+    """Add a saved meal's totals to its day. Call inside the transaction that saves the meal."""
+    _apply(meal.user_id, meal_day(meal), 1, {column: getattr(meal, column) for column in ROLLUP_COLUMNS})
+
+
+def remove_meal(meal):
+    """Take a meal's totals back out of its day. Call inside the transaction that deletes the meal."""
+    _apply(meal.user_id, meal_day(meal), -1, {column: -getattr(meal, column) for column in ROLLUP_COLUMNS})
+
+
+def change_meal(before, meal):
+    """Apply an edit to the rollup, given the snapshot() taken before the meal was changed."""
+    if before['day'] != meal_day(meal):
+        _apply(meal.user_id, before['day'], -1, {column: -before[column] for column in ROLLUP_COLUMNS})
+        add_meal(meal)
+        return
+    _apply(meal.user_id, before['day'], 0, {column: getattr(meal, column) - before[column] for column in ROLLUP_COLUMNS})
+
+
+def rebuild_daily_summaries(users=None, first_day=None, last_day=None):
+    """
+    Recompute summaries from the Meal table, optionally limited to some users
+    and/or a range of days. Returns the number of summary rows written.
+    """
+    meals = Meal.objects.order_by()
+    summaries = MealDailySummary.objects.all()
+    if users is not None:
+        meals = meals.filter(user__in=users)
+        summaries = summaries.filter(user__in=users)
+    # Day bounds are turned into datetime ranges so the meal date index can be used
+    if first_day is not None:
+        meals = meals.filter(date__gte=timezone.make_aware(datetime.combine(first_day, time.min)))
+        summaries = summaries.filter(day__gte=first_day)
+    if last_day is not None:
+        meals = meals.filter(date__lt=timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min)))
+        summaries = summaries.filter(day__lte=last_day)
+
+    rows = (
+        meals.annotate(day=TruncDate('date'))
+        .values('user_id', 'day')
+        .annotate(meal_count=Count('pk'), **{column: Sum(column) for column in ROLLUP_COLUMNS})
+    )
+    summaries.delete()
+    created = MealDailySummary.objects.bulk_create(
+        (MealDailySummary(**row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+    return len(created)
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from FitTrack.cache import bump_version
+
+from .models import Meal
+
+
+# Nothing cached is built from ingredients, only from the meal totals, which are
+# saved with the meal: ingredients need no receivers, so they're deleted in bulk
+@receiver(post_save, sender=Meal)
+@receiver(post_delete, sender=Meal)
+def meal_changed(sender, instance, **kwargs):
+    # Drops the cached review, correlations and dashboard (the rollup changes with its meals)
+    bump_version('meals', instance.user_id)
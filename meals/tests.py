@@ -1,3 +1,526 @@
-from django.test import TestCase
+import io
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from FitTrack.cache import cached
+from FitTrack.testing import QueryPlanTestCase
+
+from . import catalog, rollups
+from .aggregation import summarize_meals
+from .importers import import_meals
+from .ingredients import INGREDIENT_FIELDS, MEAL_TOTAL_FIELDS, create_ingredients, sync_ingredients
+from .models import Food, Ingredient, Meal, MealDailySummary, NutritionLookup
+from .nutrition import ApiNinjasClient, NutritionServiceError, StaticNutritionClient, lookup_foods
+
+User = get_user_model()
+
+
+def make_meal(user, date, name='Meal', **totals):
+    return Meal.objects.create(user=user, name=name, date=date, **{**dict.fromkeys(MEAL_TOTAL_FIELDS, 0), **totals})
+
+
+def at(day, hour=12):
+    return datetime(2024, 1, day, hour, tzinfo=dt_timezone.utc)
+
+
+class MealQueryPlanTests(QueryPlanTestCase):
+    """The meal pages must find a user's meals through the (user, date) indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='planner', password='pw')
+        other = User.objects.create_user(username='other', password='pw')
+        now = timezone.now()
+        for owner in (cls.user, other):
+            for i in range(30):
+                meal = Meal.objects.create(
+                    user=owner, name=f'Meal {i}', date=now - timedelta(hours=10 * i),
+                    **dict.fromkeys(MEAL_TOTAL_FIELDS, 100),
+                )
+                Ingredient.objects.create(meal=meal, name='Rice', **dict.fromkeys(INGREDIENT_FIELDS, 100))
+                rollups.add_meal(meal)
+        cls.meal = Meal.objects.filter(user=cls.user).order_by('date')[10]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_list(self):
+        first_page = self.assertViewUsesIndexes(reverse('meals-list')).context['page_obj']
+        second_page = self.assertViewUsesIndexes(
+            reverse('meals-list') + f'?after={first_page.next_cursor}'
+        ).context['page_obj']
+        self.assertViewUsesIndexes(reverse('meals-list') + f'?before={second_page.previous_cursor}')
+
+    def test_detail(self):
+        response = self.assertViewUsesIndexes(reverse('meal-detail', args=[self.meal.pk]))
+        self.assertIsNotNone(response.context['previous_meal'])
+        self.assertIsNotNone(response.context['next_meal'])
+
+    def test_review(self):
+        self.assertViewUsesIndexes(reverse('review-meals'))
+
+    def test_update_form(self):
+        self.assertViewUsesIndexes(reverse('meal-update', args=[self.meal.pk]))
+
+
+
+class MealSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='eater', password='pw')
+        make_meal(cls.user, at(1, 8), total_weight=100, total_total_fat=10)
+        make_meal(cls.user, at(1, 19), total_weight=300, total_total_fat=5)
+        make_meal(cls.user, at(1) + timedelta(days=31), total_weight=200)
+        other = User.objects.create_user(username='other', password='pw')
+        make_meal(other, at(1), total_weight=1000, total_total_fat=100)
+
+    def test_totals_and_averages_in_one_query(self):
+        with self.assertNumQueries(1):
+            summary = summarize_meals(Meal.objects.filter(user=self.user))
+        self.assertEqual(summary.meal_count, 3)
+        self.assertEqual((summary.totals.weight, summary.averages.weight), (600, 200))
+        self.assertEqual((summary.totals.fat, summary.averages.fat), (15, 5))
+
+    def test_no_meals(self):
+        summary = summarize_meals(Meal.objects.none())
+        self.assertEqual(summary.meal_count, 0)
+        self.assertEqual(summary.averages.weight, 0)
+
+    def test_group_by(self):
+        days = summarize_meals(Meal.objects.filter(user=self.user), group_by='day')
+        self.assertEqual([(s.meal_count, s.totals.weight) for s in days], [(2, 400), (1, 200)])
+        self.assertEqual([s.period.date() for s in days], [at(1).date(), at(1).date() + timedelta(days=31)])
+
+        months = summarize_meals(Meal.objects.filter(user=self.user), group_by='month')
+        self.assertEqual([(s.meal_count, s.averages.weight) for s in months], [(2, 200), (1, 200)])
+
+        with self.assertRaises(ValueError):
+            summarize_meals(Meal.objects.all(), group_by='year')
+
+    def test_review_page(self):
+        cache.clear()
+        rollups.rebuild_daily_summaries()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('review-meals'))
+        self.assertEqual(response.context['total_weight'], 600)
+        self.assertEqual(response.context['avg_weight'], 200)
+        self.assertEqual(response.context['avg_fat'], 5)
+
+
+def meal_data(name, weights):
+    """The mealData the meal form posts, with one item per weight."""
+    items = [
+        {'name': f'food {index}', **dict.fromkeys(INGREDIENT_FIELDS.values(), weight)}
+        for index, weight in enumerate(weights)
+    ]
+    totals = {key: sum(item[key] for item in items) for key in INGREDIENT_FIELDS.values()}
+    return {'mealData': json.dumps({'meal_name': name, 'totals': totals, 'items': items})}
+
+
+class DailyRollupTests(TestCase):
+    """The daily rollup must always match a rebuild from the meals."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='eater', password='pw')
+        self.client.force_login(self.user)
+
+    def summaries(self):
+        return list(MealDailySummary.objects.order_by('user', 'day').values(
+            'user', 'day', 'meal_count', *rollups.ROLLUP_COLUMNS,
+        ))
+
+    def assertRollupMatchesRebuild(self):
+        maintained = self.summaries()
+        rollups.rebuild_daily_summaries()
+        self.assertEqual(maintained, self.summaries())
+
+    def test_create_update_delete(self):
+        for weights in ([100, 50], [30]):
+            self.client.post(reverse('log-meal'), meal_data('Lunch', weights))
+        self.assertRollupMatchesRebuild()
+        self.assertEqual(MealDailySummary.objects.get().meal_count, 2)
+
+        meal = Meal.objects.latest('pk')
+        self.client.post(reverse('meal-update', args=[meal.pk]), meal_data('Dinner', [80, 20, 5]))
+        self.assertRollupMatchesRebuild()
+        self.assertEqual(MealDailySummary.objects.get().total_weight, 150 + 105)
+
+        self.client.post(reverse('meal-delete', args=[meal.pk]))
+        self.assertRollupMatchesRebuild()
+        self.client.post(reverse('meal-delete', args=[Meal.objects.get().pk]))
+        self.assertEqual(self.summaries(), [])
+
+    def test_meal_moved_to_another_day(self):
+        meal = make_meal(self.user, at(1), total_weight=100)
+        rollups.add_meal(meal)
+        rollups.add_meal(make_meal(self.user, at(2), total_weight=40))
+
+        before = rollups.snapshot(meal)
+        meal.date, meal.total_weight = at(2), 60
+        meal.save()
+        rollups.change_meal(before, meal)
+        self.assertRollupMatchesRebuild()
+        self.assertEqual(self.summaries()[0]['total_weight'], 100)
+
+
+class MealSignalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eater', password='pw')
+
+    def meal_with_ingredients(self, count):
+        meal = make_meal(self.user, at(1))
+        Ingredient.objects.bulk_create([
+            Ingredient(meal=meal, name=f'food {index}', **dict.fromkeys(INGREDIENT_FIELDS, 1)) for index in range(count)
+        ])
+        return meal
+
+    def delete_queries(self, meal):
+        with CaptureQueriesContext(connection) as context:
+            meal.delete()
+        return len(context.captured_queries)
+
+    def test_deleting_a_meal_costs_the_same_whatever_its_ingredients(self):
+        # The first deletion also creates the user's deletion record (see api/signals.py)
+        self.meal_with_ingredients(1).delete()
+        self.assertEqual(
+            self.delete_queries(self.meal_with_ingredients(1)),
+            self.delete_queries(self.meal_with_ingredients(30)),
+        )
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_meal_changes_invalidate_the_cache(self):
+        meal = self.meal_with_ingredients(2)
+        self.assertEqual(cached('meals-review', self.user.pk, lambda: 'old'), 'old')
+        with self.captureOnCommitCallbacks(execute=True):
+            meal.delete()
+        self.assertEqual(cached('meals-review', self.user.pk, lambda: 'new'), 'new')
+
+
+class SyncIngredientsTests(TestCase):
+    """Editing a meal writes only the ingredients that changed, in a constant number of queries."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='eater', password='pw')
+
+    def meal(self, count):
+        meal = make_meal(self.user, at(1))
+        items = [{'name': f'food {index}', **dict.fromkeys(INGREDIENT_FIELDS.values(), index)} for index in range(count)]
+        create_ingredients(meal, items)
+        return meal, items
+
+    def stored(self, meal):
+        return sorted(
+            (ingredient.name, ingredient.weight, ingredient.sodium) for ingredient in meal.ingredients.all()
+        )
+
+    def assertSyncs(self, queries, edit):
+        for count in (3, 30):
+            with self.subTest(ingredients=count):
+                meal, items = self.meal(count)
+                items = edit([dict(item) for item in items])
+                with self.assertNumQueries(queries):
+                    sync_ingredients(meal, items)
+                self.assertEqual(self.stored(meal), sorted(
+                    (item['name'], item['weight'], item['sodium_mg']) for item in items
+                ))
+
+    def test_unchanged(self):
+        # Only the select of the stored ingredients
+        self.assertSyncs(1, lambda items: items)
+
+    def test_changed(self):
+        def edit(items):
+            items[1]['weight'] = 500
+            items[2]['sodium_mg'] = 12
+            return items
+        # Select, then one update for every changed row
+        self.assertSyncs(2, edit)
+
+    def test_removed(self):
+        self.assertSyncs(2, lambda items: items[1:])
+
+    def test_added(self):
+        self.assertSyncs(2, lambda items: items + [{'name': 'new food', **dict.fromkeys(INGREDIENT_FIELDS.values(), 7)}])
+
+    def test_renamed_item_is_replaced(self):
+        def edit(items):
+            items[0]['name'] = 'other food'
+            return items
+        # Select, delete of the old row, insert of the new one
+        self.assertSyncs(3, edit)
+
+
+BANANA = {'name': 'banana', 'sugar_g': 12.2}
+
+
+class FailingNutritionClient(StaticNutritionClient):
+    """Fails every lookup of the foods in down."""
+
+    def __init__(self, foods=None, down=()):
+        super().__init__(foods)
+        self.down = set(down)
+
+    def fetch_many(self, queries):
+        results = super().fetch_many(queries)
+        return {
+            query: NutritionServiceError('Timed out') if query in self.down else result
+            for query, result in results.items()
+        }
+
+
+class NutritionLookupTests(TestCase):
+    def test_repeated_foods_are_fetched_once(self):
+        client = StaticNutritionClient({'banana': BANANA})
+        self.assertEqual(lookup_foods(['Banana', ' banana', 'kiwano'], client=client), {
+            'Banana': BANANA, ' banana': BANANA, 'kiwano': None,
+        })
+        # Unknown foods are cached too
+        with self.assertNumQueries(1):
+            self.assertEqual(lookup_foods(['BANANA', 'kiwano'], client=client)['BANANA'], BANANA)
+        self.assertEqual(client.requested, ['banana', 'kiwano'])
+
+    @override_settings(NUTRITION_CACHE_TTL=60)
+    def test_expired_lookups_are_fetched_again(self):
+        client = StaticNutritionClient({'banana': BANANA})
+        lookup_foods(['banana'], client=client)
+        NutritionLookup.objects.update(fetched_at=timezone.now() - timedelta(seconds=61))
+
+        client.foods['banana'] = {**BANANA, 'sugar_g': 15}
+        self.assertEqual(lookup_foods(['banana'], client=client)['banana']['sugar_g'], 15)
+        self.assertEqual(client.requested, ['banana', 'banana'])
+        self.assertEqual(NutritionLookup.objects.get().result['sugar_g'], 15)
+
+    def test_errors_are_not_cached(self):
+        client = FailingNutritionClient({'banana': BANANA, 'rice': {'name': 'rice'}}, down={'rice'})
+        results = lookup_foods(['banana', 'rice'], client=client)
+        self.assertIsInstance(results['rice'], NutritionServiceError)
+        self.assertEqual(list(NutritionLookup.objects.values_list('query', flat=True)), ['banana'])
+
+        client.down.clear()
+        self.assertEqual(lookup_foods(['banana', 'rice'], client=client)['rice'], {'name': 'rice'})
+        self.assertEqual(client.requested, ['banana', 'rice', 'rice'])
+
+    def test_unexpected_api_responses(self):
+        client = ApiNinjasClient(api_key='key')
+        responses = {
+            'banana': [BANANA], 'kiwano': [], 'rice': {'error': 'Invalid API Key.'},
+            'bread': {'message': 'Too many requests'}, 'egg': 'egg',
+        }
+        with mock.patch('meals.nutrition.requests.get') as get:
+            get.side_effect = lambda url, params, **kwargs: mock.Mock(json=lambda: responses[params['query']])
+            results = client.fetch_many(responses)
+        self.assertEqual((results['banana'], results['kiwano']), (BANANA, None))
+        self.assertEqual(str(results['rice']), 'Invalid API Key.')
+        for query in ('bread', 'egg'):
+            self.assertIsInstance(results[query], NutritionServiceError)
+
+    @override_settings(NUTRITION_CLIENT='meals.nutrition.StaticNutritionClient')
+    def test_view(self):
+        self.client.force_login(User.objects.create_user(username='eater', password='pw'))
+        response = self.client.post(reverse('nutrition-lookup'), {'foods': ['kiwano']}, content_type='application/json')
+        self.assertEqual(response.json(), {'results': [{'food': 'kiwano', 'error': "No nutritional data found for 'kiwano'."}]})
+        response = self.client.post(reverse('nutrition-lookup'), {'foods': 'kiwano'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class FoodIndexTests(TestCase):
+    def test_prefix_ranking(self):
+        index = catalog.FoodIndex([
+            ('brown rice', 100), ('rice cake', 1), ('rice', 1), ('wild rice', 5), ('chicken breast', 3),
+        ])
+        # The exact match, then names starting with the query, then other words, each by popularity
+        self.assertEqual(index.search('Rice'), ['rice', 'rice cake', 'brown rice', 'wild rice'])
+        self.assertEqual(index.search('bre'), ['chicken breast'])
+        self.assertEqual(index.search('ri', limit=2), ['rice', 'rice cake'])
+
+    def test_popular_matches_sorted_after_many_others(self):
+        foods = [(f'apple {number:03}', 0) for number in range(500)] + [('apple tart', 90), ('apple pie', 80)]
+        index = catalog.FoodIndex(foods)
+        for query in ('a', 'app'):
+            with self.subTest(query=query):
+                self.assertEqual(index.search(query, limit=3), ['apple tart', 'apple pie', 'apple 000'])
+
+    def test_fuzzy(self):
+        index = catalog.FoodIndex([('chicken breast', 3), ('chickpeas', 1), ('beef', 1)])
+        self.assertEqual(index.search('chiken brest', limit=1), ['chicken breast'])
+        self.assertEqual(index.search('xyz'), [])
+
+
+@override_settings(FOOD_INDEX_REFRESH=0)
+class FoodAutocompleteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eater', password='pw')
+        self.client.force_login(self.user)
+
+    def autocomplete(self, query, **params):
+        return self.client.get(reverse('food-autocomplete'), {'q': query, **params}).json()['results']
+
+    def log_ingredients(self, *names):
+        meal = make_meal(self.user, at(1))
+        Ingredient.objects.bulk_create([
+            Ingredient(meal=meal, name=name, **dict.fromkeys(INGREDIENT_FIELDS, 100)) for name in names
+        ])
+        call_command('build_food_catalog', stdout=io.StringIO())
+
+    def test_index_follows_the_catalog(self):
+        self.log_ingredients('Rice Cake', 'Rice Pudding')
+        self.assertEqual(self.autocomplete('rice'), ['rice cake', 'rice pudding'])
+
+        # Only the popularity of existing foods changes
+        self.log_ingredients('Rice Pudding', 'rice pudding')
+        self.assertEqual(Food.objects.count(), 2)
+        self.assertEqual(self.autocomplete('rice'), ['rice pudding', 'rice cake'])
+
+    def test_limit(self):
+        self.log_ingredients('Rice Cake', 'Rice Pudding')
+        self.assertEqual(len(self.autocomplete('rice', limit=-3)), 1)
+        self.assertEqual(len(self.autocomplete('rice', limit='many')), 2)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='eater', password='pw')
+        other = User.objects.create_user(username='other', password='pw')
+        # Three dates shared by 15 meals each, so pages start and end inside ties
+        for index in range(45):
+            make_meal(cls.user, at(1 + index % 3), name=f'Meal {index}')
+            make_meal(other, at(1 + index % 3))
+        cls.expected = list(Meal.objects.filter(user=cls.user).order_by('-date', '-pk').values_list('pk', flat=True))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def page(self, **params):
+        page = self.client.get(reverse('meals-list'), params).context['page_obj']
+        return page, [meal.pk for meal in page]
+
+    def test_cursor_round_trip(self):
+        pages = []
+        page, pks = self.page()
+        self.assertFalse(page.has_previous)
+        pages.append(pks)
+        while page.has_next:
+            page, pks = self.page(after=page.next_cursor)
+            pages.append(pks)
+        self.assertEqual([len(pks) for pks in pages], [20, 20, 5])
+        self.assertEqual([pk for pks in pages for pk in pks], self.expected)
+
+        # And back from the last page
+        backwards = [pages[-1]]
+        while page.has_previous:
+            page, pks = self.page(before=page.previous_cursor)
+            backwards.append(pks)
+        self.assertEqual(backwards[::-1], pages)
+
+    def test_tampered_cursor(self):
+        cursor = self.page()[0].next_cursor
+        for bad in ('garbage', cursor[:-3], 'WyJub3QgYSBkYXRlIiwgMV0', 'WzFd'):
+            with self.subTest(cursor=bad):
+                self.assertEqual(self.client.get(reverse('meals-list'), {'after': bad}).status_code, 404)
+                self.assertEqual(self.client.get(reverse('meals-list'), {'before': bad}).status_code, 404)
+
+
+class AdjacentMealsTests(TestCase):
+    def test_neighbours_with_tied_dates(self):
+        user = User.objects.create_user(username='eater', password='pw')
+        other = User.objects.create_user(username='other', password='pw')
+        older = make_meal(user, at(1))
+        tied = [make_meal(user, at(2)) for _ in range(3)]
+        # Other users' meals at the same dates, in between in pk order
+        make_meal(other, at(2))
+        newer = make_meal(user, at(3))
+        make_meal(other, at(2, 13))
+        ordered = [older, *tied, newer]
+
+        self.client.force_login(user)
+        for position, meal in enumerate(ordered):
+            with self.subTest(meal=position):
+                context = self.client.get(reverse('meal-detail', args=[meal.pk])).context
+                self.assertEqual(context['previous_meal'], ordered[position - 1] if position else None)
+                self.assertEqual(context['next_meal'], ordered[position + 1] if position + 1 < len(ordered) else None)
+
+        other_meal = Meal.objects.filter(user=other).first()
+        self.assertEqual(self.client.get(reverse('meal-detail', args=[other_meal.pk])).status_code, 404)
+
+
+
+NUTRIENT_COLUMNS = list(INGREDIENT_FIELDS.values())
+
+
+def csv_lines(*rows, columns=NUTRIENT_COLUMNS):
+    """A CSV file of (date, meal_name, name, value) rows, the value repeated in every nutrient column."""
+    lines = [','.join(['date', 'meal_name', 'name', *columns])]
+    lines += [','.join([date, meal, name, *[value] * len(columns)]) for date, meal, name, value in rows]
+    return [f'{line}\n' for line in lines]
+
+
+class ImportMealsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eater', password='pw')
+
+    def test_invalid_meals_are_reported_and_skipped(self):
+        report = import_meals(self.user, csv_lines(
+            ('2024-01-01T12:00', 'Lunch', 'rice', '10'),
+            ('2024-01-01T12:00', 'Lunch', 'beans', '5'),
+            ('2024-02-30', 'Impossible day', 'rice', '10'),
+            ('2024-01-02T25:00', 'Impossible hour', 'rice', '10'),
+            ('yesterday', 'Not a date', 'rice', '10'),
+            ('2024-01-03', 'Not a number', 'rice', 'nan'),
+            ('2024-01-04', 'Infinite', 'rice', 'inf'),
+            ('2024-01-05', 'Negative', 'rice', '-1'),
+            ('2024-01-06', 'Dinner', 'pasta', '20'),
+        ), 'csv', batch_size=1)
+
+        self.assertEqual(report.errors, [
+            {'line': 4, 'error': "Invalid date '2024-02-30', no such day or time."},
+            {'line': 5, 'error': "Invalid date '2024-01-02T25:00', no such day or time."},
+            {'line': 6, 'error': "Invalid date 'yesterday', expected ISO 8601 (e.g. 2024-05-01T12:30)."},
+            {'line': 7, 'error': "'weight' must be a finite number, got 'nan'."},
+            {'line': 8, 'error': "'weight' must be a finite number, got 'inf'."},
+            {'line': 9, 'error': "'weight' can't be negative."},
+        ])
+        self.assertEqual((report.meals_created, report.ingredients_created, report.rows_read), (2, 3, 9))
+        self.assertEqual(
+            list(Meal.objects.order_by('date').values_list('name', 'total_weight')), [('Lunch', 15), ('Dinner', 20)],
+        )
+        self.assertEqual(MealDailySummary.objects.count(), 2)
+
+    def test_missing_columns(self):
+        report = import_meals(self.user, csv_lines(
+            ('2024-01-01', 'Lunch', 'rice', '10'), columns=NUTRIENT_COLUMNS[:-1],
+        ), 'csv')
+        self.assertEqual(report.errors, [{'line': 2, 'error': "Missing 'cholesterol_mg'."}])
+
+        report = import_meals(self.user, [
+            '{"date": "2024-01-01", "items": [{"name": "rice"}]}\n',
+            json.dumps({'meal_name': 'Lunch', 'items': []}) + '\n',
+            '{"meal_name": \n',
+        ], 'jsonl')
+        self.assertEqual([error['line'] for error in report.errors], [1, 2, 3])
+        self.assertEqual(report.errors[1]['error'], "A meal needs at least one item.")
+        self.assertTrue(report.errors[2]['error'].startswith("Invalid JSON"))
+        self.assertFalse(Meal.objects.exists())
+
+    def test_upload(self):
+        self.client.force_login(self.user)
+        record = {
+            'meal_name': 'Lunch', 'date': '2024-02-30',
+            'items': [{'name': 'rice', **dict.fromkeys(NUTRIENT_COLUMNS, 10)}],
+        }
+        upload = SimpleUploadedFile('meals.jsonl', (json.dumps(record) + '\n').encode())
+        response = self.client.post(reverse('import-meals'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['errors'], [{'line': 1, 'error': "Invalid date '2024-02-30', no such day or time."}])
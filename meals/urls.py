@@ -8,6 +8,9 @@ from .views import (
 
 urlpatterns = [
     path("log/", views.log_meal, name="log-meal"),
+    path("nutrition/", views.nutrition_lookup, name="nutrition-lookup"),
+    path("foods/", views.food_autocomplete, name="food-autocomplete"),
+    path("import/", views.import_meals_upload, name="import-meals"),
     path("review/", views.review, name="review-meals"),
     path("list/", MealListView.as_view(), name="meals-list"),
     path("<int:pk>/", MealDetailView.as_view(), name="meal-detail"),
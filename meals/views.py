@@ -1,7 +1,13 @@
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
-from .models import Meal, Ingredient
+from .models import Meal, Ingredient, MealDailySummary
+from .aggregation import asummarize_daily_summaries
+from . import rollups
+from .ingredients import create_ingredients, sync_ingredients
+from .nutrition import NutritionServiceError, lookup_foods
+from .catalog import search_foods
+from .importers import guess_format, import_meals, FORMATS
 from django.views.generic import (
     ListView,
     DetailView,
@@ -10,9 +16,14 @@ from django.views.generic import (
     DeleteView,
 )
 from django.contrib.auth.mixins import LoginRequiredMixin
+from FitTrack.cache import acached
+from FitTrack.navigation import AdjacentObjectsMixin
+from FitTrack.pagination import KeysetPaginationMixin
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
 from django.urls import reverse, reverse_lazy
-from django.db.models import Sum, Avg, Count
+from django.db import transaction
+import io
 import json
 
 # Function-based view for creating meals (handles API + multi-step form)
@@ -27,37 +38,28 @@ def log_meal(request):
                 # Parse the JSON data
                 data = json.loads(meal_data)
                 
-                # Create the Meal object
-                meal = Meal.objects.create(
-                    user=request.user,
-                    name=data['meal_name'],
-                    total_weight=data['totals']['weight'],
-                    total_total_fat=data['totals']['fat_total_g'],
-                    total_saturated_fat=data['totals']['fat_saturated_g'],
-                    total_total_carbs=data['totals']['carbohydrates_total_g'],
-                    total_fiber=data['totals']['fiber_g'],
-                    total_sugar=data['totals']['sugar_g'],
-                    total_sodium=data['totals']['sodium_mg'],
-                    total_potassium=data['totals']['potassium_mg'],
-                    total_cholesterol=data['totals']['cholesterol_mg'],
-                )
-                
-                # Create Ingredient objects for each food item
-                for item in data['items']:
-                    Ingredient.objects.create(
-                        meal=meal,
-                        name=item['name'],
-                        weight=item['weight'],
-                        total_fat=item['fat_total_g'],
-                        saturated_fat=item['fat_saturated_g'],
-                        total_carbs=item['carbohydrates_total_g'],
-                        fiber=item['fiber_g'],
-                        sugar=item['sugar_g'],
-                        sodium=item['sodium_mg'],
-                        potassium=item['potassium_mg'],
-                        cholesterol=item['cholesterol_mg'],
+                with transaction.atomic():
+                    # Create the Meal object
+                    meal = Meal.objects.create(
+                        user=request.user,
+                        name=data['meal_name'],
+                        total_weight=data['totals']['weight'],
+                        total_total_fat=data['totals']['fat_total_g'],
+                        total_saturated_fat=data['totals']['fat_saturated_g'],
+                        total_total_carbs=data['totals']['carbohydrates_total_g'],
+                        total_fiber=data['totals']['fiber_g'],
+                        total_sugar=data['totals']['sugar_g'],
+                        total_sodium=data['totals']['sodium_mg'],
+                        total_potassium=data['totals']['potassium_mg'],
+                        total_cholesterol=data['totals']['cholesterol_mg'],
                     )
                 
+                    # Create the Ingredient objects for all food items at once
+                    create_ingredients(meal, data['items'])
+
+                    # Keep the daily rollup in step with the new meal
+                    rollups.add_meal(meal)
+
                 return redirect('meal-detail', pk=meal.pk)
             except Exception as e:
                 print(f"Error saving meal: {e}")
@@ -76,44 +78,37 @@ def update_meal(request, pk):
             try:
                 data = json.loads(meal_data)
                 
-                # Update the Meal object
-                meal.name = data['meal_name']
-                meal.total_weight = data['totals']['weight']
-                meal.total_total_fat = data['totals']['fat_total_g']
-                meal.total_saturated_fat = data['totals']['fat_saturated_g']
-                meal.total_total_carbs = data['totals']['carbohydrates_total_g']
-                meal.total_fiber = data['totals']['fiber_g']
-                meal.total_sugar = data['totals']['sugar_g']
-                meal.total_sodium = data['totals']['sodium_mg']
-                meal.total_potassium = data['totals']['potassium_mg']
-                meal.total_cholesterol = data['totals']['cholesterol_mg']
-                meal.save()
-                
-                # Delete old ingredients and create new ones
-                meal.ingredients.all().delete()
-                for item in data['items']:
-                    Ingredient.objects.create(
-                        meal=meal,
-                        name=item['name'],
-                        weight=item['weight'],
-                        total_fat=item['fat_total_g'],
-                        saturated_fat=item['fat_saturated_g'],
-                        total_carbs=item['carbohydrates_total_g'],
-                        fiber=item['fiber_g'],
-                        sugar=item['sugar_g'],
-                        sodium=item['sodium_mg'],
-                        potassium=item['potassium_mg'],
-                        cholesterol=item['cholesterol_mg'],
-                    )
+                with transaction.atomic():
+                    # Remember the old totals so only the difference goes to the daily rollup
+                    before = rollups.snapshot(meal)
+
+                    # Update the Meal object
+                    meal.name = data['meal_name']
+                    meal.total_weight = data['totals']['weight']
+                    meal.total_total_fat = data['totals']['fat_total_g']
+                    meal.total_saturated_fat = data['totals']['fat_saturated_g']
+                    meal.total_total_carbs = data['totals']['carbohydrates_total_g']
+                    meal.total_fiber = data['totals']['fiber_g']
+                    meal.total_sugar = data['totals']['sugar_g']
+                    meal.total_sodium = data['totals']['sodium_mg']
+                    meal.total_potassium = data['totals']['potassium_mg']
+                    meal.total_cholesterol = data['totals']['cholesterol_mg']
+                    meal.save()
                 
+                    # Only insert, update or delete the ingredients that changed
+                    sync_ingredients(meal, data['items'])
+
+                    rollups.change_meal(before, meal)
+
                 return redirect('meal-detail', pk=meal.pk)
             except Exception as e:
                 print(f"Error updating meal: {e}")
     
     # Prepare meal data for pre-population
     # Convert ingredients to a list of dictionaries
+    ingredients = list(meal.ingredients.all())
     ingredients_list = []
-    for ingredient in meal.ingredients.all():
+    for ingredient in ingredients:
         ingredients_list.append({
             'name': ingredient.name,
             'weight': float(ingredient.weight),
@@ -129,62 +124,95 @@ def update_meal(request, pk):
     
     context = {
         'meal': meal,
-        'ingredients': meal.ingredients.all(),
+        'ingredients': ingredients,
         'ingredients_json': json.dumps(ingredients_list),
         'is_update': True,
     }
     
     return render(request, 'meals/meal_form.html', context)
 
+# Maximum number of foods accepted by one nutrition lookup
+MAX_NUTRITION_FOODS = 50
+
 @login_required
-def review(request):
-    meals = Meal.objects.filter(user=request.user)
-    
-    # Calculate total and average statistics
-    total_weight = meals.aggregate(Sum('total_weight'))['total_weight__sum'] or 0
-    total_fat = meals.aggregate(Sum('total_total_fat'))['total_total_fat__sum'] or 0
-    total_saturated_fat = meals.aggregate(Sum('total_saturated_fat'))['total_saturated_fat__sum'] or 0
-    total_carbs = meals.aggregate(Sum('total_total_carbs'))['total_total_carbs__sum'] or 0
-    total_fiber = meals.aggregate(Sum('total_fiber'))['total_fiber__sum'] or 0
-    total_sugar = meals.aggregate(Sum('total_sugar'))['total_sugar__sum'] or 0
-    total_sodium = meals.aggregate(Sum('total_sodium'))['total_sodium__sum'] or 0
-    total_potassium = meals.aggregate(Sum('total_potassium'))['total_potassium__sum'] or 0
-    total_cholesterol = meals.aggregate(Sum('total_cholesterol'))['total_cholesterol__sum'] or 0
-    
-    avg_weight = meals.aggregate(Avg('total_weight'))['total_weight__avg'] or 0
-    avg_fat = meals.aggregate(Avg('total_total_fat'))['total_total_fat__avg'] or 0
-    avg_saturated_fat = meals.aggregate(Avg('total_saturated_fat'))['total_saturated_fat__avg'] or 0
-    avg_carbs = meals.aggregate(Avg('total_total_carbs'))['total_total_carbs__avg'] or 0
-    avg_fiber = meals.aggregate(Avg('total_fiber'))['total_fiber__avg'] or 0
-    avg_sugar = meals.aggregate(Avg('total_sugar'))['total_sugar__avg'] or 0
-    avg_sodium = meals.aggregate(Avg('total_sodium'))['total_sodium__avg'] or 0
-    avg_potassium = meals.aggregate(Avg('total_potassium'))['total_potassium__avg'] or 0
-    avg_cholesterol = meals.aggregate(Avg('total_cholesterol'))['total_cholesterol__avg'] or 0
-    
-    context = {
-        'meals': meals.order_by('-date'),
-        'total_weight': round(total_weight, 1),
-        'total_fat': round(total_fat, 1),
-        'total_saturated_fat': round(total_saturated_fat, 1),
-        'total_carbs': round(total_carbs, 1),
-        'total_fiber': round(total_fiber, 1),
-        'total_sugar': round(total_sugar, 1),
-        'total_sodium': round(total_sodium, 1),
-        'total_potassium': round(total_potassium, 1),
-        'total_cholesterol': round(total_cholesterol, 1),
-        'avg_weight': round(avg_weight, 1),
-        'avg_fat': round(avg_fat, 1),
-        'avg_saturated_fat': round(avg_saturated_fat, 1),
-        'avg_carbs': round(avg_carbs, 1),
-        'avg_fiber': round(avg_fiber, 1),
-        'avg_sugar': round(avg_sugar, 1),
-        'avg_sodium': round(avg_sodium, 1),
-        'avg_potassium': round(avg_potassium, 1),
-        'avg_cholesterol': round(avg_cholesterol, 1),
-    }
+@require_POST
+def nutrition_lookup(request):
+    """
+    Nutrients per 100g for every food of a meal, in one request.
+    Expects a JSON body like {"foods": ["banana", "rice"]}; results keep the same order.
+    """
+    try:
+        foods = json.loads(request.body)['foods']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected a JSON body like {"foods": ["banana"]}.'}, status=400)
+
+    if not isinstance(foods, list) or not all(isinstance(food, str) and food.strip() for food in foods):
+        return JsonResponse({'error': '"foods" must be a list of food names.'}, status=400)
+    if len(foods) > MAX_NUTRITION_FOODS:
+        return JsonResponse({'error': f'At most {MAX_NUTRITION_FOODS} foods per request.'}, status=400)
+
+    found = lookup_foods(foods)
+
+    results = []
+    for food in foods:
+        result = found[food]
+        if isinstance(result, NutritionServiceError):
+            results.append({'food': food, 'error': f'Nutrition service is down: {result}'})
+        elif result is None:
+            results.append({'food': food, 'error': f"No nutritional data found for '{food}'."})
+        else:
+            results.append({'food': food, 'result': result})
+    return JsonResponse({'results': results})
+
+# Maximum number of suggestions returned by the food autocomplete
+MAX_FOOD_SUGGESTIONS = 20
+
+@login_required
+def food_autocomplete(request):
+    """Food names matching ?q= (by word prefix, or fuzzily when there's a typo)."""
+    query = request.GET.get('q', '')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), MAX_FOOD_SUGGESTIONS))
+    except ValueError:
+        limit = 10
+    return JsonResponse({'results': search_foods(query, limit)})
+
+@login_required
+@require_POST
+def import_meals_upload(request):
+    """
+    Import meals from an uploaded CSV or JSONL file (field 'file', optional 'format').
+    Returns the import report as JSON, including the lines that were rejected.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'Upload the file to import as "file".'}, status=400)
+    file_format = request.POST.get('format') or guess_format(upload.name)
+    if file_format not in FORMATS:
+        return JsonResponse({'error': f'Format must be one of {", ".join(FORMATS)}.'}, status=400)
+
+    # Read the upload line by line instead of loading it in memory
+    lines = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+    try:
+        report = import_meals(request.user, lines, file_format)
+    except UnicodeDecodeError:
+        return JsonResponse({'error': 'The file must be UTF-8 encoded.'}, status=400)
+    return JsonResponse(report.as_dict())
+
+@login_required
+async def review(request):
+    # The templates get the user loaded asynchronously (the lazy request.user would query synchronously)
+    user = request.user = await request.auser()
+
+    async def build():
+        # Total and average statistics from the daily rollup (one row per day)
+        summary = await asummarize_daily_summaries(MealDailySummary.objects.filter(user=user))
+        return summary.as_context()
+
+    context = await acached('meals-review', user.pk, build)
     return render(request, 'meals/review_meals.html', context)
 
-class MealListView(LoginRequiredMixin, ListView):
+class MealListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Meal
     context_object_name = "meals"
     ordering = ["-date"]
@@ -193,7 +221,7 @@ class MealListView(LoginRequiredMixin, ListView):
         queryset = super().get_queryset()
         return queryset.filter(user=self.request.user)
 
-class MealDetailView(LoginRequiredMixin, DetailView):
+class MealDetailView(LoginRequiredMixin, AdjacentObjectsMixin, DetailView):
     model = Meal
     context_object_name = 'meal'
 
@@ -201,23 +229,11 @@ class MealDetailView(LoginRequiredMixin, DetailView):
         return super().get_queryset().filter(user=self.request.user)
 
     def get_context_data(self, **kwargs):
+        # previous_meal (older date) and next_meal (newer date) come from AdjacentObjectsMixin
         context = super().get_context_data(**kwargs)
-        meal = self.object 
 
         # Add ingredients
-        context['ingredients'] = meal.ingredients.all()
-
-        # Previous meal (older date)
-        context['previous_meal'] = Meal.objects.filter(
-            user=self.request.user,
-            date__lt=meal.date
-        ).order_by('-date').first()
-
-        # Next meal (newer date)
-        context['next_meal'] = Meal.objects.filter(
-            user=self.request.user,
-            date__gt=meal.date
-        ).order_by('date').first()
+        context['ingredients'] = self.object.ingredients.all()
 
         return context
 
@@ -230,4 +246,10 @@ class MealDeleteView(LoginRequiredMixin, DeleteView):
     
     def get_queryset(self):
         queryset = super().get_queryset()
-        return queryset.filter(user=self.request.user)
\ No newline at end of file
+        return queryset.filter(user=self.request.user)
+
+    def form_valid(self, form):
+        # Remove the meal from the daily rollup in the same transaction as the delete
+        with transaction.atomic():
+            rollups.remove_meal(self.object)
+            return super().form_valid(form)
\ No newline at end of file
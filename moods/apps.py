@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MoodsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'moods'
+
+    def ready(self):
+        # Invalidates the cached pages built from moods
+        from . import signals  # noqa: F401
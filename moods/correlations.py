@@ -0,0 +1,142 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from FitTrack.cache import cached
+from meals.aggregation import NUTRIENT_FIELDS
+from meals.models import MealDailySummary
+from workouts.models import Workout
+
+from .models import Mood
+
+# How many days back activity is compared with mood: 0 is the same day, 1 the day before...
+LAGS = (0, 1, 2)
+
+# Fewer days than this with both a mood and a value give no correlation
+MIN_DAYS = 10
+
+# Daily metrics compared with mood: name -> (label, source, column of the daily rows)
+WORKOUT_METRICS = {
+    'workouts': ('Workouts', 'workouts', 'total_workouts'),
+    'calories_burned': ('Calories burned', 'workouts', 'total_calories'),
+    'workout_minutes': ('Workout minutes', 'workouts', 'total_duration'),
+    'distance': ('Distance', 'workouts', 'total_distance'),
+}
+MEAL_METRICS = {
+    'meals': ('Meals', 'meals', 'meal_count'),
+    **{
+        name: (MealDailySummary._meta.get_field(column).verbose_name.capitalize(), 'meals', column)
+        for name, column in NUTRIENT_FIELDS.items()
+    },
+}
+METRICS = {**WORKOUT_METRICS, **MEAL_METRICS}
+
+LAG_LABELS = {0: 'same day', 1: 'day before', 2: '2 days before'}
+
+
+def correlation_matrix(values, moods):
+    """
+    Pearson correlation of every column of values with moods, for every lag at once.
+
+    values has shape (lags, days, metrics) and moods (days,); NaN marks a missing
+    value, and each pair only uses the days where both are present.
+    Returns (r, days) arrays of shape (lags, metrics); r is NaN where it's undefined.
+    """
+    moods = moods[np.newaxis, :, np.newaxis]
+    present = ~np.isnan(values) & ~np.isnan(moods)
+    # Centring on the overall means first keeps the sums below small
+    known = ~np.isnan(values)
+    means = np.where(known, values, 0).sum(axis=1, keepdims=True) / np.maximum(known.sum(axis=1, keepdims=True), 1)
+    x = np.where(present, values - means, 0)
+    y = np.where(present, moods - np.nanmean(moods), 0)
+
+    n = present.sum(axis=1)
+    sum_x, sum_y = x.sum(axis=1), y.sum(axis=1)
+    covariance = n * (x * y).sum(axis=1) - sum_x * sum_y
+    variance_x = n * (x * x).sum(axis=1) - sum_x ** 2
+    variance_y = n * (y * y).sum(axis=1) - sum_y ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = covariance / np.sqrt(variance_x * variance_y)
+    r[(n < MIN_DAYS) | (variance_x <= 0) | (variance_y <= 0)] = np.nan
+    return r, n
+
+
+def compute_correlations(user):
+    """
+    Correlations between the user's daily mood and each day's workout and meal
+    totals, on the same day and the days before.
+
+    Days without a workout count as 0 of everything. Days without meals are
+    left out of the meal metrics, since no meals logged doesn't mean nothing eaten.
+    """
+    moods = list(Mood.objects.filter(user=user).order_by('date').values_list('date', 'mood'))
+    result = {'moods': len(moods), 'lags': list(LAGS), 'correlations': [], 'strongest': []}
+    if not moods:
+        return result
+
+    # One row per day, from early enough for the longest lag to the last mood
+    first_day = moods[0][0] - timedelta(days=max(LAGS))
+    last_day = moods[-1][0]
+    day_count = (last_day - first_day).days + 1
+    result.update(first_day=moods[0][0].isoformat(), last_day=last_day.isoformat())
+
+    mood_values = np.full(day_count, np.nan)
+    for day, mood in moods:
+        mood_values[(day - first_day).days] = mood
+
+    values = np.zeros((day_count, len(METRICS)))
+    values[:, len(WORKOUT_METRICS):] = np.nan
+    columns = {column: i for i, (_, _, column) in enumerate(METRICS.values())}
+
+    # Datetime range covering the days, so the (user, date) index can be used
+    start = timezone.make_aware(datetime.combine(first_day, time.min))
+    end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+    workout_days = (
+        Workout.objects.filter(user=user, date__gte=start, date__lt=end)
+        .annotate(day=TruncDate('date'))
+        .values('day')
+        .annotate(
+            total_workouts=Count('pk'),
+            total_calories=Sum('calories'),
+            total_duration=Sum('duration'),
+            total_distance=Sum('distance'),
+        )
+        .order_by()
+    )
+    meal_days = MealDailySummary.objects.filter(user=user, day__gte=first_day, day__lte=last_day).values(
+        'day', *(column for _, _, column in MEAL_METRICS.values())
+    )
+    for rows in (workout_days, meal_days):
+        for row in rows:
+            index = (row.pop('day') - first_day).days
+            for column, value in row.items():
+                values[index, columns[column]] = value or 0
+
+    # values[lag, day] holds the totals from lag days before that day
+    lagged = np.stack([np.roll(values, lag, axis=0) for lag in LAGS])
+    for i, lag in enumerate(LAGS):
+        lagged[i, :lag] = np.nan
+    r, days = correlation_matrix(lagged, mood_values)
+
+    for j, (name, (label, source, _)) in enumerate(METRICS.items()):
+        for i, lag in enumerate(LAGS):
+            result['correlations'].append({
+                'metric': name,
+                'label': label,
+                'source': source,
+                'lag': lag,
+                'lag_label': LAG_LABELS.get(lag, f'{lag} days before'),
+                'r': None if np.isnan(r[i, j]) else round(float(r[i, j]), 3),
+                'days': int(days[i, j]),
+            })
+    defined = [entry for entry in result['correlations'] if entry['r'] is not None]
+    result['strongest'] = sorted(defined, key=lambda entry: -abs(entry['r']))[:5]
+    return result
+
+
+def mood_correlations(user):
+    """compute_correlations() for the user, cached until they log or change a mood, meal or workout."""
+    return cached('mood-correlations', user.pk, lambda: compute_correlations(user))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moods', '0003_alter_mood_table'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mood',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='When the mood was last saved.'),
+        ),
+        migrations.AddIndex(
+            model_name='mood',
+            index=models.Index(fields=['user', 'updated_at'], name='mood_user_updated_idx'),
+        ),
+    ]
@@ -24,11 +24,19 @@ class Mood(models.Model):
         blank=True,
         help_text="Optional notes on the mood."
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When the mood was last saved."
+    )
     
     class Meta:
         db_table = 'mood'
         ordering = ['-date']
         unique_together = ('user', 'date')  # One mood per user per day
+        indexes = [
+            # Latest change of a user's moods, for the API's ETag and Last-Modified
+            models.Index(fields=['user', 'updated_at'], name='mood_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Mood {self.mood} for {self.user.username} on {self.date.strftime('%d-%m-%Y')}"
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from FitTrack.cache import bump_version
+
+from .models import Mood
+
+
+@receiver(post_save, sender=Mood)
+@receiver(post_delete, sender=Mood)
+def mood_changed(sender, instance, **kwargs):
+    # Drops the cached review, correlations and dashboard
+    bump_version('moods', instance.user_id)
@@ -1,3 +1,112 @@
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from FitTrack.testing import QueryPlanTestCase
+
+from workouts.models import Workout
+
+from .correlations import mood_correlations
+from .models import Mood
+
+User = get_user_model()
+
+
+class MoodQueryPlanTests(QueryPlanTestCase):
+    """The mood pages must find a user's moods through the unique (user, date) index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='planner', password='pw')
+        other = User.objects.create_user(username='other', password='pw')
+        today = timezone.localdate()
+        for owner in (cls.user, other):
+            Mood.objects.bulk_create(
+                [Mood(user=owner, date=today - timedelta(days=i), mood=i % 10 + 1) for i in range(30)]
+            )
+        cls.mood = Mood.objects.filter(user=cls.user).order_by('date')[10]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_list(self):
+        first_page = self.assertViewUsesIndexes(reverse('moods-list')).context['page_obj']
+        second_page = self.assertViewUsesIndexes(
+            reverse('moods-list') + f'?after={first_page.next_cursor}'
+        ).context['page_obj']
+        self.assertViewUsesIndexes(reverse('moods-list') + f'?before={second_page.previous_cursor}')
+
+    def test_detail(self):
+        response = self.assertViewUsesIndexes(reverse('mood-detail', args=[self.mood.pk]))
+        self.assertIsNotNone(response.context['previous_mood'])
+        self.assertIsNotNone(response.context['next_mood'])
+
+    def test_review(self):
+        context = self.assertViewUsesIndexes(reverse('review-moods')).context
+        self.assertEqual(context['total_moods'], 30)
+        self.assertEqual([bar['count'] for bar in context['histogram']], [3] * 10)
+        recent = list(context['recent_moods'])
+        self.assertEqual(len(recent), 30)
+        # Today's mood is 1 and the 6 days before go up to 7
+        self.assertEqual(recent[0].avg_7, 4)
+        self.assertEqual(recent[0].avg_30, 5.5)
+        self.assertEqual(recent[-1].avg_7, 10)
+
+    async def test_review_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        context = (await self.async_client.get(reverse('review-moods'))).context
+        self.assertEqual(context['total_moods'], 30)
+        self.assertEqual(context['recent_moods'][0].avg_7, 4)
+
+    def test_update(self):
+        # The edit form is a popup on the detail page, so the view only takes POSTs
+        self.assertViewUsesIndexes(
+            reverse('mood-update', args=[self.mood.pk]), method='post',
+            data={'mood': 7, 'notes': 'Fine'}, expected_status=302,
+        )
+
+
+class MoodCorrelationTests(TestCase):
+    def setUp(self):
+        # Primary keys are reused between tests, and so would the cached results be
+        cache.clear()
+        self.user = User.objects.create_user(username='moody', password='pw')
+        self.today = timezone.localdate()
+        # A longer workout the day before always comes with a better mood
+        for i in range(20):
+            day = self.today - timedelta(days=i)
+            Mood.objects.create(user=self.user, date=day, mood=i % 5 + 1)
+            self.log_workout(day - timedelta(days=1), minutes=(i % 5 + 1) * 10)
+
+    def log_workout(self, day, minutes):
+        return Workout.objects.create(
+            user=self.user, date=timezone.make_aware(datetime.combine(day, time(12))),
+            workout_type=Workout.WorkoutType.YOGA, duration=minutes, intensity=Workout.Intensity.LOW, calories=minutes * 3,
+        )
+
+    def correlation(self, result, metric, lag):
+        return next(entry for entry in result['correlations'] if entry['metric'] == metric and entry['lag'] == lag)
+
+    def test_lagged_correlation(self):
+        self.client.force_login(self.user)
+        result = self.client.get(reverse('mood-correlations')).json()
+        self.assertEqual(result['moods'], 20)
+        self.assertEqual(self.correlation(result, 'workout_minutes', 1)['r'], 1.0)
+        self.assertEqual(self.correlation(result, 'workout_minutes', 1)['days'], 20)
+        # No meals logged: not enough days to say anything
+        self.assertIsNone(self.correlation(result, 'sugar', 0)['r'])
+        self.assertEqual(self.correlation(result, 'sugar', 0)['days'], 0)
 
-# Create your tests here.
+    def test_cache_is_dropped_when_data_arrives(self):
+        before = mood_correlations(self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(mood_correlations(self.user), before)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.log_workout(self.today - timedelta(days=3), minutes=500)
+        after = mood_correlations(self.user)
+        self.assertLess(self.correlation(after, 'workout_minutes', 1)['r'], 1.0)
@@ -11,6 +11,7 @@ from .views import (
 urlpatterns = [
     path("log/", MoodCreateView.as_view(), name="log-mood"),
     path("review/", views.review, name="review-moods"),
+    path("correlations/", views.correlations, name="mood-correlations"),
     path("list/", MoodListView.as_view(), name="moods-list"),
     path("<int:pk>/", MoodDetailView.as_view(), name="mood-detail"),
     path("<int:pk>/update/", MoodUpdateView.as_view(), name="mood-update"),
@@ -1,5 +1,8 @@
+from datetime import timedelta
+
 from django.shortcuts import render
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+from .correlations import mood_correlations
 from .models import Mood
 from django.views.generic import (
     ListView,
@@ -9,28 +12,109 @@ from django.views.generic import (
     DeleteView,
     )
 from django.contrib.auth.mixins import LoginRequiredMixin
+from FitTrack.cache import acached
+from FitTrack.navigation import AdjacentObjectsMixin
+from FitTrack.pagination import KeysetPaginationMixin
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse, reverse_lazy
-from django.db.models import Avg, Count
+from django.db.models import Avg, Count, DateField, ExpressionWrapper, OuterRef, Subquery
+from django.db.models.functions import ExtractWeekDay
+from django.utils import timezone
+
+# Mood scale, from worst to best
+MOOD_SCALE = range(1, 11)
+
+# The review lists the moods of the last RECENT_DAYS days only, so its cost doesn't grow with the history
+RECENT_DAYS = 30
+MOVING_AVERAGE_DAYS = (7, 30)
+
+# ExtractWeekDay numbers days from 1 (Sunday) to 7 (Saturday)
+WEEKDAYS = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+
+def moving_average(days):
+    """Average of the moods logged in the days days up to each mood's date, as a correlated subquery."""
+    return Subquery(
+        Mood.objects.filter(
+            user=OuterRef('user'),
+            date__lte=OuterRef('date'),
+            date__gt=ExpressionWrapper(OuterRef('date') - timedelta(days=days), output_field=DateField()),
+        )
+        .order_by()
+        .values('user')
+        .annotate(average=Avg('mood'))
+        .values('average')
+    )
+
 
 @login_required
-def review(request):
-    moods = Mood.objects.filter(user=request.user)
-    
-    # Calculate statistics
-    total_moods = moods.count()
-    avg_mood = moods.aggregate(Avg('mood'))['mood__avg'] or 0
-    
-    context = {
-        'moods': moods,
+async def review(request):
+    # The templates get the user loaded asynchronously (the lazy request.user would query synchronously)
+    user = request.user = await request.auser()
+    today = timezone.localdate()
+    context = await acached('moods-review', user.pk, lambda: areview_stats(user, today), today.isoformat())
+    return render(request, 'moods/review_moods.html', context)
+
+
+async def _fetch(queryset):
+    return [row async for row in queryset]
+
+
+async def areview_stats(user, today):
+    """All-time statistics of the user's moods, and the recent moods with their moving averages."""
+    moods = Mood.objects.filter(user=user)
+
+    # One grouped query for every all-time statistic: at most 10 moods x 7 weekdays rows
+    rows = await _fetch(
+        moods.order_by()
+        .annotate(weekday=ExtractWeekDay('date'))
+        .values('mood', 'weekday')
+        .annotate(count=Count('pk'))
+    )
+    # Recent moods, each with its moving averages
+    recent_moods = await _fetch(
+        moods.filter(date__gt=today - timedelta(days=RECENT_DAYS), date__lte=today)
+        .order_by('-date')
+        .annotate(**{f'avg_{days}': moving_average(days) for days in MOVING_AVERAGE_DAYS})
+    )
+    histogram = dict.fromkeys(MOOD_SCALE, 0)
+    weekdays = {number: {'count': 0, 'total': 0} for number in range(1, 8)}
+    for row in rows:
+        if row['mood'] in histogram:
+            histogram[row['mood']] += row['count']
+        weekdays[row['weekday']]['count'] += row['count']
+        weekdays[row['weekday']]['total'] += row['mood'] * row['count']
+
+    total_moods = sum(day['count'] for day in weekdays.values())
+    avg_mood = sum(day['total'] for day in weekdays.values()) / total_moods if total_moods else 0
+    weekday_stats = [
+        {'day': WEEKDAYS[number - 1], 'count': day['count'], 'average': round(day['total'] / day['count'], 1)}
+        for number, day in weekdays.items()
+        if day['count']
+    ]
+    largest_bar = max(histogram.values()) or 1
+
+    return {
+        'recent_moods': recent_moods,
+        'recent_days': RECENT_DAYS,
         'total_moods': total_moods,
         'avg_mood': round(avg_mood, 1),
+        'histogram': [
+            {'mood': mood, 'count': count, 'width': round(count * 100 / largest_bar)}
+            for mood, count in histogram.items()
+        ],
+        'weekday_stats': weekday_stats,
+        'best_weekday': max(weekday_stats, key=lambda day: day['average'], default=None),
+        'worst_weekday': min(weekday_stats, key=lambda day: day['average'], default=None),
     }
-    return render(request, 'moods/review_moods.html', context)
 
+@login_required
+def correlations(request):
+    """JSON correlations between the user's mood and their workouts and meals, same day and lagged."""
+    return JsonResponse(mood_correlations(request.user))
 
 
-class MoodListView(LoginRequiredMixin, ListView):
+class MoodListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Mood
     context_object_name = "moods"
     ordering = ["-date"]
@@ -41,34 +125,17 @@ class MoodListView(LoginRequiredMixin, ListView):
             user=self.request.user
         )  # Filter the queryset to only include objects created by the current user
         
-class MoodDetailView(LoginRequiredMixin, DetailView):
+class MoodDetailView(LoginRequiredMixin, AdjacentObjectsMixin, DetailView):
+    # previous_mood (older date) and next_mood (newer date) are added by AdjacentObjectsMixin
     model = Mood
     context_object_name = 'mood'
-    
+
     def get_queryset(self):
         queryset = super().get_queryset()
         return queryset.filter(
             user=self.request.user
         )  
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        mood = self.get_object()
-        
-        # Get previous mood (older date)
-        context['previous_mood'] = Mood.objects.filter(
-            user=self.request.user,
-            date__lt=mood.date
-        ).order_by('-date').first()
-        
-        # Get next mood (newer date)
-        context['next_mood'] = Mood.objects.filter(
-            user=self.request.user,
-            date__gt=mood.date
-        ).order_by('date').first()
-        
-        return context
-    
 class MoodCreateView(LoginRequiredMixin, CreateView):
     model = Mood
     context_object_name = 'mood'
@@ -0,0 +1,159 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import DateTimeField, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from meals.models import Meal
+from moods.models import Mood
+from workouts.models import Workout
+
+from .models import BITMAP_BYTES, ActivityYear
+
+# Kinds of entries tracked in the bitmaps, with the model they come from
+KINDS = {
+    'workouts': Workout,
+    'meals': Meal,
+    'moods': Mood,
+}
+
+
+def to_bits(bitmap):
+    return int.from_bytes(bitmap, 'little')
+
+
+def to_bitmap(bits):
+    return bits.to_bytes(BITMAP_BYTES, 'little')
+
+
+def entry_day(value):
+    """The day of an entry: meals and workouts have a datetime, moods a date."""
+    if isinstance(value, datetime):
+        return timezone.localdate(value)
+    return value
+
+
+def _bit(day):
+    return day.timetuple().tm_yday - 1
+
+
+def _on_day(model, day):
+    if isinstance(model._meta.get_field('date'), DateTimeField):
+        # A datetime range, so the (user, date) index can be used
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return {'date__gte': start, 'date__lt': start + timedelta(days=1)}
+    return {'date': day}
+
+
+def _update(user_id, year, kind, change):
+    with transaction.atomic():
+        activity, _ = ActivityYear.objects.select_for_update().get_or_create(user_id=user_id, year=year)
+        bits = to_bits(getattr(activity, kind))
+        new_bits = change(bits)
+        if new_bits != bits:
+            setattr(activity, kind, to_bitmap(new_bits))
+            activity.save(update_fields=[kind])
+
+
+def mark_days(user_id, kind, days):
+    """Mark days as having at least one entry of this kind, one update per year."""
+    years = defaultdict(int)
+    for day in days:
+        years[day.year] |= 1 << _bit(day)
+    for year, day_bits in years.items():
+        _update(user_id, year, kind, lambda bits: bits | day_bits)
+
+
+def unmark_day_if_empty(user_id, kind, day):
+    """Unmark a day an entry was moved from or deleted on, unless other entries are left that day."""
+    model = KINDS[kind]
+    if model.objects.filter(user_id=user_id, **_on_day(model, day)).exists():
+        return
+    _update(user_id, day.year, kind, lambda bits: bits & ~(1 << _bit(day)))
+
+
+def rebuild_activity(users=None):
+    """Recompute the bitmaps from the entries, e.g. after bulk inserts. Returns the number of years written."""
+    years = defaultdict(lambda: dict.fromkeys(KINDS, 0))
+    for kind, model in KINDS.items():
+        entries = model.objects.order_by()
+        if users is not None:
+            entries = entries.filter(user__in=users)
+        is_datetime = isinstance(model._meta.get_field('date'), DateTimeField)
+        days = entries.annotate(day=TruncDate('date') if is_datetime else F('date'))
+        for user_id, day in days.values_list('user_id', 'day').distinct().iterator():
+            years[user_id, day.year][kind] |= 1 << _bit(day)
+
+    activity = ActivityYear.objects.all()
+    if users is not None:
+        activity = activity.filter(user__in=users)
+    activity.delete()
+    created = ActivityYear.objects.bulk_create(
+        [
+            ActivityYear(user_id=user_id, year=year, **{kind: to_bitmap(bits) for kind, bits in kinds.items()})
+            for (user_id, year), kinds in years.items()
+        ],
+        batch_size=500,
+    )
+    return len(created)
+
+
+def longest_run(bits):
+    """Length of the longest run of set bits: each x & (x >> 1) shortens every run by one."""
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+
+def run_ending_at(bits, index):
+    """Length of the run of set bits that ends at bit index (0 if that bit isn't set)."""
+    if index < 0:
+        return 0
+    mask = (1 << (index + 1)) - 1
+    gaps = ~bits & mask
+    return index + 1 - gaps.bit_length()
+
+
+def activity_summary(user, year, today=None):
+    """
+    Heatmap of one year and current/longest streaks, computed from the user's
+    bitmaps (one small row per year) with bit operations.
+    """
+    today = today or timezone.localdate()
+    rows = list(ActivityYear.objects.filter(user=user).order_by('year'))
+
+    # All years as one integer per kind, bit 0 being 1 January of the first year
+    first_year = rows[0].year if rows else today.year
+    origin = date(first_year, 1, 1)
+    history = dict.fromkeys(KINDS, 0)
+    year_bits = dict.fromkeys(KINDS, 0)
+    for row in rows:
+        offset = (date(row.year, 1, 1) - origin).days
+        for kind in KINDS:
+            bits = to_bits(getattr(row, kind))
+            history[kind] |= bits << offset
+            if row.year == year:
+                year_bits[kind] = bits
+    history['any'] = history['workouts'] | history['meals'] | history['moods']
+
+    today_index = (today - origin).days
+    streaks = {}
+    for kind, bits in history.items():
+        # A streak still counts if nothing has been logged yet today
+        current = run_ending_at(bits, today_index) or run_ending_at(bits, today_index - 1)
+        streaks[kind] = {'current': current, 'longest': longest_run(bits)}
+
+    day_count = (date(year + 1, 1, 1) - date(year, 1, 1)).days
+    workouts, meals, moods = year_bits['workouts'], year_bits['meals'], year_bits['moods']
+    return {
+        'year': year,
+        'start': date(year, 1, 1).isoformat(),
+        # Number of kinds of entries logged on each day of the year (0 to 3)
+        'days': [(workouts >> i & 1) + (meals >> i & 1) + (moods >> i & 1) for i in range(day_count)],
+        'counts': {kind: bits.bit_count() for kind, bits in year_bits.items()},
+        'streaks': streaks,
+    }
@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from FitTrack.cache import acached
+from meals.aggregation import NUTRIENT_FIELDS, NutrientValues
+from meals.models import MealDailySummary
+from moods.models import Mood
+from workouts.models import Workout
+
+
+@dataclass
+class PeriodSummary:
+    """What the user logged over one period (today, or this week so far)."""
+    meals: int
+    nutrients: NutrientValues
+    workouts: int
+    workout_minutes: int
+    calories_burned: float
+    average_mood: float | None
+
+
+@dataclass
+class Dashboard:
+    day: date
+    week_start: date
+    today: PeriodSummary
+    week: PeriodSummary
+
+
+def _periods(aggregate, field, today):
+    """The same aggregate over the whole week and over today only."""
+    return {'week': aggregate(field), 'today': aggregate(field, filter=Q(**today))}
+
+
+async def abuild_dashboard(user, today=None):
+    """
+    Today's and this week's (from Monday) totals across meals, workouts and
+    moods, in three queries: one aggregate per app, each over an index range.
+
+    This is async only so the home page doesn't hold a worker thread when the
+    site is deployed under ASGI. It isn't faster: Django runs the three queries
+    one after the other on a single thread, as the sync version would.
+    """
+    today = today or timezone.localdate()
+    week_start = today - timedelta(days=today.weekday())
+    start = timezone.make_aware(datetime.combine(week_start, time.min))
+    end = timezone.make_aware(datetime.combine(today + timedelta(days=1), time.min))
+    today_start = timezone.make_aware(datetime.combine(today, time.min))
+
+    # Meals come from the daily rollup: at most 7 rows
+    meal_columns = {'meals': 'meal_count', **NUTRIENT_FIELDS}
+    meals = await MealDailySummary.objects.filter(user=user, day__gte=week_start, day__lte=today).aaggregate(**{
+        f'{period}_{name}': value
+        for name, column in meal_columns.items()
+        for period, value in _periods(Sum, column, {'day': today}).items()
+    })
+    workouts = await Workout.objects.filter(user=user, date__gte=start, date__lt=end).aaggregate(**{
+        f'{period}_{name}': value
+        for name, (aggregate, field) in {
+            'workouts': (Count, 'pk'),
+            'minutes': (Sum, 'duration'),
+            'calories': (Sum, 'calories'),
+        }.items()
+        for period, value in _periods(aggregate, field, {'date__gte': today_start}).items()
+    })
+    moods = await Mood.objects.filter(user=user, date__gte=week_start, date__lte=today).aaggregate(
+        week_mood=Avg('mood'),
+        today_mood=Avg('mood', filter=Q(date=today)),
+    )
+
+    def period(name):
+        average_mood = moods[f'{name}_mood']
+        return PeriodSummary(
+            meals=meals[f'{name}_meals'] or 0,
+            nutrients=NutrientValues(**{
+                nutrient: meals[f'{name}_{nutrient}'] or 0 for nutrient in NUTRIENT_FIELDS
+            }).rounded(),
+            workouts=workouts[f'{name}_workouts'],
+            workout_minutes=workouts[f'{name}_minutes'] or 0,
+            calories_burned=round(workouts[f'{name}_calories'] or 0, 1),
+            average_mood=None if average_mood is None else round(average_mood, 1),
+        )
+
+    return Dashboard(
+        day=today,
+        week_start=week_start,
+        today=period('today'),
+        week=period('week'),
+    )
+
+
+async def aget_dashboard(user):
+    """abuild_dashboard() for the user, cached until they log or change something (or the day changes)."""
+    today = timezone.localdate()
+    return await acached('dashboard', user.pk, lambda: abuild_dashboard(user, today), today.isoformat())
@@ -0,0 +1,116 @@
+import json
+import subprocess
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.utils import timezone
+
+from FitTrack.benchmark import SKIPPED, benchmark_urls, failures, seed_user
+
+User = get_user_model()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every page against users with histories of different sizes, in a throwaway "
+        "test database: latency (p50/p95), SQL queries and peak memory. Fails if a page runs "
+        "more queries than its budget (see FitTrack/benchmark.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entries',
+            action='append',
+            type=int,
+            help="Meals, workouts and moods of the benchmark user (can be repeated, default: 1 and 1000).",
+        )
+        parser.add_argument('--repeat', type=int, default=10, help="Timed requests per page (default: 10).")
+        parser.add_argument(
+            '--url',
+            action='append',
+            dest='names',
+            help="Only benchmark the URL with this name (can be repeated).",
+        )
+        parser.add_argument('--warm', action='store_true', help="Keep the page cache between requests.")
+        parser.add_argument(
+            '--asgi',
+            action='store_true',
+            help="Request the pages through the ASGI handler instead of the WSGI one.",
+        )
+        parser.add_argument('--output', help="Write the results as JSON to this file, e.g. to diff two commits.")
+
+    def handle(self, *args, **options):
+        volumes = options['entries'] or [1, 1000]
+        if options['repeat'] < 1 or min(volumes) < 1:
+            raise CommandError("--repeat and --entries must be at least 1.")
+
+        report = {
+            'commit': _git_commit(),
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'cache': 'warm' if options['warm'] else 'cold',
+            'handler': 'asgi' if options['asgi'] else 'wsgi',
+            'skipped': SKIPPED,
+            'volumes': {},
+        }
+        client_class = AsyncClient if options['asgi'] else Client
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            # The nutrition lookup must not call the real API
+            with override_settings(NUTRITION_CLIENT='meals.nutrition.StaticNutritionClient'):
+                for entries in volumes:
+                    user = User.objects.create_user(username=f'benchmark-{entries}', password='benchmark')
+                    seed_user(user, entries)
+                    results = benchmark_urls(
+                        client_class(raise_request_exception=False), user, options['repeat'], names=options['names'], warm=options['warm'],
+                    )
+                    report['volumes'][entries] = results
+                    self.write_results(entries, results)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        failed = {
+            f'{name} ({entries} entries)'
+            for entries, results in report['volumes'].items()
+            for name in failures(results)
+        }
+        if failed:
+            raise CommandError(f"Over their query budget or failing: {', '.join(sorted(failed))}")
+        self.stdout.write(self.style.SUCCESS("Every page is within its query budget."))
+
+    def write_results(self, entries, results):
+        self.stdout.write(f"\n{entries} entries per dataset")
+        self.stdout.write(f"{'url':<24} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>9} {'memory kB':>10}")
+        for name, result in results.items():
+            queries = f"{result['queries']}/{result['query_budget'] or '-'}"
+            self.stdout.write(
+                f"{name:<24} {result['status']:>6} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+                f"{queries:>9} {result['peak_memory_kb']:>10}"
+            )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from FitTrack.cache import cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show the hits and misses of the per-user page cache (FitTrack/cache.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Reset the counters after showing them.")
+
+    def handle(self, *args, **options):
+        for name, stats in cache_stats().items():
+            hit_rate = '-' if stats['hit_rate'] is None else f"{stats['hit_rate']:.1%}"
+            self.stdout.write(f"{name:<20} {stats['hits']:>8} hits {stats['misses']:>8} misses  hit rate {hit_rate}")
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
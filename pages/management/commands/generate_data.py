@@ -0,0 +1,83 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from FitTrack.cache import APPS, bump_versions
+from FitTrack.synthetic import HistoryWriter, generate_history, user_rng
+from meals.rollups import rebuild_daily_summaries
+from pages.activity import rebuild_activity
+from workouts.records import rebuild_personal_records
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users with years of synthetic meals, workouts and moods, e.g. to reproduce "
+        "production-scale problems locally. The same --seed always gives the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Number of users to create (default: 10).")
+        parser.add_argument('--years', type=float, default=1, help="Years of history per user (default: 1).")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0).")
+        parser.add_argument(
+            '--prefix',
+            default='synthetic',
+            help="Usernames are the prefix and a number, e.g. synthetic-1 (default: synthetic).",
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            help="Last day of the histories, YYYY-MM-DD (default: today).",
+        )
+        parser.add_argument(
+            '--password',
+            help="Password of the new users, to log in as them (by default they can't log in).",
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT (default: 5000).")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['years'] <= 0 or options['batch_size'] < 1:
+            raise CommandError("--users, --years and --batch-size must be positive.")
+        usernames = [f"{options['prefix']}-{number}" for number in range(1, options['users'] + 1)]
+        existing = User.objects.filter(username__in=usernames).values_list('username', flat=True)
+        if existing:
+            raise CommandError(f"User(s) already exist: {', '.join(sorted(existing))}. Use another --prefix.")
+
+        last_day = options['end'] or timezone.localdate()
+        first_day = last_day - timedelta(days=round(options['years'] * 365.25) - 1)
+        # Hashing is slow on purpose: every user shares one hash
+        password = make_password(options['password'])
+
+        started = time.perf_counter()
+        writer = HistoryWriter(batch_size=options['batch_size'])
+        with transaction.atomic():
+            users = User.objects.bulk_create([User(username=username, password=password) for username in usernames])
+            for number, user in enumerate(users, start=1):
+                generate_history(user, user_rng(options['seed'], number), first_day, last_day, writer)
+                self.stdout.write(f"{user.username}: {writer.written + writer.pending} rows so far")
+            writer.close()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"Created {len(users)} users and {writer.written} meals, ingredients, workouts and moods "
+                f"from {first_day} to {last_day} in {elapsed:.1f}s ({writer.written / elapsed:.0f} rows/s)."
+            )
+
+            # The inserts skipped the signals that keep these up to date
+            started = time.perf_counter()
+            summaries = rebuild_daily_summaries(users=users)
+            records = rebuild_personal_records(users=users)
+            years = rebuild_activity(users=users)
+            for app in APPS:
+                bump_versions(app, [user.pk for user in users])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {summaries} daily meal summaries, {records} personal records and {years} years of "
+            f"activity in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from pages.activity import rebuild_activity
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild the activity calendar bitmaps from the workouts, meals and moods."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help="Only rebuild the calendar of this username (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = list(User.objects.filter(username__in=options['usernames']))
+            missing = set(options['usernames']) - {user.username for user in users}
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+
+        with transaction.atomic():
+            written = rebuild_activity(users=users)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} years of activity."))
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:21
+
+import django.db.models.deletion
+import pages.models
+from django.conf import settings
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import TruncDate
+
+
+def build_activity(apps, schema_editor):
+    """Fill the bitmaps from the entries logged before they existed."""
+    ActivityYear = apps.get_model('pages', 'ActivityYear')
+    sources = {
+        'workouts': (apps.get_model('workouts', 'Workout'), TruncDate('date')),
+        'meals': (apps.get_model('meals', 'Meal'), TruncDate('date')),
+        'moods': (apps.get_model('moods', 'Mood'), F('date')),
+    }
+    years = defaultdict(lambda: dict.fromkeys(sources, 0))
+    for kind, (model, day) in sources.items():
+        days = model.objects.order_by().annotate(day=day).values_list('user_id', 'day').distinct()
+        for user_id, day in days.iterator():
+            years[user_id, day.year][kind] |= 1 << (day.timetuple().tm_yday - 1)
+    ActivityYear.objects.bulk_create(
+        (
+            ActivityYear(user_id=user_id, year=year, **{kind: bits.to_bytes(46, 'little') for kind, bits in kinds.items()})
+            for (user_id, year), kinds in years.items()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('meals', '0005_meal_user_date_index'),
+        ('moods', '0003_alter_mood_table'),
+        ('workouts', '0007_workout_type_choices'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('workouts', models.BinaryField(default=pages.models.empty_bitmap, help_text='Days with at least one workout.')),
+                ('meals', models.BinaryField(default=pages.models.empty_bitmap, help_text='Days with at least one meal.')),
+                ('moods', models.BinaryField(default=pages.models.empty_bitmap, help_text='Days with a mood.')),
+                ('user', models.ForeignKey(help_text='The user whose activity this is.', on_delete=django.db.models.deletion.CASCADE, related_name='activity_years', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'activity_year',
+                'unique_together': {('user', 'year')},
+            },
+        ),
+        migrations.RunPython(build_activity, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,36 @@
 from django.db import models
+from django.contrib.auth import get_user_model
 
-# Create your models here.
+User = get_user_model()
+
+# Bytes in a year bitmap: one bit per day, 366 days at most
+BITMAP_BYTES = 46
+
+
+def empty_bitmap():
+    return bytes(BITMAP_BYTES)
+
+
+class ActivityYear(models.Model):
+    """
+    Which days of one year a user logged a workout, a meal or a mood, as one
+    bitmap per kind of entry: bit 0 is 1 January, bit 1 is 2 January, and so on.
+    Kept up to date by pages.activity when entries are created, edited or deleted.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='activity_years',
+        help_text="The user whose activity this is."
+    )
+    year = models.PositiveSmallIntegerField()
+    workouts = models.BinaryField(default=empty_bitmap, help_text="Days with at least one workout.")
+    meals = models.BinaryField(default=empty_bitmap, help_text="Days with at least one meal.")
+    moods = models.BinaryField(default=empty_bitmap, help_text="Days with a mood.")
+
+    class Meta:
+        db_table = 'activity_year'
+        unique_together = ('user', 'year')
+
+    def __str__(self):
+        return f"Activity of {self.user.username} in {self.year}"
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from FitTrack.signals import deleting_user
+
+from .activity import KINDS, entry_day, mark_days, unmark_day_if_empty
+
+
+def remember_day(sender, instance, raw=False, **kwargs):
+    # An edit can move an entry to another day, which may then have to be unmarked
+    if instance.pk and not raw:
+        old_date = sender.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+        instance._activity_day = entry_day(old_date) if old_date else None
+
+
+def entry_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    kind = SENDER_KINDS[sender]
+    day = entry_day(instance.date)
+    mark_days(instance.user_id, kind, [day])
+    old_day = getattr(instance, '_activity_day', None)
+    if old_day and old_day != day:
+        unmark_day_if_empty(instance.user_id, kind, old_day)
+
+
+def entry_deleted(sender, instance, origin=None, **kwargs):
+    if deleting_user(origin):
+        return
+    unmark_day_if_empty(instance.user_id, SENDER_KINDS[sender], entry_day(instance.date))
+
+
+SENDER_KINDS = {model: kind for kind, model in KINDS.items()}
+
+for model in KINDS.values():
+    pre_save.connect(remember_day, sender=model, dispatch_uid=f'activity_pre_save_{model._meta.label}')
+    post_save.connect(entry_saved, sender=model, dispatch_uid=f'activity_post_save_{model._meta.label}')
+    post_delete.connect(entry_deleted, sender=model, dispatch_uid=f'activity_post_delete_{model._meta.label}')
+
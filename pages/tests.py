@@ -1,3 +1,228 @@
-from django.test import TestCase
+import json
+from datetime import date, timedelta
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import AsyncClient, Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from FitTrack.benchmark import benchmark_urls, failures, seed_user
+from FitTrack.cache import cache_stats
+from FitTrack.profiling import RequestProfile
+from meals import rollups
+from meals.ingredients import MEAL_TOTAL_FIELDS
+from meals.models import Ingredient, Meal, MealDailySummary
+
+from moods.models import Mood
+from workouts.calories import estimate_calories
+from workouts.models import Workout
+
+from .activity import activity_summary, longest_run, rebuild_activity, run_ending_at
+from .dashboard import aget_dashboard
+from .models import ActivityYear
+
+User = get_user_model()
+
+
+class BitOperationTests(TestCase):
+    def test_longest_run(self):
+        self.assertEqual(longest_run(0), 0)
+        self.assertEqual(longest_run(0b1011100111), 3)
+
+    def test_run_ending_at(self):
+        self.assertEqual(run_ending_at(0b0111, 2), 3)
+        self.assertEqual(run_ending_at(0b0101, 2), 1)
+        self.assertEqual(run_ending_at(0b0101, 1), 0)
+        self.assertEqual(run_ending_at(0b1, -1), 0)
+
+
+class ActivityCalendarTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='streaker', password='pw')
+        self.today = date(2025, 1, 3)
+
+    def log_moods(self, *days):
+        return [Mood.objects.create(user=self.user, date=day, mood=5) for day in days]
+
+    def test_streaks_span_years_and_follow_deletes(self):
+        # 30 December 2024 to 3 January 2025, then a gap
+        moods = self.log_moods(*(self.today - timedelta(days=i) for i in range(5)), date(2024, 12, 1))
+        summary = activity_summary(self.user, 2025, self.today)
+        self.assertEqual(summary['streaks']['moods'], {'current': 5, 'longest': 5})
+        self.assertEqual(summary['streaks']['workouts'], {'current': 0, 'longest': 0})
+        self.assertEqual(summary['days'][:4], [1, 1, 1, 0])
+        self.assertEqual(summary['counts']['moods'], 3)
+
+        moods[2].delete()  # 1 January
+        summary = activity_summary(self.user, 2025, self.today)
+        self.assertEqual(summary['streaks']['moods'], {'current': 2, 'longest': 2})
+
+        stored = sorted(ActivityYear.objects.values_list('year', 'moods'))
+        rebuild_activity(users=[self.user])
+        self.assertEqual(stored, sorted(ActivityYear.objects.values_list('year', 'moods')))
+
+    def test_deleting_the_user(self):
+        self.log_moods(self.today)
+        self.user.delete()
+        self.assertFalse(ActivityYear.objects.exists())
+
+    def test_streak_is_kept_until_the_end_of_today(self):
+        self.log_moods(self.today - timedelta(days=1), self.today - timedelta(days=2))
+        summary = activity_summary(self.user, 2025, self.today)
+        self.assertEqual(summary['streaks']['moods']['current'], 2)
+
+    def test_endpoint(self):
+        self.client.force_login(self.user)
+        self.assertEqual(len(self.client.get(reverse('activity'), {'year': 2024}).json()['days']), 366)
+        self.assertEqual(self.client.get(reverse('activity'), {'year': 'soon'}).status_code, 400)
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        # Primary keys are reused between tests, and so would the cached dashboards be
+        cache.clear()
+        self.user = User.objects.create_user(username='dasher', password='pw')
+        self.today = timezone.localdate()
+        now = timezone.now()
+        self.meal = Meal.objects.create(user=self.user, date=now, name='Lunch', **dict.fromkeys(MEAL_TOTAL_FIELDS, 100))
+        rollups.add_meal(self.meal)
+        Workout.objects.create(
+            user=self.user, date=now, workout_type=Workout.WorkoutType.HIIT,
+            duration=30, intensity=Workout.Intensity.HIGH, calories=420,
+        )
+        Mood.objects.create(user=self.user, date=self.today, mood=8)
+
+    def test_home_shows_today(self):
+        self.client.force_login(self.user)
+        today = self.client.get(reverse('home')).context['dashboard'].today
+        self.assertEqual((today.meals, today.nutrients.carbs), (1, 100))
+        self.assertEqual((today.workouts, today.workout_minutes, today.calories_burned), (1, 30, 420))
+        self.assertEqual(today.average_mood, 8)
+
+    async def test_home_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('home'))
+        self.assertEqual(response.context['dashboard'].week.workouts, 1)
+        self.assertContains(response, 'dasher')
+
+    def test_cache_is_dropped_when_data_arrives(self):
+        get_dashboard = async_to_sync(aget_dashboard)
+        dashboard = get_dashboard(self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_dashboard(self.user), dashboard)
+        with self.captureOnCommitCallbacks(execute=True):
+            Meal.objects.create(user=self.user, name='Snack', **dict.fromkeys(MEAL_TOTAL_FIELDS, 10))
+        # Built again: one aggregate per app
+        with self.assertNumQueries(3):
+            get_dashboard(self.user)
+        self.assertEqual(cache_stats(['dashboard'])['dashboard'], {'hits': 1, 'misses': 2, 'hit_rate': 0.333})
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='profiled', password='pw')
+
+    def test_profiled_request(self):
+        # assertLogs() stands in for the log file
+        with override_settings(PROFILING_SAMPLE_RATE=1), self.assertLogs('fittrack.profiling') as logs:
+            client = Client()
+            client.force_login(self.user)
+            response = client.get(reverse('home'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries, 0 repeated", tpl;dur=')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['view'], record['status']), ('home', 200))
+        self.assertGreater(record['queries'], 0)
+
+    async def test_profiled_async_request(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1), self.assertLogs('fittrack.profiling') as logs:
+            client = AsyncClient()
+            await client.aforce_login(self.user)
+            await client.get(reverse('review-moods'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'review-moods')
+        # The session and the user, then the two queries of the review
+        self.assertEqual(record['queries'], 4)
+        self.assertGreater(record['template_ms'], 0)
+
+    def test_off_by_default(self):
+        self.assertNotIn('Server-Timing', Client().get(reverse('home')))
+
+    def test_repeated_queries(self):
+        profile = RequestProfile()
+        for sql in ('SELECT 1 WHERE id = %s', 'SELECT 2 WHERE id IN (%s)', 'SELECT 2 WHERE id IN (%s, %s)', 'SELECT 1 WHERE id = %s'):
+            profile.record_query(lambda *args: None, sql, (), False, {})
+        self.assertEqual(profile.duplicates, [('SELECT 1 WHERE id = %s', 2), ('SELECT 2 WHERE id IN (...)', 2)])
+
+
+class BenchmarkTests(TestCase):
+    def test_every_page_within_its_query_budget(self):
+        user = User.objects.create_user(username='benchmarked', password='pw')
+        seed_user(user, 20)
+        self.assertEqual(Meal.objects.filter(user=user).count(), 20)
+        self.assertEqual(Mood.objects.filter(user=user).count(), 20)
+
+        results = benchmark_urls(Client(raise_request_exception=False), user, repeat=1)
+        self.assertIn('review-moods', results)
+        self.assertNotIn('logout', results)
+        self.assertEqual(failures(results), [])
+
+    def test_asgi_handler(self):
+        user = User.objects.create_user(username='benchmarked', password='pw')
+        seed_user(user, 5)
+        names = ['home', 'review-meals', 'review-workouts', 'review-moods', 'export-data']
+
+        results = benchmark_urls(AsyncClient(raise_request_exception=False), user, repeat=1, names=names)
+        self.assertEqual(set(results), set(names))
+        self.assertEqual(failures(results), [])
+        self.assertGreater(results['review-moods']['queries'], 0)
+
+
+class GenerateDataTests(TestCase):
+    def generate(self, prefix, users=2):
+        call_command(
+            'generate_data', users=users, years=0.25, seed=7, prefix=prefix, end=date(2024, 3, 31), stdout=StringIO(),
+        )
+
+    def history(self, username):
+        return (
+            list(Meal.objects.filter(user__username=username).order_by('date').values_list('name', 'date', 'total_weight')),
+            list(Ingredient.objects.filter(meal__user__username=username).order_by('pk').values_list('name', 'weight')),
+            list(Workout.objects.filter(user__username=username).order_by('date').values_list('date', 'duration', 'calories')),
+            list(Mood.objects.filter(user__username=username).order_by('date').values_list('date', 'mood')),
+        )
+
+    def test_same_seed_same_data(self):
+        self.generate('one')
+        self.generate('two', users=1)
+        self.assertEqual(self.history('one-1'), self.history('two-1'))
+        self.assertNotEqual(self.history('one-1'), self.history('one-2'))
+
+    def test_consistent_history(self):
+        self.generate('gen')
+        user = User.objects.get(username='gen-1')
+        meals = Meal.objects.filter(user=user)
+        self.assertTrue(meals.exists())
+        for meal in meals.prefetch_related('ingredients')[:20]:
+            self.assertAlmostEqual(meal.total_sodium, sum(i.sodium for i in meal.ingredients.all()), places=1)
+        for workout in Workout.objects.filter(user=user):
+            self.assertEqual(workout.calories, estimate_calories(
+                workout.workout_type, workout.duration, workout.distance, workout.intensity,
+            ))
+            if workout.is_distance_based:
+                self.assertEqual(workout.pace, round(workout.duration / workout.distance, 2))
+        self.assertLessEqual(Mood.objects.filter(user=user).count(), 91)
+
+        # Everything derived from the entries was rebuilt
+        days = set(meals.dates('date', 'day'))
+        self.assertEqual(set(MealDailySummary.objects.filter(user=user).values_list('day', flat=True)), days)
+        self.assertTrue(ActivityYear.objects.filter(user=user, year=2024).exists())
+
+    def test_existing_users(self):
+        self.generate('gen', users=1)
+        with self.assertRaises(CommandError):
+            self.generate('gen', users=1)
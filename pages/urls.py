@@ -4,4 +4,5 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('contact/',views.contact, name='contact'),
+    path('activity/', views.activity, name='activity'),
 ]
\ No newline at end of file
@@ -1,7 +1,33 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.utils import timezone
 
-def home(request):
-    return render(request, 'pages/home.html')
+from .activity import activity_summary
+from .dashboard import aget_dashboard
+
+async def home(request):
+    # Templates read request.user: give them this user, loaded asynchronously, instead
+    # of the lazy one that would query again synchronously (which isn't allowed here)
+    user = request.user = await request.auser()
+    context = {}
+    if user.is_authenticated:
+        dashboard = await aget_dashboard(user)
+        context['dashboard'] = dashboard
+        context['dashboard_periods'] = [('Today', dashboard.today), ('This Week', dashboard.week)]
+    return render(request, 'pages/home.html', context)
 
 def contact(request):
-    return render(request, 'pages/contact.html')
\ No newline at end of file
+    return render(request, 'pages/contact.html')
+
+@login_required
+def activity(request):
+    """Heatmap of the days with workouts, meals and moods in ?year= (default: this year), and streaks."""
+    today = timezone.localdate()
+    try:
+        year = int(request.GET.get('year', today.year))
+    except ValueError:
+        year = 0
+    if not 1 <= year <= today.year + 1:
+        return JsonResponse({'error': f'year must be a number up to {today.year + 1}.'}, status=400)
+    return JsonResponse(activity_summary(request.user, year, today))
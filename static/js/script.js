@@ -222,6 +222,13 @@ document.addEventListener("DOMContentLoaded", () => {
     const calsDisplay = document.getElementById("estimatedCaloriesDisplay");
     const calsHiddenInput = document.getElementById("estimatedCalories");
 
+    // Workout types and intensities are posted as numbers: the logic below works on
+    // the label of the selected option ("Running", "Low", ...)
+    function selectedLabel(select) {
+      const option = select.options[select.selectedIndex];
+      return option && option.value ? option.text : "";
+    }
+
     // Defining which workouts are "distance-based"
     const distanceBasedWorkouts = ["Running", "Walking", "Cycling"];
 
@@ -240,7 +247,7 @@ document.addEventListener("DOMContentLoaded", () => {
     // Function to display hidden fields
 
     function displayHiddenField() {
-      const selectedWorkout = workoutType.value;
+      const selectedWorkout = selectedLabel(workoutType);
       distanceGroup.style.display = distanceBasedWorkouts.includes(
         selectedWorkout
       )
@@ -273,7 +280,7 @@ document.addEventListener("DOMContentLoaded", () => {
     // Function to display and calculate pace field
 
     function calculatePace() {
-      const selectedWorkout = workoutType.value;
+      const selectedWorkout = selectedLabel(workoutType);
       const durationEntered = parseFloat(durationInput.value);
       const distanceEntered = parseFloat(distanceInput.value);
       if (
@@ -294,9 +301,11 @@ document.addEventListener("DOMContentLoaded", () => {
     // Here's a basic formula :  (METs * Body Weight in kg * Duration in hours)
 
     // First we need to calculate MET (Metabolic Equivalent of Task)
+    // This is only a preview: the saved calories are recomputed on the server
+    // with the same tables (workouts/calories.py), so keep the two in sync.
 
     function calculateMET() {
-      const selectedWorkout = workoutType.value;
+      const selectedWorkout = selectedLabel(workoutType);
       let MET;
 
       if (distanceBasedWorkouts.includes(selectedWorkout)) {
@@ -333,7 +342,7 @@ document.addEventListener("DOMContentLoaded", () => {
             break;
         }
       } else {
-        const intensityEntered = intensityInput.value;
+        const intensityEntered = selectedLabel(intensityInput);
 
         switch (selectedWorkout) {
           case "Rowing":
@@ -401,7 +410,7 @@ document.addEventListener("DOMContentLoaded", () => {
     // Function to display the estimated Cals
 
     function displayCalsGroup() {
-      const selectedWorkout = workoutType.value;
+      const selectedWorkout = selectedLabel(workoutType);
       const durationEntered = parseFloat(durationInput.value);
       const distanceEntered = parseFloat(distanceInput.value);
       const intensityEntered = intensityInput.value;
@@ -551,6 +560,8 @@ document.addEventListener("DOMContentLoaded", () => {
             type="text" 
             id="foodName${currentRowCount}" 
             name="foodName[]" 
+            list="foodSuggestions"
+            autocomplete="off"
             placeholder="e.g., Apple" 
             value="${ingredientsData[i].name}"
             required
@@ -600,7 +611,7 @@ document.addEventListener("DOMContentLoaded", () => {
       newRow.innerHTML = `
       <div class="form-group">
           <label for="foodName${currentRowCount}">Food Name</label>
-          <input type="text" id="foodName${currentRowCount}" name="foodName[]" placeholder="e.g., Apple" required>
+          <input type="text" id="foodName${currentRowCount}" name="foodName[]" list="foodSuggestions" autocomplete="off" placeholder="e.g., Apple" required>
       </div>
       <div class="form-group food-quantity-group">
           <label for="foodQuantity${currentRowCount}">Quantity (g)</label>
@@ -621,34 +632,73 @@ document.addEventListener("DOMContentLoaded", () => {
       }
     });
 
-    // Function to call the Ninja API Nutrition
+    // Food name suggestions from the food catalog, shown while typing
+    const foodSuggestions = document.getElementById("foodSuggestions");
+    let suggestionTimer;
+    foodEntriesContainer.addEventListener("input", function (event) {
+      if (event.target.name !== "foodName[]") return;
+      const query = event.target.value.trim();
+      clearTimeout(suggestionTimer);
+      if (query.length < 2) return;
+      suggestionTimer = setTimeout(async () => {
+        try {
+          const response = await fetch(
+            `/meal/foods/?q=${encodeURIComponent(query)}`
+          );
+          const data = await response.json();
+          foodSuggestions.innerHTML = "";
+          data.results.forEach((name) => {
+            const option = document.createElement("option");
+            option.value = name;
+            foodSuggestions.appendChild(option);
+          });
+        } catch (error) {
+          console.error("Failed to get food suggestions:", error);
+        }
+      }, 200);
+    });
+
+    // Function to get the nutrition data of every food in one request
+    // (the server looks them up on the Ninja API Nutrition and caches the answers)
     async function runNutritionAPI() {
-      const APIKey = "vcfVfXLPlqLa8X0Uc6N6Pw==bG86tqJp6i5Q8qv6";
       const foodNameInputs = document.querySelectorAll(
         'input[name="foodName[]"]'
       );
+      const csrfToken = mealForm.querySelector(
+        'input[name="csrfmiddlewaretoken"]'
+      ).value;
       fieldErrorMessage.textContent = "";
+      const foods = Array.from(foodNameInputs, (input) => input.value.trim());
+      let data;
+      try {
+        const response = await fetch("/meal/nutrition/", {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+            "X-CSRFToken": csrfToken,
+          },
+          body: JSON.stringify({ foods }),
+        });
+        data = await response.json();
+        if (data.error) throw new Error(data.error);
+      } catch (error) {
+        console.error(error);
+        fieldErrorMessage.innerHTML = `<strong> API error:</strong> ${error}`;
+        return null;
+      }
       const allResults = [];
-      for (let i = 0; i < foodNameInputs.length; i++) {
-        const food = foodNameInputs[i].value.trim();
-        try {
-          const response = await fetch(
-            `https://api.api-ninjas.com/v1/nutrition?query=${food}`,
-            { method: "GET", headers: { "X-Api-Key": APIKey } }
-          );
-          const data = await response.json();
-          if (data.error) throw new Error(data.error);
-          if (data.length === 0)
-            throw new Error(`Something went wrong for '${food}'.`);
-          allResults.push({ food, result: data[0], inputIndex: i });
-        } catch (error) {
+      for (let i = 0; i < data.results.length; i++) {
+        const { food, result, error } = data.results[i];
+        if (error) {
           console.error(error);
-          if (error.message.includes("down")) {
+          if (error.includes("down")) {
             fieldErrorMessage.innerHTML = `<strong> API error:</strong> ${error}<br> Check the status page <a href='https://api-ninjas.com/api/nutrition'> here</a>.`;
             return null;
           }
           fieldErrorMessage.innerHTML += `There was an issue getting the nutritional data for "<strong>${food}</strong>". Make sure there's no typo or try something else.<br>`;
+          continue;
         }
+        allResults.push({ food, result, inputIndex: i });
       }
       return allResults.length > 0 ? allResults : null;
     }
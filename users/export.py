@@ -0,0 +1,128 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from meals.ingredients import INGREDIENT_FIELDS, MEAL_TOTAL_FIELDS
+from meals.models import Meal
+from moods.models import Mood
+from workouts.models import Workout
+
+# Rows fetched from the database at a time while exporting
+CHUNK_SIZE = 2000
+
+EXPORT_TYPES = ('meals', 'workouts', 'moods')
+
+WORKOUT_FIELDS = ['id', 'date', 'workout_type', 'duration', 'distance', 'pace', 'intensity', 'calories']
+# Workout types and intensities are stored as numbers but exported as their labels
+WORKOUT_LABELS = {
+    'workout_type': dict(Workout.WorkoutType.choices),
+    'intensity': dict(Workout.Intensity.choices),
+}
+MOOD_FIELDS = ['id', 'date', 'mood', 'notes']
+# Same columns as the meal import CSV (see meals/importers.py), plus the meal id
+MEAL_CSV_FIELDS = ['meal_id', 'date', 'meal_name', 'name', *INGREDIENT_FIELDS.values()]
+
+
+class Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a streaming response."""
+
+    def write(self, value):
+        return value
+
+
+def _meals(user):
+    # iterator() with a chunk size also prefetches the ingredients chunk by chunk
+    return (
+        Meal.objects.filter(user=user).order_by('date', 'pk')
+        .prefetch_related('ingredients')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def _values(model, user, fields):
+    rows = (
+        model.objects.filter(user=user).order_by('date', 'pk')
+        .values_list(*fields)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    if model is not Workout:
+        return rows
+    labels = [(fields.index(field), choices) for field, choices in WORKOUT_LABELS.items()]
+    return (_with_labels(row, labels) for row in rows)
+
+
+def _with_labels(row, labels):
+    row = list(row)
+    for index, choices in labels:
+        row[index] = choices.get(row[index], row[index])
+    return row
+
+
+def meal_record(meal):
+    """A meal in the JSONL import format (see meals/importers.py), plus its id."""
+    return {
+        'type': 'meal',
+        'id': meal.pk,
+        'meal_name': meal.name,
+        'date': meal.date.isoformat(),
+        'totals': {key: getattr(meal, column) for column, key in MEAL_TOTAL_FIELDS.items()},
+        'items': [
+            {'name': ingredient.name, **{key: getattr(ingredient, field) for field, key in INGREDIENT_FIELDS.items()}}
+            for ingredient in meal.ingredients.all()
+        ],
+    }
+
+
+def ndjson_lines(user, types):
+    """One JSON document per line, for each meal, workout and mood of the user."""
+    if 'meals' in types:
+        for meal in _meals(user):
+            yield json.dumps(meal_record(meal)) + '\n'
+    for export_type, model, fields in (('workouts', Workout, WORKOUT_FIELDS), ('moods', Mood, MOOD_FIELDS)):
+        if export_type in types:
+            record_type = export_type[:-1]
+            for row in _values(model, user, fields):
+                record = dict(zip(fields, row))
+                record['date'] = record['date'].isoformat()
+                yield json.dumps({'type': record_type, **record}) + '\n'
+
+
+def csv_lines(user, export_type):
+    """CSV lines for one type of entry. Meals have one row per ingredient."""
+    writer = csv.writer(Echo())
+    if export_type == 'meals':
+        yield writer.writerow(MEAL_CSV_FIELDS)
+        for meal in _meals(user):
+            meal_columns = [meal.pk, meal.date.isoformat(), meal.name]
+            ingredients = meal.ingredients.all()
+            if not ingredients:
+                yield writer.writerow(meal_columns)
+            for ingredient in ingredients:
+                yield writer.writerow(
+                    meal_columns + [ingredient.name] + [getattr(ingredient, field) for field in INGREDIENT_FIELDS]
+                )
+        return
+
+    model, fields = (Workout, WORKOUT_FIELDS) if export_type == 'workouts' else (Mood, MOOD_FIELDS)
+    yield writer.writerow(fields)
+    date_index = fields.index('date')
+    for row in _values(model, user, fields):
+        row = list(row)
+        row[date_index] = row[date_index].isoformat()
+        yield writer.writerow(row)
+
+
+async def aiter_lines(lines):
+    """
+    The same lines as an async iterator, for streaming under ASGI. Django would
+    otherwise read a sync iterator to the end before sending anything. The lines
+    are read CHUNK_SIZE at a time on the request's thread, which holds the cursor.
+    """
+    next_chunk = sync_to_async(lambda: ''.join(islice(lines, CHUNK_SIZE)))
+    try:
+        while chunk := await next_chunk():
+            yield chunk
+    finally:
+        await sync_to_async(lines.close)()
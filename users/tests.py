@@ -1,3 +1,106 @@
-from django.test import TestCase
+import csv
+import json
+import warnings
+from datetime import datetime, timezone as dt_timezone
 
-# Create your tests here.
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase
+from django.urls import reverse
+
+from meals.importers import import_meals
+from meals.ingredients import INGREDIENT_FIELDS, MEAL_TOTAL_FIELDS
+from meals.models import Ingredient, Meal
+from moods.models import Mood
+from workouts.models import Workout
+
+User = get_user_model()
+
+LUNCH = datetime(2024, 1, 1, 12, tzinfo=dt_timezone.utc)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='exporter', password='pw')
+        cls.meal = Meal.objects.create(user=cls.user, name='Lunch', date=LUNCH, **dict.fromkeys(MEAL_TOTAL_FIELDS, 15))
+        for name, value in (('rice', 10), ('beans', 5)):
+            Ingredient.objects.create(meal=cls.meal, name=name, **dict.fromkeys(INGREDIENT_FIELDS, value))
+        cls.workout = Workout.objects.create(
+            user=cls.user, date=LUNCH, workout_type=Workout.WorkoutType.YOGA, duration=45,
+            intensity=Workout.Intensity.LOW, calories=120,
+        )
+        cls.mood = Mood.objects.create(user=cls.user, date=LUNCH.date(), mood=7, notes='Fine, "really"')
+
+        other = User.objects.create_user(username='other', password='pw')
+        Meal.objects.create(user=other, name='Not mine', date=LUNCH, **dict.fromkeys(MEAL_TOTAL_FIELDS, 1))
+        Mood.objects.create(user=other, date=LUNCH.date(), mood=1)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export-data'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        records = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([record['type'] for record in records], ['meal', 'workout', 'mood'])
+        meal, workout, mood = records
+        self.assertEqual((meal['id'], meal['meal_name'], meal['date']), (self.meal.pk, 'Lunch', LUNCH.isoformat()))
+        self.assertEqual([(item['name'], item['weight']) for item in meal['items']], [('rice', 10), ('beans', 5)])
+        self.assertEqual(meal['totals']['sodium_mg'], 15)
+        # Choices are exported as their labels
+        self.assertEqual((workout['workout_type'], workout['intensity'], workout['duration']), ('Yoga', 'Low', 45))
+        self.assertEqual(mood, {'type': 'mood', 'id': self.mood.pk, 'date': '2024-01-01', 'mood': 7, 'notes': 'Fine, "really"'})
+
+        self.assertEqual([json.loads(line)['type'] for line in self.export(type='moods').splitlines()], ['mood'])
+
+    def test_csv(self):
+        moods = list(csv.reader(self.export(format='csv', type='moods').splitlines()))
+        self.assertEqual(moods, [['id', 'date', 'mood', 'notes'], [str(self.mood.pk), '2024-01-01', '7', 'Fine, "really"']])
+
+        meals = list(csv.DictReader(self.export(format='csv', type='meals').splitlines()))
+        self.assertEqual([(row['meal_name'], row['name'], row['weight']) for row in meals], [
+            ('Lunch', 'rice', '10.0'), ('Lunch', 'beans', '5.0'),
+        ])
+
+    def test_meals_csv_can_be_imported_back(self):
+        lines = self.export(format='csv', type='meals').splitlines(keepends=True)
+        copy = User.objects.create_user(username='copy', password='pw')
+        report = import_meals(copy, lines, 'csv')
+        self.assertEqual(report.errors, [])
+        meal = Meal.objects.get(user=copy)
+        self.assertEqual((meal.name, meal.date, meal.total_weight), ('Lunch', LUNCH, 15))
+        self.assertEqual(list(meal.ingredients.order_by('pk').values_list('name', flat=True)), ['rice', 'beans'])
+
+    def test_meals_with_the_same_name_and_date_stay_apart(self):
+        second = Meal.objects.create(user=self.user, name='Lunch', date=LUNCH, **dict.fromkeys(MEAL_TOTAL_FIELDS, 2))
+        Ingredient.objects.create(meal=second, name='apple', **dict.fromkeys(INGREDIENT_FIELDS, 2))
+        lines = self.export(format='csv', type='meals').splitlines(keepends=True)
+        copy = User.objects.create_user(username='copy', password='pw')
+        report = import_meals(copy, lines, 'csv')
+        self.assertEqual(report.errors, [])
+        meals = Meal.objects.filter(user=copy).order_by('pk')
+        self.assertEqual([(meal.name, meal.date, meal.total_weight) for meal in meals], [('Lunch', LUNCH, 15), ('Lunch', LUNCH, 2)])
+        self.assertEqual(list(meals[1].ingredients.values_list('name', flat=True)), ['apple'])
+
+    async def test_streams_under_asgi(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        response = await client.get(reverse('export-data'))
+        self.assertTrue(response.is_async)
+        # Iterated like the ASGI handler does, one row per chunk
+        with mock.patch('users.export.CHUNK_SIZE', 1), warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            chunks = [chunk async for chunk in response]
+        self.assertEqual(caught, [])
+        self.assertEqual([json.loads(chunk)['type'] for chunk in chunks], ['meal', 'workout', 'mood'])
+
+    def test_bad_requests(self):
+        for params in ({'format': 'xml'}, {'type': 'sleep'}, {'format': 'csv'}):
+            with self.subTest(**params):
+                self.assertEqual(self.client.get(reverse('export-data'), params).status_code, 400)
@@ -8,4 +8,5 @@ urlpatterns = [
     path('update/', views.update_account, name='update-account'),
     path('delete/', views.delete_account, name='delete-account'),
     path('account/',views.account,name='account'),
+    path('export/', views.export_data, name='export-data'),
     ]
\ No newline at end of file
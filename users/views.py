@@ -4,6 +4,10 @@ from django.contrib.auth.decorators import login_required
 from .forms import UserRegisterForm, UserLoginForm, UserUpdateForm, UserDeleteForm
 from django.contrib import messages
 from django.contrib.auth import login, logout
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+from .export import EXPORT_TYPES, aiter_lines, csv_lines, ndjson_lines
 
 # One view to manage both Login and Register forms as they are on the same template
 def auth_view(request):
@@ -104,4 +108,35 @@ def delete_account(request):
             }
             return render(request, 'users/account.html', context)
     
-    return redirect('account')
\ No newline at end of file
+    return redirect('account')
+
+@login_required
+def export_data(request):
+    """
+    Download all of the user's data, streamed as it is read so memory use stays
+    flat however long the history is, under WSGI or ASGI. ?format=ndjson (default)
+    exports meals, workouts and moods together, or one of them with ?type=;
+    ?format=csv needs a ?type=.
+    """
+    export_format = request.GET.get('format', 'ndjson')
+    export_type = request.GET.get('type', 'all')
+    if export_format not in ('ndjson', 'csv'):
+        return HttpResponseBadRequest("Format must be 'ndjson' or 'csv'.")
+    if export_type not in (*EXPORT_TYPES, 'all'):
+        return HttpResponseBadRequest(f"Type must be 'all' or one of {', '.join(EXPORT_TYPES)}.")
+
+    if export_format == 'csv':
+        if export_type == 'all':
+            return HttpResponseBadRequest("CSV exports need a single type: meals, workouts or moods.")
+        lines = csv_lines(request.user, export_type)
+        content_type = 'text/csv'
+    else:
+        lines = ndjson_lines(request.user, EXPORT_TYPES if export_type == 'all' else (export_type,))
+        content_type = 'application/x-ndjson'
+    if isinstance(request, ASGIRequest):
+        lines = aiter_lines(lines)
+
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    filename = f"fittrack-{export_type}-{timezone.localdate().isoformat()}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
\ No newline at end of file
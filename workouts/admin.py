@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import Workout
+from .models import PersonalRecord, Workout
 
-admin.site.register(Workout)
\ No newline at end of file
+admin.site.register(Workout)
+admin.site.register(PersonalRecord)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class WorkoutsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'workouts'
+
+    def ready(self):
+        # Keeps the personal records up to date and invalidates the cached pages built from workouts
+        from . import signals  # noqa: F401
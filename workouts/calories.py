@@ -0,0 +1,137 @@
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Workout
+
+# Calories burnt = MET (Metabolic Equivalent of Task) * body weight in kg * duration in hours.
+# These tables are the source of truth for saved workouts; calculateMET() in
+# static/js/script.js mirrors them to preview the estimate in the form.
+BODY_WEIGHT_KG = 70
+
+WorkoutType = Workout.WorkoutType
+Intensity = Workout.Intensity
+
+# Distance-based workouts: (speed in km/h, whether the speed itself is included, MET),
+# checked from the fastest band down, then the MET for anything slower
+SPEED_METS = {
+    WorkoutType.RUNNING: (
+        [(13.0, True, 13.5), (11.4, True, 11.65), (9.8, True, 10.5), (8.1, True, 9.15), (6.0, True, 7.15)],
+        5.0,
+    ),
+    WorkoutType.WALKING: (
+        [(6.4, False, 6.75), (5.7, True, 5.25), (4.9, True, 4.4), (4.1, True, 3.55), (3.2, True, 2.9)],
+        2.25,
+    ),
+    WorkoutType.CYCLING: (
+        [(30.0, False, 14.0), (24.0, True, 10.0), (19.0, True, 8.0), (16.0, True, 6.0)],
+        4.0,
+    ),
+}
+
+# Intensity-based workouts: MET for Low, Medium and High. Any other intensity counts as High.
+INTENSITY_METS = {
+    WorkoutType.ROWING: (4.0, 6.0, 8.0),
+    WorkoutType.SWIMMING: (5.0, 7.0, 9.0),
+    WorkoutType.HIKING: (3.5, 5.0, 6.5),
+    WorkoutType.YOGA: (2.5, 3.5, 4.5),
+    WorkoutType.PILATES: (2.5, 3.5, 4.5),
+    WorkoutType.HIIT: (8.0, 10.0, 12.0),
+    WorkoutType.STRENGTH_TRAINING: (3.0, 5.0, 6.0),
+}
+
+# Rows read and written at a time when recomputing saved workouts
+RECOMPUTE_CHUNK_SIZE = 5000
+
+# Raw SQL skips auto_now, so updated_at is set explicitly (the API's ETags depend on it)
+UPDATE_CALORIES_SQL = "UPDATE {table} SET {calories} = %s, {updated_at} = %s WHERE {pk} = %s".format(
+    table=connection.ops.quote_name(Workout._meta.db_table),
+    calories=connection.ops.quote_name(Workout._meta.get_field("calories").column),
+    updated_at=connection.ops.quote_name(Workout._meta.get_field("updated_at").column),
+    pk=connection.ops.quote_name(Workout._meta.pk.column),
+)
+
+
+def estimate_calories_batch(workout_types, durations, distances, intensities):
+    """
+    Estimated calories for many workouts at once, as a NumPy array rounded to
+    2 decimals like the form does. Distance-based workouts without a distance
+    or duration get 0, and unknown workout types get NaN.
+    """
+    workout_types = np.asarray(workout_types, dtype=np.int64)
+    # No intensity is 0, which counts as High like any other value
+    intensities = np.array([0 if i is None else i for i in intensities], dtype=np.int64)
+    durations = np.asarray(durations, dtype=float)
+    distances = np.array([np.nan if d is None else d for d in distances], dtype=float)
+
+    mets = np.full(len(workout_types), np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speeds = distances / (durations / 60)
+    for workout_type, (bands, slowest_met) in SPEED_METS.items():
+        rows = workout_types == workout_type
+        if not rows.any():
+            continue
+        speed = speeds[rows]
+        conditions = [speed >= low if inclusive else speed > low for low, inclusive, _ in bands]
+        type_mets = np.select(conditions, [met for _, _, met in bands], default=slowest_met)
+        # No distance (or a zero one) means nothing to estimate from
+        missing = ~(distances[rows] > 0) | ~(durations[rows] > 0)
+        mets[rows] = np.where(missing, 0, type_mets)
+
+    for workout_type, (low, medium, high) in INTENSITY_METS.items():
+        rows = workout_types == workout_type
+        if not rows.any():
+            continue
+        intensity = intensities[rows]
+        mets[rows] = np.select([intensity == Intensity.LOW, intensity == Intensity.MEDIUM], [low, medium], default=high)
+
+    return np.round(mets * BODY_WEIGHT_KG * (durations / 60), 2)
+
+
+def estimate_calories(workout_type, duration, distance=None, intensity=None):
+    """Estimated calories for one workout, or None if the workout type is unknown."""
+    calories = estimate_calories_batch([workout_type], [duration], [distance], [intensity])[0]
+    return None if np.isnan(calories) else float(calories)
+
+
+def recompute_calories(queryset=None, chunk_size=RECOMPUTE_CHUNK_SIZE):
+    """
+    Recompute the saved calories of workouts (all of them by default) with the
+    current MET tables, e.g. after changing them. Rows are read chunk_size at a
+    time in primary key order, and only the rows whose calories changed are
+    written back, with one executemany() per chunk.
+    Returns (workouts checked, workouts updated).
+    """
+    if queryset is None:
+        queryset = Workout.objects.all()
+    queryset = queryset.order_by("pk")
+    fields = ("pk", "workout_type", "duration", "distance", "intensity", "calories")
+
+    checked = updated = 0
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).values_list(*fields)[:chunk_size])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        checked += len(rows)
+
+        pks, workout_types, durations, distances, intensities, saved = zip(*rows)
+        calories = estimate_calories_batch(workout_types, durations, distances, intensities)
+        saved = np.asarray(saved, dtype=float)
+        # Unknown workout types keep whatever was saved
+        changed = ~np.isnan(calories) & ~np.isclose(calories, saved, rtol=0, atol=0.005)
+
+        now = Workout._meta.get_field("updated_at").get_db_prep_save(timezone.now(), connection)
+        changes = [
+            (value, now, pk) for value, pk in zip(calories[changed].tolist(), np.asarray(pks)[changed].tolist())
+        ]
+        if changes:
+            # One prepared UPDATE run for every changed row: bulk_update() would build a
+            # CASE with a branch per row, which gets slow with thousands of rows
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(UPDATE_CALORIES_SQL, changes)
+            updated += len(changes)
+
+    return checked, updated
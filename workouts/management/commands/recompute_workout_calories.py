@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from FitTrack.cache import bump_versions
+from workouts.calories import RECOMPUTE_CHUNK_SIZE, recompute_calories
+from workouts.models import Workout
+from workouts.records import rebuild_personal_records
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recompute the calories of saved workouts with the current MET tables (workouts/calories.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            help="Only recompute workouts of this username (can be repeated).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=RECOMPUTE_CHUNK_SIZE,
+            help=f"Workouts read and updated at a time (default {RECOMPUTE_CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+
+        workouts = Workout.objects.all()
+        users = None
+        if options["usernames"]:
+            users = list(User.objects.filter(username__in=options["usernames"]))
+            missing = set(options["usernames"]) - {user.username for user in users}
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+            workouts = workouts.filter(user__in=users)
+
+        checked, updated = recompute_calories(workouts, chunk_size=options["chunk_size"])
+        if updated:
+            # The bulk updates bypass the signals, so the "most calories" records need a rebuild
+            # and the cached pages showing calories need invalidating
+            with transaction.atomic():
+                rebuild_personal_records(users=users)
+                bump_versions("workouts", [user.pk for user in users] if users else User.objects.values_list("pk", flat=True))
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} workouts, updated the calories of {updated}."))
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+DISTANCE_BASED_TYPES = ['Running', 'Walking', 'Cycling']
+PACE_DISTANCES = {
+    'pace_1k': 1, 'pace_5k': 5, 'pace_10k': 10, 'pace_half_marathon': 21.0975, 'pace_marathon': 42.195,
+}
+
+
+def build_records(apps, schema_editor):
+    """Fill the records from the workouts logged before they existed."""
+    Workout = apps.get_model('workouts', 'Workout')
+    PersonalRecord = apps.get_model('workouts', 'PersonalRecord')
+    best = {}
+    rows = Workout.objects.order_by().values_list(
+        'pk', 'user_id', 'workout_type', 'date', 'duration', 'distance', 'calories'
+    )
+    for pk, user_id, workout_type, date, duration, distance, calories in rows.iterator():
+        values = {'longest_duration': duration, 'most_calories': calories}
+        if workout_type in DISTANCE_BASED_TYPES and distance and distance > 0:
+            values['longest_distance'] = distance
+            if duration > 0:
+                values.update({record: duration / distance for record, km in PACE_DISTANCES.items() if distance >= km})
+        for record, value in values.items():
+            rank = (value if record in PACE_DISTANCES else -value, date, pk)
+            key = (user_id, workout_type, record)
+            if key not in best or rank < best[key][0]:
+                best[key] = (rank, value, pk)
+    PersonalRecord.objects.bulk_create(
+        (
+            PersonalRecord(user_id=user_id, workout_type=workout_type, record=record, value=value, workout_id=pk)
+            for (user_id, workout_type, record), (_, value, pk) in best.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0005_workout_user_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonalRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('workout_type', models.CharField(help_text='e.g., Running, Walking, Cycling.', max_length=50)),
+                ('record', models.CharField(choices=[('longest_distance', 'Longest distance'), ('longest_duration', 'Longest duration'), ('most_calories', 'Most calories'), ('pace_1k', 'Fastest pace over 1 km'), ('pace_5k', 'Fastest pace over 5 km'), ('pace_10k', 'Fastest pace over 10 km'), ('pace_half_marathon', 'Fastest pace over a half marathon'), ('pace_marathon', 'Fastest pace over a marathon')], max_length=30)),
+                ('value', models.FloatField(help_text='Distance (km), duration (minutes), calories or pace (min/km) of the record.')),
+                ('user', models.ForeignKey(help_text='The user who holds this record.', on_delete=django.db.models.deletion.CASCADE, related_name='personal_records', to=settings.AUTH_USER_MODEL)),
+                ('workout', models.ForeignKey(help_text='The workout that set this record.', on_delete=django.db.models.deletion.CASCADE, related_name='personal_records', to='workouts.workout')),
+            ],
+            options={
+                'db_table': 'personal_record',
+                'unique_together': {('user', 'workout_type', 'record')},
+            },
+        ),
+        migrations.RunPython(build_records, migrations.RunPython.noop),
+    ]
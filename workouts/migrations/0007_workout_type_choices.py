@@ -0,0 +1,164 @@
+from django.db import migrations, models
+
+
+WORKOUT_TYPES = {
+    'Running': 1,
+    'Walking': 2,
+    'Cycling': 3,
+    'Yoga': 4,
+    'Strength Training': 5,
+    'HIIT': 6,
+    'Rowing': 7,
+    'Pilates': 8,
+    'Swimming': 9,
+    'Hiking': 10,
+}
+INTENSITIES = {'Low': 1, 'Medium': 2, 'High': 3}
+
+WORKOUT_TYPE_CHOICES = [(value, name) for name, value in WORKOUT_TYPES.items()]
+INTENSITY_CHOICES = [(value, name) for name, value in INTENSITIES.items()]
+
+
+def _numbers(queryset, field, known):
+    """
+    {stored value: number} for every distinct value of field. Names match
+    whatever their case and spacing ('running', ' Strength  training').
+    """
+    by_name = {name.lower(): value for name, value in known.items()}
+    numbers = {}
+    unknown = []
+    for stored in queryset.order_by().values_list(field, flat=True).distinct():
+        number = by_name.get(' '.join(stored.split()).lower())
+        if number is None:
+            unknown.append(stored)
+        else:
+            numbers[stored] = number
+    if unknown:
+        raise RuntimeError(
+            f"Can't convert {field} values {sorted(unknown)} to numbers: fix or delete those workouts first."
+        )
+    return numbers
+
+
+def to_numbers(apps, schema_editor):
+    """One UPDATE per distinct workout type and intensity, rather than saving every row."""
+    Workout = apps.get_model('workouts', 'Workout')
+    PersonalRecord = apps.get_model('workouts', 'PersonalRecord')
+    workout_types = _numbers(Workout.objects.all(), 'workout_type', WORKOUT_TYPES)
+    record_types = _numbers(PersonalRecord.objects.all(), 'workout_type', WORKOUT_TYPES)
+    intensities = _numbers(
+        Workout.objects.exclude(intensity__isnull=True).exclude(intensity=''), 'intensity', INTENSITIES
+    )
+
+    for stored, value in workout_types.items():
+        Workout.objects.filter(workout_type=stored).update(workout_type_number=value)
+    for stored, value in record_types.items():
+        PersonalRecord.objects.filter(workout_type=stored).update(workout_type_number=value)
+    for stored, value in intensities.items():
+        Workout.objects.filter(intensity=stored).update(intensity_number=value)
+
+
+def to_names(apps, schema_editor):
+    # Back to the names of the workout type menus
+    Workout = apps.get_model('workouts', 'Workout')
+    PersonalRecord = apps.get_model('workouts', 'PersonalRecord')
+    for name, value in WORKOUT_TYPES.items():
+        Workout.objects.filter(workout_type_number=value).update(workout_type=name)
+        PersonalRecord.objects.filter(workout_type_number=value).update(workout_type=name)
+    for name, value in INTENSITIES.items():
+        Workout.objects.filter(intensity_number=value).update(intensity=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0006_personalrecord'),
+    ]
+
+    operations = [
+        # Fill new number columns next to the text ones, then swap them
+        migrations.AddField(
+            model_name='workout',
+            name='workout_type_number',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='workout',
+            name='intensity_number',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='personalrecord',
+            name='workout_type_number',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        # Nullable, so that migrating backwards can add the text columns back before filling them
+        migrations.AlterField(
+            model_name='workout',
+            name='workout_type',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='personalrecord',
+            name='workout_type',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.RunPython(to_numbers, to_names),
+        migrations.AlterUniqueTogether(
+            name='personalrecord',
+            unique_together=set(),
+        ),
+        migrations.RemoveField(
+            model_name='workout',
+            name='workout_type',
+        ),
+        migrations.RemoveField(
+            model_name='workout',
+            name='intensity',
+        ),
+        migrations.RemoveField(
+            model_name='personalrecord',
+            name='workout_type',
+        ),
+        migrations.RenameField(
+            model_name='workout',
+            old_name='workout_type_number',
+            new_name='workout_type',
+        ),
+        migrations.RenameField(
+            model_name='workout',
+            old_name='intensity_number',
+            new_name='intensity',
+        ),
+        migrations.RenameField(
+            model_name='personalrecord',
+            old_name='workout_type_number',
+            new_name='workout_type',
+        ),
+        migrations.AlterField(
+            model_name='workout',
+            name='workout_type',
+            field=models.PositiveSmallIntegerField(
+                choices=WORKOUT_TYPE_CHOICES, help_text='e.g., Running, Walking, Cycling.'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='workout',
+            name='intensity',
+            field=models.PositiveSmallIntegerField(
+                blank=True, choices=INTENSITY_CHOICES, null=True,
+                help_text='Perceived intensity (Low, Medium or High).',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='personalrecord',
+            name='workout_type',
+            field=models.PositiveSmallIntegerField(
+                choices=WORKOUT_TYPE_CHOICES, help_text='e.g., Running, Walking, Cycling.'
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name='personalrecord',
+            unique_together={('user', 'workout_type', 'record')},
+        ),
+    ]
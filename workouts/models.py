@@ -6,22 +6,40 @@ User = get_user_model()
 
 
 class Workout(models.Model):
-    # Workout type categories
-    INTENSITY_BASED_TYPES = [
-        "Rowing",
-        "Swimming",
-        "Hiking",
-        "Yoga",
-        "Pilates",
-        "HIIT",
-        "Strength Training",
-    ]
+    class WorkoutType(models.IntegerChoices):
+        # Listed in the order of the workout type menus
+        RUNNING = 1, "Running"
+        WALKING = 2, "Walking"
+        CYCLING = 3, "Cycling"
+        YOGA = 4, "Yoga"
+        STRENGTH_TRAINING = 5, "Strength Training"
+        HIIT = 6, "HIIT"
+        ROWING = 7, "Rowing"
+        PILATES = 8, "Pilates"
+        SWIMMING = 9, "Swimming"
+        HIKING = 10, "Hiking"
+
+    class Intensity(models.IntegerChoices):
+        LOW = 1, "Low"
+        MEDIUM = 2, "Medium"
+        HIGH = 3, "High"
+
+    # Workout type categories, as sets so checking a workout type is a single lookup
+    INTENSITY_BASED_TYPES = frozenset({
+        WorkoutType.ROWING,
+        WorkoutType.SWIMMING,
+        WorkoutType.HIKING,
+        WorkoutType.YOGA,
+        WorkoutType.PILATES,
+        WorkoutType.HIIT,
+        WorkoutType.STRENGTH_TRAINING,
+    })
     
-    DISTANCE_BASED_TYPES = [
-        "Running",
-        "Walking",
-        "Cycling",
-    ]
+    DISTANCE_BASED_TYPES = frozenset({
+        WorkoutType.RUNNING,
+        WorkoutType.WALKING,
+        WorkoutType.CYCLING,
+    })
     
     user = models.ForeignKey(
         User,
@@ -32,8 +50,8 @@ class Workout(models.Model):
     date = models.DateTimeField(
         default=timezone.now, help_text="Date and time the workout was logged."
     )
-    workout_type = models.CharField(
-        max_length=50, help_text="e.g., Running, Walking, Cycling."
+    workout_type = models.PositiveSmallIntegerField(
+        choices=WorkoutType.choices, help_text="e.g., Running, Walking, Cycling."
     )
     duration = models.IntegerField(help_text="Duration of the workout in minutes.")
     distance = models.FloatField(
@@ -42,8 +60,8 @@ class Workout(models.Model):
     pace = models.FloatField(
         null=True, blank=True, help_text="Average pace for the workout."
     )
-    intensity = models.CharField(
-        max_length=20,
+    intensity = models.PositiveSmallIntegerField(
+        choices=Intensity.choices,
         null=True,
         blank=True,
         help_text="Perceived intensity (Low, Medium or High).",
@@ -51,10 +69,19 @@ class Workout(models.Model):
     calories = models.FloatField(
         help_text="Estimated calories burned during the workout."
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, help_text="When the workout was last saved."
+    )
 
     class Meta:
         db_table = "workout"
         ordering = ["-date"]
+        indexes = [
+            # Lists, detail navigation and date ranges all filter by user and walk (date, id)
+            models.Index(fields=["user", "date", "id"], name="workout_user_date_idx"),
+            # Latest change of a user's workouts, for the API's ETag and Last-Modified
+            models.Index(fields=["user", "updated_at"], name="workout_user_updated_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         """Clear fields that aren't relevant for the current workout type"""
@@ -68,6 +95,74 @@ class Workout(models.Model):
         
         super().save(*args, **kwargs)
 
+    @property
+    def is_distance_based(self):
+        return self.workout_type in self.DISTANCE_BASED_TYPES
+
     def __str__(self):
         """String representation for the Django Admin."""
-        return f"{self.workout_type} on {self.date.strftime('%d-%m-%Y')} by {self.user.username}"
\ No newline at end of file
+        return f"{self.get_workout_type_display()} on {self.date.strftime('%d-%m-%Y')} by {self.user.username}"
+
+class PersonalRecord(models.Model):
+    """
+    Best workout of a user per workout type and kind of record, kept up to
+    date by workouts.records whenever a workout is saved or deleted.
+    """
+    LONGEST_DISTANCE = "longest_distance"
+    LONGEST_DURATION = "longest_duration"
+    MOST_CALORIES = "most_calories"
+
+    # Fastest pace records, for workouts of at least that many km
+    PACE_DISTANCES = {
+        "pace_1k": 1,
+        "pace_5k": 5,
+        "pace_10k": 10,
+        "pace_half_marathon": 21.0975,
+        "pace_marathon": 42.195,
+    }
+
+    RECORD_CHOICES = [
+        (LONGEST_DISTANCE, "Longest distance"),
+        (LONGEST_DURATION, "Longest duration"),
+        (MOST_CALORIES, "Most calories"),
+        ("pace_1k", "Fastest pace over 1 km"),
+        ("pace_5k", "Fastest pace over 5 km"),
+        ("pace_10k", "Fastest pace over 10 km"),
+        ("pace_half_marathon", "Fastest pace over a half marathon"),
+        ("pace_marathon", "Fastest pace over a marathon"),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="personal_records",
+        help_text="The user who holds this record.",
+    )
+    workout_type = models.PositiveSmallIntegerField(
+        choices=Workout.WorkoutType.choices, help_text="e.g., Running, Walking, Cycling."
+    )
+    record = models.CharField(max_length=30, choices=RECORD_CHOICES)
+    value = models.FloatField(
+        help_text="Distance (km), duration (minutes), calories or pace (min/km) of the record."
+    )
+    workout = models.ForeignKey(
+        Workout,
+        on_delete=models.CASCADE,
+        related_name="personal_records",
+        help_text="The workout that set this record.",
+    )
+
+    class Meta:
+        db_table = "personal_record"
+        # One row per record, so looking one up is a single index probe
+        unique_together = ("user", "workout_type", "record")
+
+    @property
+    def lower_is_better(self):
+        return self.record in self.PACE_DISTANCES
+
+    def __str__(self):
+        return (
+            f"{self.get_record_display()} ({self.get_workout_type_display()}) "
+            f"for {self.user.username}: {self.value}"
+        )
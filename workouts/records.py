@@ -0,0 +1,163 @@
+from django.db.models import ExpressionWrapper, F, FloatField, Q
+
+from .models import PersonalRecord, Workout
+
+# How each record is measured in SQL, for the targeted recomputes
+RECORD_METRICS = {
+    PersonalRecord.LONGEST_DISTANCE: F("distance"),
+    PersonalRecord.LONGEST_DURATION: F("duration"),
+    PersonalRecord.MOST_CALORIES: F("calories"),
+    **{
+        record: ExpressionWrapper(F("duration") * 1.0 / F("distance"), output_field=FloatField())
+        for record in PersonalRecord.PACE_DISTANCES
+    },
+}
+
+
+def record_values(workout_type, duration, distance, calories):
+    """Value of every record a workout competes for, by record name."""
+    values = {
+        PersonalRecord.LONGEST_DURATION: duration,
+        PersonalRecord.MOST_CALORIES: calories,
+    }
+    if workout_type in Workout.DISTANCE_BASED_TYPES and distance and distance > 0:
+        values[PersonalRecord.LONGEST_DISTANCE] = distance
+        if duration > 0:
+            for record, km in PersonalRecord.PACE_DISTANCES.items():
+                if distance >= km:
+                    values[record] = duration / distance
+    return values
+
+
+def _rank(record, value, date, pk):
+    # Smaller is better; on a tie the record goes to the earliest workout
+    return (value if record in PersonalRecord.PACE_DISTANCES else -value, date, pk)
+
+
+def _improves(record, value):
+    if value is None:
+        return False
+    return value < record.value if record.lower_is_better else value > record.value
+
+
+def _qualifying(workouts, record):
+    if record == PersonalRecord.LONGEST_DISTANCE:
+        return workouts.filter(distance__gt=0)
+    if record in PersonalRecord.PACE_DISTANCES:
+        return workouts.filter(distance__gte=PersonalRecord.PACE_DISTANCES[record], duration__gt=0)
+    return workouts
+
+
+def recompute_record(user_id, workout_type, record):
+    """Find the holder of one record again, e.g. after its workout was edited or deleted."""
+    workouts = Workout.objects.filter(user_id=user_id, workout_type=workout_type)
+    metric = RECORD_METRICS[record]
+    order = metric.asc() if record in PersonalRecord.PACE_DISTANCES else metric.desc()
+    best = (
+        _qualifying(workouts, record)
+        .annotate(record_value=metric)
+        .order_by(order, "date", "pk")
+        .values_list("pk", "record_value")
+        .first()
+    )
+    if best is None:
+        PersonalRecord.objects.filter(user_id=user_id, workout_type=workout_type, record=record).delete()
+    else:
+        PersonalRecord.objects.update_or_create(
+            user_id=user_id, workout_type=workout_type, record=record,
+            defaults={"workout_id": best[0], "value": best[1]},
+        )
+
+
+def update_records(workout):
+    """
+    Bring the records in line with a workout that was just created or edited.
+    The workout is compared with the current holders of its records; only the
+    records it held before and no longer clearly beats are recomputed.
+    """
+    values = record_values(workout.workout_type, workout.duration, workout.distance, workout.calories)
+    records = (
+        PersonalRecord.objects.filter(user_id=workout.user_id)
+        .filter(Q(workout_type=workout.workout_type) | Q(workout=workout))
+        .annotate(achieved_on=F("workout__date"))
+    )
+
+    current = {}
+    stale = []
+    changed = []
+    for record in records:
+        if record.workout_id != workout.pk:
+            current[record.record] = record
+        elif record.workout_type == workout.workout_type and _improves(record, values.get(record.record)):
+            # Still the holder, with a better value
+            record.value = values[record.record]
+            changed.append(record)
+        else:
+            # Worse, equal (the date may have changed) or no longer competing: find the holder again
+            stale.append((record.workout_type, record.record))
+
+    stale_records = {record for workout_type, record in stale if workout_type == workout.workout_type}
+    held = {record.record for record in changed}
+    created = []
+    for name, value in values.items():
+        if name in stale_records or name in held:
+            continue
+        holder = current.get(name)
+        if holder is None:
+            created.append(PersonalRecord(
+                user_id=workout.user_id, workout_type=workout.workout_type, record=name,
+                value=value, workout=workout,
+            ))
+        elif _rank(name, value, workout.date, workout.pk) < _rank(
+            name, holder.value, holder.achieved_on, holder.workout_id
+        ):
+            holder.value = value
+            holder.workout = workout
+            changed.append(holder)
+
+    if changed:
+        PersonalRecord.objects.bulk_update(changed, ["value", "workout"])
+    if created:
+        PersonalRecord.objects.bulk_create(created)
+    for workout_type, record in stale:
+        recompute_record(workout.user_id, workout_type, record)
+
+
+def rebuild_personal_records(users=None):
+    """
+    Recompute every record from the Workout table in a single pass, e.g. after
+    bulk updates that bypass the signals. Returns the number of records written.
+    """
+    workouts = Workout.objects.order_by()
+    records = PersonalRecord.objects.all()
+    if users is not None:
+        workouts = workouts.filter(user__in=users)
+        records = records.filter(user__in=users)
+
+    best = {}
+    rows = workouts.values_list("pk", "user_id", "workout_type", "date", "duration", "distance", "calories")
+    for pk, user_id, workout_type, date, duration, distance, calories in rows.iterator(chunk_size=2000):
+        for record, value in record_values(workout_type, duration, distance, calories).items():
+            key = (user_id, workout_type, record)
+            rank = _rank(record, value, date, pk)
+            if key not in best or rank < best[key][0]:
+                best[key] = (rank, value, pk)
+
+    records.delete()
+    created = PersonalRecord.objects.bulk_create(
+        [
+            PersonalRecord(user_id=user_id, workout_type=workout_type, record=record, value=value, workout_id=pk)
+            for (user_id, workout_type, record), (_, value, pk) in best.items()
+        ],
+        batch_size=1000,
+    )
+    return len(created)
+
+
+def get_personal_record(user, workout_type, record):
+    """One record of a user (a single unique index lookup), or None if it isn't set."""
+    return (
+        PersonalRecord.objects.filter(user=user, workout_type=workout_type, record=record)
+        .select_related("workout")
+        .first()
+    )
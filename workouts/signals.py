@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from FitTrack.cache import bump_version
+
+from .models import PersonalRecord, Workout
+from .records import recompute_record, update_records
+
+
+@receiver(post_save, sender=Workout)
+def workout_saved(sender, instance, raw=False, **kwargs):
+    # Fixtures are loaded as they are, records included
+    if not raw:
+        update_records(instance)
+    bump_version("workouts", instance.user_id)
+
+
+@receiver(pre_delete, sender=Workout)
+def remember_held_records(sender, instance, **kwargs):
+    # The records are deleted along with the workout, so note which ones it held first
+    instance._held_records = list(
+        PersonalRecord.objects.filter(workout=instance).values_list("workout_type", "record")
+    )
+
+
+@receiver(post_delete, sender=Workout)
+def workout_deleted(sender, instance, **kwargs):
+    for workout_type, record in getattr(instance, "_held_records", []):
+        recompute_record(instance.user_id, workout_type, record)
+    bump_version("workouts", instance.user_id)
@@ -1,3 +1,341 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from FitTrack.testing import QueryPlanTestCase
+
+from .calories import estimate_calories, estimate_calories_batch
+from .models import PersonalRecord, Workout
+from .records import get_personal_record, rebuild_personal_records
+from .trends import DEFAULT_TREND_DAYS, MAX_TREND_DAYS
+
+User = get_user_model()
+WorkoutType = Workout.WorkoutType
+
+
+class WorkoutQueryPlanTests(QueryPlanTestCase):
+    """The workout pages must find a user's workouts through the (user, date) index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="planner", password="pw")
+        other = User.objects.create_user(username="other", password="pw")
+        now = timezone.now()
+        for owner in (cls.user, other):
+            for i in range(30):
+                if i % 2:
+                    Workout.objects.create(
+                        user=owner, date=now - timedelta(hours=10 * i), workout_type=WorkoutType.RUNNING,
+                        duration=30, distance=5, pace=6, calories=300,
+                    )
+                else:
+                    Workout.objects.create(
+                        user=owner, date=now - timedelta(hours=10 * i), workout_type=WorkoutType.YOGA,
+                        duration=45, intensity=Workout.Intensity.MEDIUM, calories=150,
+                    )
+        cls.workout = Workout.objects.filter(user=cls.user).order_by("date")[10]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_list(self):
+        first_page = self.assertViewUsesIndexes(reverse("workouts-list")).context["page_obj"]
+        second_page = self.assertViewUsesIndexes(
+            reverse("workouts-list") + f"?after={first_page.next_cursor}"
+        ).context["page_obj"]
+        self.assertViewUsesIndexes(reverse("workouts-list") + f"?before={second_page.previous_cursor}")
+
+    def test_detail(self):
+        response = self.assertViewUsesIndexes(reverse("workout-detail", args=[self.workout.pk]))
+        self.assertIsNotNone(response.context["previous_workout"])
+        self.assertIsNotNone(response.context["next_workout"])
+
+    def test_review(self):
+        self.assertViewUsesIndexes(reverse("review-workouts"))
+
+    def test_trends(self):
+        response = self.assertViewUsesIndexes(reverse("workout-trends"))
+        self.assertEqual(sum(response.json()["daily"]["workouts"]), 30)
+
+    def test_update(self):
+        # The edit form is a popup on the detail page, so the view only takes POSTs
+        self.assertViewUsesIndexes(
+            reverse("workout-update", args=[self.workout.pk]), method="post",
+            data={"workout_type": WorkoutType.YOGA, "duration": 60, "intensity": Workout.Intensity.HIGH, "calories": 200},
+            expected_status=302,
+        )
+
+
+class PersonalRecordTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="runner", password="pw")
+
+    def run_workout(self, distance, duration, **kwargs):
+        return Workout.objects.create(
+            user=self.user, workout_type=WorkoutType.RUNNING, distance=distance, duration=duration, calories=duration * 10, **kwargs
+        )
+
+    def assertMatchesRebuild(self):
+        current = sorted(PersonalRecord.objects.values_list("workout_type", "record", "workout_id", "value"))
+        rebuild_personal_records(users=[self.user])
+        self.assertEqual(current, sorted(PersonalRecord.objects.values_list("workout_type", "record", "workout_id", "value")))
+
+    def test_records_follow_saves_and_deletes(self):
+        slow = self.run_workout(10, 60)
+        fast = self.run_workout(5, 25)
+        self.assertEqual(get_personal_record(self.user, WorkoutType.RUNNING, "pace_5k").workout, fast)
+        self.assertEqual(get_personal_record(self.user, WorkoutType.RUNNING, "pace_10k").workout, slow)
+        self.assertEqual(get_personal_record(self.user, WorkoutType.RUNNING, PersonalRecord.LONGEST_DISTANCE).workout, slow)
+        self.assertMatchesRebuild()
+
+        # Editing the record holder to a worse time gives the record back to the other workout
+        fast.duration = 70
+        fast.save()
+        self.assertEqual(get_personal_record(self.user, WorkoutType.RUNNING, "pace_5k").workout, slow)
+        self.assertMatchesRebuild()
+
+        slow.delete()
+        self.assertEqual(get_personal_record(self.user, WorkoutType.RUNNING, "pace_5k").workout, fast)
+        self.assertIsNone(get_personal_record(self.user, WorkoutType.RUNNING, "pace_10k"))
+        self.assertMatchesRebuild()
+
+    def test_changing_the_workout_type_moves_its_records(self):
+        workout = self.run_workout(5, 30)
+        workout.workout_type = WorkoutType.YOGA
+        workout.intensity = Workout.Intensity.LOW
+        workout.save()
+        self.assertFalse(PersonalRecord.objects.filter(workout_type=WorkoutType.RUNNING).exists())
+        self.assertEqual(get_personal_record(self.user, WorkoutType.YOGA, PersonalRecord.LONGEST_DURATION).workout, workout)
+        self.assertMatchesRebuild()
+
+
+class WorkoutReviewTests(TestCase):
+    def test_statistics_per_workout_type(self):
+        user = User.objects.create_user(username="athlete", password="pw")
+        other = User.objects.create_user(username="other", password="pw")
+        for owner in (user, other):
+            Workout.objects.create(user=owner, workout_type=WorkoutType.RUNNING, duration=30, distance=5, pace=6, calories=300)
+        Workout.objects.create(user=user, workout_type=WorkoutType.RUNNING, duration=50, distance=10, pace=5, calories=500)
+        Workout.objects.create(user=user, workout_type=WorkoutType.YOGA, duration=60, intensity=Workout.Intensity.LOW, calories=100)
+        Workout.objects.create(user=user, workout_type=WorkoutType.YOGA, duration=30, intensity=Workout.Intensity.HIGH, calories=200)
+        Workout.objects.create(user=user, workout_type=WorkoutType.YOGA, duration=30, intensity=Workout.Intensity.HIGH, calories=300)
+
+        cache.clear()
+        self.client.force_login(user)
+        context = self.client.get(reverse("review-workouts")).context
+        self.assertEqual(
+            (context["total_workouts"], context["total_calories"], context["total_minutes"]), (5, 1400, 200),
+        )
+        self.assertEqual((context["avg_calories"], context["avg_minutes"]), (280, 40))
+
+        stats = context["workout_stats"]
+        self.assertEqual(stats["running"], {
+            "count": 2, "avg_calories": 400, "avg_minutes": 40, "avg_distance": 7.5, "avg_pace": 5.5,
+        })
+        self.assertEqual(stats["yoga"], {"count": 3, "avg_calories": 200, "avg_minutes": 40, "avg_intensity": 2.3})
+        self.assertEqual(stats["cycling"], {"count": 0, "avg_calories": 0, "avg_minutes": 0, "avg_distance": 0, "avg_pace": 0})
+        self.assertEqual(stats["hiit"]["count"], 0)
+        self.assertEqual(set(stats), {
+            "running", "walking", "cycling", "rowing", "swimming", "hiking", "yoga", "pilates", "hiit", "strength",
+        })
+
+
+# calculateMET() from static/js/script.js, which the server estimate replaced:
+# (speed in km/h, MET) on both sides of every band boundary
+OLD_SPEED_METS = {
+    WorkoutType.RUNNING: [
+        (20, 13.5), (13.0, 13.5), (12.99, 11.65), (11.4, 11.65), (11.39, 10.5), (9.8, 10.5), (9.79, 9.15),
+        (8.1, 9.15), (8.09, 7.15), (6.0, 7.15), (5.99, 5.0), (1, 5.0),
+    ],
+    WorkoutType.WALKING: [
+        (8, 6.75), (6.41, 6.75), (6.4, 5.25), (5.7, 5.25), (5.69, 4.4), (4.9, 4.4), (4.89, 3.55),
+        (4.1, 3.55), (4.09, 2.9), (3.2, 2.9), (3.19, 2.25), (1, 2.25),
+    ],
+    WorkoutType.CYCLING: [
+        (40, 14.0), (30.01, 14.0), (30, 10.0), (24, 10.0), (23.99, 8.0), (19, 8.0), (18.99, 6.0),
+        (16, 6.0), (15.99, 4.0), (5, 4.0),
+    ],
+}
+# MET for Low, Medium, then High (anything else, no intensity included)
+OLD_INTENSITY_METS = {
+    WorkoutType.ROWING: (4.0, 6.0, 8.0),
+    WorkoutType.SWIMMING: (5.0, 7.0, 9.0),
+    WorkoutType.HIKING: (3.5, 5.0, 6.5),
+    WorkoutType.YOGA: (2.5, 3.5, 4.5),
+    WorkoutType.PILATES: (2.5, 3.5, 4.5),
+    WorkoutType.HIIT: (8.0, 10.0, 12.0),
+    WorkoutType.STRENGTH_TRAINING: (3.0, 5.0, 6.0),
+}
+
+
+def old_calories(met, duration):
+    # calculateEstimatedCalsBurnt(), with the two decimals the form posted
+    return round(met * 70 * (duration / 60), 2)
+
+
+class CalorieEstimateTests(TestCase):
+    def test_speed_bands_match_the_old_form(self):
+        self.assertEqual(set(OLD_SPEED_METS) | set(OLD_INTENSITY_METS), set(WorkoutType))
+        for workout_type, bands in OLD_SPEED_METS.items():
+            for speed, met in bands:
+                # An hour long, so the distance is the speed
+                with self.subTest(workout_type=workout_type.label, speed=speed):
+                    self.assertEqual(estimate_calories(workout_type, 60, distance=speed), old_calories(met, 60))
+            with self.subTest(workout_type=workout_type.label, duration=45):
+                speed, met = bands[0]
+                self.assertEqual(estimate_calories(workout_type, 45, distance=speed * 0.75), old_calories(met, 45))
+
+    def test_intensities_match_the_old_form(self):
+        for workout_type, (low, medium, high) in OLD_INTENSITY_METS.items():
+            for intensity, met in ((Workout.Intensity.LOW, low), (Workout.Intensity.MEDIUM, medium),
+                                   (Workout.Intensity.HIGH, high), (None, high)):
+                with self.subTest(workout_type=workout_type.label, intensity=intensity):
+                    self.assertEqual(estimate_calories(workout_type, 40, intensity=intensity), old_calories(met, 40))
+
+    def test_nothing_to_estimate_from(self):
+        self.assertEqual(estimate_calories(WorkoutType.RUNNING, 30, distance=0), 0)
+        self.assertEqual(estimate_calories(WorkoutType.CYCLING, 30), 0)
+        self.assertIsNone(estimate_calories(99, 30, distance=5))
+
+    def test_batch_matches_single_estimates(self):
+        workouts = [
+            (WorkoutType.RUNNING, 30, 5, None), (WorkoutType.YOGA, 45, None, Workout.Intensity.LOW),
+            (WorkoutType.WALKING, 20, None, None), (WorkoutType.HIIT, 25, None, Workout.Intensity.HIGH),
+        ]
+        self.assertEqual(
+            estimate_calories_batch(*zip(*workouts)).tolist(),
+            [estimate_calories(*workout) for workout in workouts],
+        )
+
+    def test_recompute_command(self):
+        user = User.objects.create_user(username="athlete", password="pw")
+        other = User.objects.create_user(username="other", password="pw")
+        stale = Workout.objects.create(
+            user=user, workout_type=WorkoutType.RUNNING, duration=60, distance=10, pace=6, calories=1,
+        )
+        current = Workout.objects.create(
+            user=user, workout_type=WorkoutType.YOGA, duration=60, intensity=Workout.Intensity.LOW, calories=175,
+        )
+        others = Workout.objects.create(
+            user=other, workout_type=WorkoutType.RUNNING, duration=60, distance=10, pace=6, calories=1,
+        )
+        updated_at = current.updated_at
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("recompute_workout_calories", user=["athlete"], chunk_size=1, stdout=out)
+        self.assertIn("Checked 2 workouts, updated the calories of 1.", out.getvalue())
+        for workout in (stale, current, others):
+            workout.refresh_from_db()
+        self.assertEqual((stale.calories, current.calories, others.calories), (old_calories(10.5, 60), 175, 1))
+        self.assertEqual(current.updated_at, updated_at)
+        self.assertEqual(get_personal_record(user, WorkoutType.RUNNING, PersonalRecord.MOST_CALORIES).workout, stale)
+
+
+class WorkoutTrendsTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username="athlete", password="pw"))
+
+    def trends(self, **params):
+        return self.client.get(reverse("workout-trends"), params)
+
+    def test_date_range(self):
+        response = self.trends(start="2024-01-01", end="2024-01-31")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["daily"]["workouts"]), 31)
+        # 90 days back from the end by default
+        self.assertEqual(len(self.trends(end="2024-03-31").json()["daily"]["workouts"]), DEFAULT_TREND_DAYS)
+        self.assertEqual(len(self.trends(start="2024-01-01", end="2024-01-01").json()["daily"]["workouts"]), 1)
+
+    def test_invalid_dates(self):
+        for params in (
+            {"end": "abc"}, {"end": "2024-02-30"}, {"start": "abc"}, {"start": "2024-13-01", "end": "2024-12-31"},
+            {"start": "2024-01-01", "end": "tomorrow"},
+        ):
+            with self.subTest(**params):
+                response = self.trends(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"error": "start and end must be dates like 2024-05-01."})
+
+    def test_invalid_ranges(self):
+        response = self.trends(start="2024-02-01", end="2024-01-31")
+        self.assertEqual((response.status_code, response.json()), (400, {"error": "start must be before end."}))
+
+        end = date(2024, 12, 31)
+        self.assertEqual(self.trends(start=end - timedelta(days=MAX_TREND_DAYS - 1), end=end).status_code, 200)
+        response = self.trends(start=end - timedelta(days=MAX_TREND_DAYS), end=end)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": f"At most {MAX_TREND_DAYS} days per request."})
+
+
+class WorkoutTypeMigrationTests(TransactionTestCase):
+    """The data migration from workout type and intensity names to integer choices (0007), both ways."""
+
+    before = [("workouts", "0006_personalrecord")]
+    after = [("workouts", "0007_workout_type_choices")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def create_workouts(self, apps, workouts):
+        user = apps.get_model(*User._meta.label.split(".")).objects.create(username="legacy")
+        LegacyWorkout = apps.get_model("workouts", "Workout")
+        return [
+            LegacyWorkout.objects.create(user=user, workout_type=workout_type, intensity=intensity, duration=30, calories=100).pk
+            for workout_type, intensity in workouts
+        ]
+
+    def test_every_legacy_name(self):
+        apps = self.migrate(self.before)
+        legacy = [(label, "Low") for label in WorkoutType.labels] + [
+            ("running", "medium"), ("YOGA", " High "), (" Strength  training ", None), ("Walking", ""),
+        ]
+        pks = self.create_workouts(apps, legacy)
+        user = apps.get_model("workouts", "Workout").objects.get(pk=pks[0]).user
+        apps.get_model("workouts", "PersonalRecord").objects.create(
+            user=user, workout_id=pks[0], workout_type="running", record="longest_duration", value=30,
+        )
+
+        apps = self.migrate(self.after)
+        Migrated = apps.get_model("workouts", "Workout")
+        migrated = [Migrated.objects.values_list("workout_type", "intensity").get(pk=pk) for pk in pks]
+        self.assertEqual(migrated, [(value, Workout.Intensity.LOW) for value in WorkoutType.values] + [
+            (WorkoutType.RUNNING, Workout.Intensity.MEDIUM), (WorkoutType.YOGA, Workout.Intensity.HIGH),
+            (WorkoutType.STRENGTH_TRAINING, None), (WorkoutType.WALKING, None),
+        ])
+        self.assertEqual(apps.get_model("workouts", "PersonalRecord").objects.get().workout_type, WorkoutType.RUNNING)
+
+        # Back to the names of the menus
+        apps = self.migrate(self.before)
+        Restored = apps.get_model("workouts", "Workout")
+        restored = [Restored.objects.values_list("workout_type", "intensity").get(pk=pk) for pk in pks]
+        self.assertEqual(restored, [(label, "Low") for label in WorkoutType.labels] + [
+            ("Running", "Medium"), ("Yoga", "High"), ("Strength Training", None), ("Walking", None),
+        ])
+        self.assertEqual(apps.get_model("workouts", "PersonalRecord").objects.get().workout_type, "Running")
+
+    def test_unknown_names_stop_the_migration(self):
+        apps = self.migrate(self.before)
+        self.create_workouts(apps, [("Running", "Low"), ("Zumba", "Low"), ("Cycling", "Extreme")])
+        with self.assertRaisesMessage(RuntimeError, "workout_type values ['Zumba']"):
+            self.migrate(self.after)
+        # Nothing was converted, and the workouts are still there to fix
+        self.assertEqual(apps.get_model("workouts", "Workout").objects.filter(workout_type="Zumba").count(), 1)
+        apps.get_model("workouts", "Workout").objects.all().delete()
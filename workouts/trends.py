@@ -0,0 +1,146 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Workout
+
+# Rolling average windows, in days
+ROLLING_WINDOWS = (7, 28)
+
+# Longest date range one request can ask for, which bounds the response size
+MAX_TREND_DAYS = 366
+DEFAULT_TREND_DAYS = 90
+
+METRICS = ("workouts", "calories", "duration", "distance")
+
+
+def _day_bounds(first_day, last_day):
+    # Datetime range covering the days, so the (user, date) index can be used
+    return (
+        timezone.make_aware(datetime.combine(first_day, time.min)),
+        timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min)),
+    )
+
+
+def _rounded(values, digits=2):
+    return np.round(values, digits).tolist()
+
+
+def _grouped(keys, series):
+    """Sums of every series per distinct key (week or month start), in date order."""
+    labels, groups = np.unique(keys, return_inverse=True)
+    totals = {name: np.bincount(groups, weights=values, minlength=len(labels)) for name, values in series.items()}
+    return labels, totals
+
+
+def _period_totals(label, labels, totals):
+    return [
+        {
+            label: str(key),
+            "workouts": int(totals["workouts"][i]),
+            **{name: round(float(totals[name][i]), 2) for name in ("calories", "duration", "distance")},
+        }
+        for i, key in enumerate(labels)
+    ]
+
+
+def workout_trends(user, first_day, last_day):
+    """
+    Daily totals, 7 and 28 day rolling averages, weekly and monthly totals and
+    weekly pace per distance-based workout type, between two dates (inclusive).
+
+    The database returns one row per (day, workout type); the series are then
+    built with NumPy over a dense array of days, so the cost doesn't depend on
+    how many workouts were logged.
+    """
+    # Start early enough that the first rolling averages cover full windows
+    warmup = max(ROLLING_WINDOWS) - 1
+    fetch_from = first_day - timedelta(days=warmup)
+    start, end = _day_bounds(fetch_from, last_day)
+
+    rows = (
+        Workout.objects.filter(user=user, date__gte=start, date__lt=end)
+        .annotate(day=TruncDate("date"))
+        .values("day", "workout_type")
+        .annotate(
+            total_workouts=Count("pk"),
+            total_calories=Sum("calories"),
+            total_duration=Sum("duration"),
+            total_distance=Sum("distance"),
+            # Pace is minutes per km, so it's only meaningful for workouts with a distance
+            paced_workouts=Count("pk", filter=Q(distance__gt=0)),
+            paced_duration=Sum("duration", filter=Q(distance__gt=0)),
+        )
+        .order_by()
+    )
+
+    day_count = (last_day - fetch_from).days + 1
+    daily = {name: np.zeros(day_count) for name in METRICS}
+    paced = {
+        workout_type: {"duration": np.zeros(day_count), "distance": np.zeros(day_count), "workouts": np.zeros(day_count)}
+        for workout_type in Workout.WorkoutType
+        if workout_type in Workout.DISTANCE_BASED_TYPES
+    }
+    for row in rows:
+        index = (row["day"] - fetch_from).days
+        for name in METRICS:
+            daily[name][index] += row[f"total_{name}"] or 0
+        if row["workout_type"] in paced and row["paced_workouts"]:
+            series = paced[row["workout_type"]]
+            series["duration"][index] += row["paced_duration"]
+            series["distance"][index] += row["total_distance"]
+            series["workouts"][index] += row["paced_workouts"]
+
+    # Rolling averages per day from a running sum: sum(last n days) = cumsum[i] - cumsum[i - n]
+    rolling = {}
+    for window in ROLLING_WINDOWS:
+        rolling[str(window)] = {}
+        for name in ("calories", "duration", "distance"):
+            cumulative = np.concatenate(([0], np.cumsum(daily[name])))
+            window_sums = cumulative[window:] - cumulative[:-window]
+            # Keep the values ending on the requested days only
+            rolling[str(window)][name] = _rounded(window_sums[warmup - window + 1:] / window)
+
+    # From here on, only the requested days
+    days = np.arange(np.datetime64(first_day), np.datetime64(last_day) + 1)
+    daily = {name: values[warmup:] for name, values in daily.items()}
+    daily["workouts"] = daily["workouts"].astype(int)
+    paced = {t: {name: values[warmup:] for name, values in series.items()} for t, series in paced.items()}
+
+    # NumPy weeks start on Thursdays (1970-01-01 was one): shift by 4 days to start them on Mondays
+    monday_shift = np.timedelta64(4, "D")
+    week_starts = (days - monday_shift).astype("datetime64[W]").astype("datetime64[D]") + monday_shift
+    month_starts = days.astype("datetime64[M]")
+
+    pace = {}
+    for workout_type, series in paced.items():
+        type_weeks, totals = _grouped(week_starts, series)
+        has_distance = totals["distance"] > 0
+        pace[workout_type.label] = [
+            {
+                "week": str(week),
+                "workouts": int(count),
+                "distance": round(float(distance), 2),
+                "pace": round(float(duration / distance), 2),
+            }
+            for week, count, distance, duration in zip(
+                type_weeks[has_distance],
+                totals["workouts"][has_distance],
+                totals["distance"][has_distance],
+                totals["duration"][has_distance],
+            )
+        ]
+
+    return {
+        "start": first_day.isoformat(),
+        "end": last_day.isoformat(),
+        "days": [str(day) for day in days],
+        "daily": {name: _rounded(values) for name, values in daily.items()},
+        "rolling": rolling,
+        "weekly": _period_totals("week", *_grouped(week_starts, daily)),
+        "monthly": _period_totals("month", *_grouped(month_starts, daily)),
+        "pace": pace,
+    }
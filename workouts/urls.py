@@ -11,6 +11,7 @@ from .views import (
 urlpatterns = [
     path("log/", WorkoutCreateView.as_view(), name="log-workout"),
     path("review/", views.review, name="review-workouts"),
+    path("trends/", views.trends, name="workout-trends"),
     path("list/", WorkoutListView.as_view(), name="workouts-list"),
     path("<int:pk>/", WorkoutDetailView.as_view(), name="workout-detail"),
     path("<int:pk>/update/", WorkoutUpdateView.as_view(), name="workout-update"),
@@ -1,6 +1,12 @@
+from datetime import timedelta
+
 from django.shortcuts import render
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .calories import estimate_calories
 from .models import Workout
+from .trends import DEFAULT_TREND_DAYS, MAX_TREND_DAYS, workout_trends
 from django.views.generic import (
     ListView,
     DetailView,
@@ -9,81 +15,92 @@ from django.views.generic import (
     DeleteView,
     )
 from django.contrib.auth.mixins import LoginRequiredMixin
+from FitTrack.cache import acached
+from FitTrack.navigation import AdjacentObjectsMixin
+from FitTrack.pagination import KeysetPaginationMixin
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse, reverse_lazy
 from django.db.models import Avg, Sum, Count
 
+WorkoutType = Workout.WorkoutType
+
+# Keys of workout_stats for each workout type
+DISTANCE_STATS_KEYS = {
+    WorkoutType.RUNNING: 'running',
+    WorkoutType.WALKING: 'walking',
+    WorkoutType.CYCLING: 'cycling',
+}
+INTENSITY_STATS_KEYS = {
+    WorkoutType.ROWING: 'rowing',
+    WorkoutType.SWIMMING: 'swimming',
+    WorkoutType.HIKING: 'hiking',
+    WorkoutType.YOGA: 'yoga',
+    WorkoutType.PILATES: 'pilates',
+    WorkoutType.HIIT: 'hiit',
+    WorkoutType.STRENGTH_TRAINING: 'strength'
+}
+
+
 @login_required
-def review(request):
-    workouts = Workout.objects.filter(user=request.user)
-    
-    # Overall statistics
-    total_workouts = workouts.count()
-    total_calories = workouts.aggregate(Sum('calories'))['calories__sum'] or 0
-    total_minutes = workouts.aggregate(Sum('duration'))['duration__sum'] or 0
-    avg_calories = workouts.aggregate(Avg('calories'))['calories__avg'] or 0
-    avg_minutes = workouts.aggregate(Avg('duration'))['duration__avg'] or 0
-    
+async def review(request):
+    # The templates get the user loaded asynchronously (the lazy request.user would query synchronously)
+    user = request.user = await request.auser()
+    context = await acached("workouts-review", user.pk, lambda: areview_stats(user))
+    return render(request, "workouts/review_workouts.html", context)
+
+
+async def areview_stats(user):
+    """Overall and per workout type statistics of all the user's workouts."""
+    workouts = Workout.objects.filter(user=user)
+
+    # One row per workout type, all computed in a single grouped query
+    rows = {
+        row['workout_type']: row
+        async for row in workouts.order_by().values('workout_type').annotate(
+            count=Count('pk'),
+            sum_calories=Sum('calories'),
+            sum_minutes=Sum('duration'),
+            avg_calories=Avg('calories'),
+            avg_minutes=Avg('duration'),
+            avg_distance=Avg('distance'),
+            avg_pace=Avg('pace'),
+            # Intensities are stored as 1 (Low) to 3 (High), so they average directly
+            avg_intensity=Avg('intensity'),
+        )
+    }
+
+    # Overall statistics, added up from the per-type rows
+    total_workouts = sum(row['count'] for row in rows.values())
+    total_calories = sum(row['sum_calories'] or 0 for row in rows.values())
+    total_minutes = sum(row['sum_minutes'] or 0 for row in rows.values())
+    avg_calories = total_calories / total_workouts if total_workouts else 0
+    avg_minutes = total_minutes / total_workouts if total_workouts else 0
+
     # Statistics per workout type
     workout_stats = {}
-    
-    # Distance-based workouts 
-    for workout_type in ['Running', 'Walking', 'Cycling']:
-        filtered = workouts.filter(workout_type=workout_type)
-        count = filtered.count()
-        if count > 0:
-            workout_stats[workout_type.lower()] = {
-                'count': count,
-                'avg_calories': filtered.aggregate(Avg('calories'))['calories__avg'] or 0,
-                'avg_minutes': filtered.aggregate(Avg('duration'))['duration__avg'] or 0,
-                'avg_distance': filtered.aggregate(Avg('distance'))['distance__avg'] or 0,
-                'avg_pace': filtered.aggregate(Avg('pace'))['pace__avg'] or 0,
-            }
-        else:
-            workout_stats[workout_type.lower()] = {
-                'count': 0,
-                'avg_calories': 0,
-                'avg_minutes': 0,
-                'avg_distance': 0,
-                'avg_pace': 0,
-            }
-    
+
+    # Distance-based workouts
+    for workout_type, key in DISTANCE_STATS_KEYS.items():
+        row = rows.get(workout_type, {})
+        workout_stats[key] = {
+            'count': row.get('count', 0),
+            'avg_calories': row.get('avg_calories') or 0,
+            'avg_minutes': row.get('avg_minutes') or 0,
+            'avg_distance': row.get('avg_distance') or 0,
+            'avg_pace': row.get('avg_pace') or 0,
+        }
+
     # Intensity-based workouts
-    intensity_types = {
-        'Rowing': 'rowing',
-        'Swimming': 'swimming',
-        'Hiking': 'hiking',
-        'Yoga': 'yoga',
-        'Pilates': 'pilates',
-        'HIIT': 'hiit',
-        'Strength Training': 'strength'
-    }
-    
-    for workout_type, key in intensity_types.items():
-        filtered = workouts.filter(workout_type=workout_type)
-        count = filtered.count()
-        if count > 0:
-            # Convert intensity to numeric for averaging
-            intensity_map = {'Low': 1, 'Medium': 2, 'High': 3}
-            intensities = [intensity_map.get(w.intensity, 0) for w in filtered if w.intensity]
-            avg_intensity = sum(intensities) / len(intensities) if intensities else 0
-            
-            workout_stats[key] = {
-                'count': count,
-                'avg_calories': filtered.aggregate(Avg('calories'))['calories__avg'] or 0,
-                'avg_minutes': filtered.aggregate(Avg('duration'))['duration__avg'] or 0,
-                'avg_intensity': round(avg_intensity, 1),
-            }
-        else:
-            workout_stats[key] = {
-                'count': 0,
-                'avg_calories': 0,
-                'avg_minutes': 0,
-                'avg_intensity': 0,
-            }
-    
-    context = {
-        'workouts': workouts,
+    for workout_type, key in INTENSITY_STATS_KEYS.items():
+        row = rows.get(workout_type, {})
+        workout_stats[key] = {
+            'count': row.get('count', 0),
+            'avg_calories': row.get('avg_calories') or 0,
+            'avg_minutes': row.get('avg_minutes') or 0,
+            'avg_intensity': round(row.get('avg_intensity') or 0, 1),
+        }
+
+    return {
         'total_workouts': total_workouts,
         'total_calories': round(total_calories, 1),
         'total_minutes': round(total_minutes, 1),
@@ -91,10 +108,43 @@ def review(request):
         'avg_minutes': round(avg_minutes, 1),
         'workout_stats': workout_stats,
     }
-    
-    return render(request, "workouts/review_workouts.html", context)
 
-class WorkoutListView(LoginRequiredMixin, ListView):
+@login_required
+def trends(request):
+    """
+    JSON time series of the user's workouts between ?start= and ?end= (ISO
+    dates, inclusive). Defaults to the last 90 days; at most a year per request.
+    """
+    try:
+        end = parse_date(request.GET["end"]) if request.GET.get("end") else timezone.localdate()
+        # The default start comes from the end, so an invalid end must be caught first
+        if end is None:
+            start = None
+        elif request.GET.get("start"):
+            start = parse_date(request.GET["start"])
+        else:
+            start = end - timedelta(days=DEFAULT_TREND_DAYS - 1)
+    except ValueError:
+        # Well formed but impossible, like 2024-02-30
+        start = end = None
+    if start is None or end is None:
+        return JsonResponse({"error": "start and end must be dates like 2024-05-01."}, status=400)
+    if start > end:
+        return JsonResponse({"error": "start must be before end."}, status=400)
+    if (end - start).days + 1 > MAX_TREND_DAYS:
+        return JsonResponse({"error": f"At most {MAX_TREND_DAYS} days per request."}, status=400)
+
+    return JsonResponse(workout_trends(request.user, start, end))
+
+
+def set_estimated_calories(workout):
+    """Replace the calories posted by the form with the server-side estimate."""
+    calories = estimate_calories(workout.workout_type, workout.duration, workout.distance, workout.intensity)
+    if calories is not None:
+        workout.calories = calories
+
+
+class WorkoutListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Workout
     context_object_name = "workouts"
     ordering = ["-date"]
@@ -105,7 +155,8 @@ class WorkoutListView(LoginRequiredMixin, ListView):
             user=self.request.user
         )  # Filter the queryset to only include objects created by the current user
 
-class WorkoutDetailView(LoginRequiredMixin, DetailView):
+class WorkoutDetailView(LoginRequiredMixin, AdjacentObjectsMixin, DetailView):
+    # previous_workout (older date) and next_workout (newer date) are added by AdjacentObjectsMixin
     model = Workout
     context_object_name = 'workout'
 
@@ -114,24 +165,6 @@ class WorkoutDetailView(LoginRequiredMixin, DetailView):
         return queryset.filter(
             user=self.request.user
         )  
-        
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        workout = self.get_object()
-        
-        # Get previous workout (older date)
-        context['previous_workout'] = Workout.objects.filter(
-            user=self.request.user,
-            date__lt=workout.date
-        ).order_by('-date').first()
-        
-        # Get next workout (newer date)
-        context['next_workout'] = Workout.objects.filter(
-            user=self.request.user,
-            date__gt=workout.date
-        ).order_by('date').first()
-        
-        return context
     
 class WorkoutCreateView(LoginRequiredMixin, CreateView):
     model = Workout
@@ -142,6 +175,7 @@ class WorkoutCreateView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         """Automatically set the user to the logged-in user"""
         form.instance.user = self.request.user
+        set_estimated_calories(form.instance)
         return super().form_valid(form)
 
     def get_success_url(self):
@@ -162,6 +196,7 @@ class WorkoutUpdateView(LoginRequiredMixin, UpdateView):
 
     def form_valid(self, form):
         form.instance.user = self.request.user 
+        set_estimated_calories(form.instance)
         return super().form_valid(form)
     
     def get_success_url(self):